@@ -0,0 +1,92 @@
+"""
+Compare ways of assembling a stream's Dataset from its Event Descriptors.
+
+``documents_to_xarray`` builds one Dataset directly when a stream has one
+Event Descriptor, or when its Event Descriptors have the same fields and do
+not overlap in time. This compares that against merging a Dataset made for
+each Event Descriptor with ``xarray.merge`` (as it used to), for streams with
+many fields.
+
+    python benchmarks/dataset_assembly.py [--fields N] [--events N]
+"""
+import argparse
+import time
+import warnings
+
+import event_model
+import xarray
+
+from intake_bluesky.core import documents_to_xarray
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def make_stream(num_fields, num_events, num_descriptors, interleaved):
+    run_bundle = event_model.compose_run()
+    data_keys = {f'field{i}': {'source': '...', 'shape': [], 'dtype': 'number'}
+                 for i in range(num_fields)}
+    bundles = [run_bundle.compose_descriptor(data_keys=data_keys,
+                                             name='primary')
+               for _ in range(num_descriptors)]
+    pages = {}
+    for i, bundle in enumerate(bundles):
+        if interleaved:
+            times = [num_descriptors * j + i for j in range(num_events)]
+        else:
+            times = [num_events * i + j for j in range(num_events)]
+        pages[bundle.descriptor_doc['uid']] = event_model.pack_event_page(*(
+            bundle.compose_event(data={key: float(t) for key in data_keys},
+                                 timestamps={key: t for key in data_keys},
+                                 time=t)
+            for t in times))
+    descriptor_docs = [bundle.descriptor_doc for bundle in bundles]
+
+    def to_xarray(descriptor_docs):
+        return documents_to_xarray(
+            start_doc=run_bundle.start_doc,
+            stop_doc=None,
+            descriptor_docs=descriptor_docs,
+            get_event_pages=lambda uid: [pages[uid]],
+            filler=event_model.Filler({}, inplace=True),
+            get_resource=None,
+            lookup_resource_for_datum=None,
+            get_datum_pages=None)
+
+    return descriptor_docs, to_xarray
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--fields', type=int, default=500)
+    parser.add_argument('--events', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    # xarray.merge warns of coming changes to its defaults.
+    warnings.simplefilter('ignore', FutureWarning)
+
+    cases = [(1, False), (4, False), (4, True)]
+    for num_descriptors, interleaved in cases:
+        descriptor_docs, to_xarray = make_stream(
+            args.fields, args.events, num_descriptors, interleaved)
+        expected = xarray.merge([to_xarray([doc]) for doc in descriptor_docs])
+        assert to_xarray(descriptor_docs).identical(expected)
+        merged = best_of(
+            lambda: xarray.merge([to_xarray([doc]) for doc in descriptor_docs]),
+            args.repeat)
+        direct = best_of(lambda: to_xarray(descriptor_docs), args.repeat)
+        label = (f"{num_descriptors} descriptor(s)"
+                 f"{', interleaved' if interleaved else ''}")
+        print(f"{args.fields} fields, {label:28} xarray.merge: "
+              f"{merged * 1e3:8.1f} ms   documents_to_xarray: "
+              f"{direct * 1e3:8.1f} ms   ({merged / direct:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
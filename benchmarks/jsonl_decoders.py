@@ -0,0 +1,85 @@
+"""
+Compare the JSON decoders available to the JSONL backend.
+
+Writes representative scan files to a temporary directory---one with a
+document per Event, as suitcase-jsonl writes them, and one with EventPages---
+then times reading each one through ``intake_bluesky.jsonl.gen``.
+
+    python benchmarks/jsonl_decoders.py [--events N] [--fields N]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import event_model
+import numpy
+
+from intake_bluesky.jsonl import DECODERS, gen
+
+
+def write_scan(filename, num_events, num_fields, pages):
+    run = event_model.compose_run()
+    data_keys = {f'field{i}': {'source': 'SIM', 'dtype': 'number', 'shape': []}
+                 for i in range(num_fields)}
+    desc = run.compose_descriptor(data_keys=data_keys, name='primary')
+    rng = numpy.random.RandomState(0)
+    with open(filename, 'w') as file:
+        def write(name, doc):
+            file.write(json.dumps([name, doc]) + '\n')
+
+        write('start', run.start_doc)
+        write('descriptor', desc.descriptor_doc)
+        events = []
+        for seq_num in range(1, 1 + num_events):
+            data = {key: float(rng.random_sample()) for key in data_keys}
+            events.append(desc.compose_event(
+                data=data, timestamps={key: time.time() for key in data_keys},
+                seq_num=seq_num))
+        if pages:
+            for i in range(0, num_events, 1000):
+                write('event_page', event_model.pack_event_page(*events[i:i + 1000]))
+        else:
+            for event in events:
+                write('event', event)
+        write('stop', run.compose_stop())
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--events', type=int, default=20_000)
+    parser.add_argument('--fields', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{args.events} events x {args.fields} fields, "
+              f"best of {args.repeat}")
+        print(f"{'layout':<12} {'decoder':<8} {'arrays':<7} {'MB':>6} {'seconds':>8}")
+        for layout in ('events', 'event_pages'):
+            filename = os.path.join(directory, f'{layout}.jsonl')
+            write_scan(filename, args.events, args.fields,
+                       pages=(layout == 'event_pages'))
+            size = os.path.getsize(filename) / 1e6
+            for decoder in DECODERS:
+                for numpy_arrays in (False, True):
+                    if numpy_arrays and layout == 'events':
+                        continue
+                    seconds = best_of(args.repeat, lambda: list(gen(
+                        filename, decoder=decoder, numpy_arrays=numpy_arrays)))
+                    print(f"{layout:<12} {decoder:<8} {str(numpy_arrays):<7} "
+                          f"{size:>6.1f} {seconds:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
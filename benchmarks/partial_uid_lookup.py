@@ -0,0 +1,98 @@
+"""
+Compare ways of looking up a run by partial uid.
+
+In memory, compares scanning every uid with ``str.startswith`` (as
+``BlueskyInMemoryCatalog`` used to) against bisecting a sorted list of uids
+(as it does now). Given a MongoDB URI, also compares an unanchored ``$regex``
+against the range query from ``intake_bluesky.core.prefix_query`` on a
+throwaway database, and reports how many index keys and documents each
+examines.
+
+    python benchmarks/partial_uid_lookup.py [--runs N] [--mongo-uri URI]
+"""
+import argparse
+import bisect
+import time
+import uuid
+
+from intake_bluesky.core import prefix_bounds, prefix_query
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def scan(uids, prefix):
+    return [uid for uid in uids if uid.startswith(prefix)]
+
+
+def search_sorted(sorted_uids, prefix):
+    lower, upper = prefix_bounds(prefix)
+    start = bisect.bisect_left(sorted_uids, lower)
+    stop = (len(sorted_uids) if upper is None
+            else bisect.bisect_left(sorted_uids, upper, start))
+    return sorted_uids[start:stop]
+
+
+def benchmark_in_memory(uids, prefixes, repeat):
+    t0 = time.perf_counter()
+    sorted_uids = sorted(uids)
+    print(f"sorting {len(uids):,} uids: {time.perf_counter() - t0:.3f} s")
+    for prefix in prefixes:
+        assert sorted(scan(uids, prefix)) == search_sorted(sorted_uids, prefix)
+        linear = best_of(lambda: scan(uids, prefix), repeat)
+        indexed = best_of(lambda: search_sorted(sorted_uids, prefix), repeat)
+        print(f"prefix {prefix!r:16} startswith scan: {linear * 1e3:9.3f} ms"
+              f"   bisect: {indexed * 1e6:7.1f} us"
+              f"   ({linear / indexed:,.0f}x)")
+
+
+def benchmark_mongo(uri, uids, prefixes, repeat):
+    import pymongo
+
+    client = pymongo.MongoClient(uri)
+    db_name = f'intake_bluesky_benchmark_{uuid.uuid4().hex}'
+    collection = client[db_name]['run_start']
+    try:
+        for i in range(0, len(uids), 10_000):
+            collection.insert_many([{'uid': uid, 'time': 0}
+                                    for uid in uids[i:i + 10_000]])
+        collection.create_index('uid', unique=True)
+        for prefix in prefixes:
+            queries = {'$regex': {'uid': {'$regex': f'{prefix}.*'}},
+                       'range': {'uid': prefix_query(prefix)}}
+            for label, query in queries.items():
+                elapsed = best_of(
+                    lambda: list(collection.find(query).limit(10)), repeat)
+                stats = collection.find(query).limit(10).explain()[
+                    'executionStats']
+                print(f"prefix {prefix!r:16} {label:6}: "
+                      f"{elapsed * 1e3:9.3f} ms, "
+                      f"{stats['totalKeysExamined']:,} keys and "
+                      f"{stats['totalDocsExamined']:,} documents examined")
+    finally:
+        client.drop_database(db_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--mongo-uri', help="e.g. mongodb://localhost:27017")
+    args = parser.parse_args()
+
+    uids = [str(uuid.uuid4()) for _ in range(args.runs)]
+    # From ambiguous to unique
+    prefixes = [uids[0][:length] for length in (2, 4, 8, 12)]
+    benchmark_in_memory(uids, prefixes, args.repeat)
+    if args.mongo_uri:
+        benchmark_mongo(args.mongo_uri, uids, prefixes, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,439 @@
+"""
+Read (and write) compressed run files with random access.
+
+gzip and xz are supported using the standard library, and zstd if the
+``zstandard`` package is installed. A compressed file is read as a sequence of
+independently-compressed *frames*: gzip members, xz streams, or zstd frames.
+Given an index of where each frame starts, a read at any uncompressed offset
+only has to decompress the frame that holds it.
+
+How the index is built depends on the format:
+
+* gzip written as BGZF (for example, by ``bgzip`` or :func:`compress`) records
+  each member's size in its header, so the index is read off the headers.
+  Other gzip files do not, and are streamed.
+* xz records the sizes of its blocks in an index at the end of each stream, so
+  the frame index is read off those without decompressing anything.
+* zstd frames are walked by their block headers. Frames that do not record
+  their decompressed size are decompressed once to measure it.
+
+Indexes are cached per (filename, mtime, size). A file that is one big frame,
+such as the output of plain ``gzip``, gains nothing from this, so it is read
+through the standard library's streaming decompressors instead.
+"""
+import bisect
+import errno
+import functools
+import gzip
+import io
+import lzma
+import os
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Magic bytes at the start of each format.
+MAGIC = {'gzip': b'\x1f\x8b',
+         'xz': b'\xfd7zXZ\x00',
+         'zstd': b'\x28\xb5\x2f\xfd'}
+
+# Files with any frame larger than this (uncompressed) are streamed instead of
+# being read a frame at a time.
+MAX_FRAME_SIZE = 64 * 2**20
+
+# Chunk size used when a frame must be decompressed to find its bounds.
+_SCAN_CHUNK_SIZE = 2**20
+
+
+def detect(filename):
+    """
+    Return the compression format of a file, or None if it is not compressed.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    method : {'gzip', 'xz', 'zstd', None}
+    """
+    with open(filename, 'rb') as file:
+        head = file.read(6)
+    for method, magic in MAGIC.items():
+        if head.startswith(magic):
+            return method
+    return None
+
+
+def open_file(filename):
+    """
+    Open a file, which may be compressed, for reading bytes.
+
+    Offsets passed to ``seek`` and returned by ``tell`` refer to the
+    uncompressed content.
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    file : file-like
+    """
+    method = detect(filename)
+    if method is None:
+        return open(filename, 'rb')
+    if method == 'zstd' and zstandard is None:
+        raise RuntimeError(
+            f"{filename} is zstd-compressed. Install the zstandard package to "
+            f"read it.")
+    stat = os.stat(filename)
+    frames = _frame_index(filename, method, stat.st_mtime, stat.st_size)
+    if frames is None:
+        return _STREAM_OPENERS[method](filename)
+    return io.BufferedReader(_FramedReader(filename, method, frames))
+
+
+def random_access(file):
+    """
+    Whether a file returned by :func:`open_file` can seek cheaply.
+
+    Plain and framed files can. Streamed compressed files can only seek
+    forward cheaply, and may not be able to seek relative to the end.
+    """
+    return isinstance(file, (io.BufferedReader, io.FileIO))
+
+
+class _Frames:
+    """
+    Where each frame is, in compressed and uncompressed coordinates.
+    """
+    __slots__ = ('compressed_offsets', 'compressed_sizes',
+                 'uncompressed_offsets', 'size')
+
+    def __init__(self, frames):
+        # frames is a list of (compressed offset, compressed size,
+        # uncompressed size). Drop empty frames, such as BGZF's EOF marker.
+        frames = [frame for frame in frames if frame[2]]
+        self.compressed_offsets = [frame[0] for frame in frames]
+        self.compressed_sizes = [frame[1] for frame in frames]
+        self.uncompressed_offsets = []
+        self.size = 0
+        for frame in frames:
+            self.uncompressed_offsets.append(self.size)
+            self.size += frame[2]
+
+    def __len__(self):
+        return len(self.compressed_offsets)
+
+
+class _FramedReader(io.RawIOBase):
+    """
+    Raw reader over a compressed file, decompressing one frame at a time.
+    """
+    def __init__(self, filename, method, frames):
+        self._file = open(filename, 'rb')
+        self._decompress = _DECOMPRESSORS[method]
+        self._frames = frames
+        self._pos = 0
+        self._cached_index = None
+        self._cached_data = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._frames.size + offset
+        else:
+            raise ValueError(f"Invalid whence {whence!r}")
+        if pos < 0:
+            raise OSError(errno.EINVAL, "Invalid argument")
+        self._pos = pos
+        return pos
+
+    def _frame(self, index):
+        if index != self._cached_index:
+            self._file.seek(self._frames.compressed_offsets[index])
+            compressed = self._file.read(self._frames.compressed_sizes[index])
+            self._cached_data = self._decompress(compressed)
+            self._cached_index = index
+        return self._cached_data
+
+    def readinto(self, buffer):
+        if self._pos >= self._frames.size:
+            return 0
+        starts = self._frames.uncompressed_offsets
+        index = bisect.bisect_right(starts, self._pos) - 1
+        data = self._frame(index)
+        start = self._pos - starts[index]
+        chunk = data[start:start + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+    def close(self):
+        self._file.close()
+        self._cached_data = None
+        super().close()
+
+
+def _decompress_zstd(data):
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+_DECOMPRESSORS = {'gzip': gzip.decompress,
+                  'xz': lzma.decompress,
+                  'zstd': _decompress_zstd}
+
+
+def _open_zstd(filename):
+    return zstandard.open(filename, 'rb')
+
+
+_STREAM_OPENERS = {'gzip': gzip.open,
+                   'xz': lzma.open,
+                   'zstd': _open_zstd}
+
+
+@functools.lru_cache(maxsize=1024)
+def _frame_index(filename, method, mtime, size):
+    """
+    Index the frames of a compressed file.
+
+    The mtime and size are part of the cache key, so that the index is
+    rebuilt if the file changes. Returns None if the file should be streamed
+    instead.
+    """
+    with open(filename, 'rb') as file:
+        frames = _INDEXERS[method](file, size)
+    if frames is None:
+        return None
+    frames = _Frames(frames)
+    starts = frames.uncompressed_offsets + [frames.size]
+    if any(b - a > MAX_FRAME_SIZE for a, b in zip(starts, starts[1:])):
+        return None
+    return frames
+
+
+def _scan(file, offset, make_decompressor):
+    """
+    Decompress from offset to the end of one frame, to measure it.
+
+    Returns (compressed size, uncompressed size).
+    """
+    file.seek(offset)
+    decompressor = make_decompressor()
+    compressed_size = uncompressed_size = 0
+    while not decompressor.eof:
+        chunk = file.read(_SCAN_CHUNK_SIZE)
+        if not chunk:
+            raise EOFError("Compressed file ended before the end of a frame.")
+        uncompressed_size += len(decompressor.decompress(chunk))
+        compressed_size += len(chunk)
+    compressed_size -= len(decompressor.unused_data)
+    return compressed_size, uncompressed_size
+
+
+def _index_gzip(file, size):
+    frames = []
+    offset = 0
+    while offset < size:
+        file.seek(offset)
+        header = file.read(18)
+        if not header.strip(b'\x00'):
+            # Trailing zero padding, which gzip tolerates.
+            break
+        if len(header) < 10 or header[:2] != MAGIC['gzip']:
+            raise ValueError(f"Invalid gzip member at offset {offset}")
+        block_size = None
+        if header[3] & 0x04 and header[12:14] == b'BC':
+            # BGZF: the extra field holds this member's size, minus one.
+            xlen, = struct.unpack_from('<H', header, 10)
+            if xlen >= 6:
+                block_size, = struct.unpack_from('<H', header, 16)
+                block_size += 1
+        if block_size is None:
+            # Not BGZF. Finding where each member ends would mean inflating
+            # the whole file, so stream it instead.
+            return None
+        file.seek(offset + block_size - 4)
+        uncompressed_size, = struct.unpack('<I', file.read(4))
+        frames.append((offset, block_size, uncompressed_size))
+        offset += block_size
+    return frames
+
+
+def _read_varint(buffer, pos):
+    value = shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _index_xz(file, size):
+    # Walk the streams backward from the end using their footers and indexes.
+    streams = []
+    end = size
+    while end > 0:
+        file.seek(end - 4)
+        if file.read(4) == b'\x00\x00\x00\x00':
+            # Stream padding
+            end -= 4
+            continue
+        file.seek(end - 12)
+        footer = file.read(12)
+        if footer[10:] != b'YZ':
+            raise ValueError(f"Invalid xz stream footer ending at {end}")
+        backward_size, = struct.unpack_from('<I', footer, 4)
+        index_size = (backward_size + 1) * 4
+        file.seek(end - 12 - index_size)
+        index = file.read(index_size)
+        count, pos = _read_varint(index, 1)
+        blocks_size = uncompressed_size = 0
+        for _ in range(count):
+            unpadded_size, pos = _read_varint(index, pos)
+            block_uncompressed_size, pos = _read_varint(index, pos)
+            blocks_size += (unpadded_size + 3) // 4 * 4
+            uncompressed_size += block_uncompressed_size
+        stream_size = 12 + blocks_size + index_size + 12
+        start = end - stream_size
+        streams.append((start, stream_size, uncompressed_size))
+        end = start
+    streams.reverse()
+    return streams
+
+
+_ZSTD_SKIPPABLE = range(0x184D2A50, 0x184D2A60)
+
+
+def _index_zstd(file, size):
+    frames = []
+    offset = 0
+    while offset < size:
+        file.seek(offset)
+        magic, = struct.unpack('<I', file.read(4))
+        if magic in _ZSTD_SKIPPABLE:
+            skip_size, = struct.unpack('<I', file.read(4))
+            offset += 8 + skip_size
+            continue
+        if magic != 0xFD2FB528:
+            raise ValueError(f"Invalid zstd frame at offset {offset}")
+        descriptor = file.read(1)[0]
+        single_segment = descriptor >> 5 & 1
+        fcs_size = [single_segment, 2, 4, 8][descriptor >> 6]
+        did_size = [0, 1, 2, 4][descriptor & 3]
+        has_checksum = descriptor >> 2 & 1
+        file.read(0 if single_segment else 1)  # window descriptor
+        file.read(did_size)
+        content_size = None
+        if fcs_size:
+            content_size = int.from_bytes(file.read(fcs_size), 'little')
+            if fcs_size == 2:
+                content_size += 256
+        pos = file.tell()
+        while True:
+            block_header = int.from_bytes(file.read(3), 'little')
+            block_type = block_header >> 1 & 3
+            block_size = block_header >> 3
+            pos += 3 + (1 if block_type == 1 else block_size)
+            file.seek(pos)
+            if block_header & 1:
+                break
+        pos += 4 * has_checksum
+        frame_size = pos - offset
+        if content_size is None:
+            _, content_size = _scan(
+                file, offset,
+                lambda: zstandard.ZstdDecompressor().decompressobj())
+        frames.append((offset, frame_size, content_size))
+        offset += frame_size
+    return frames
+
+
+_INDEXERS = {'gzip': _index_gzip,
+             'xz': _index_xz,
+             'zstd': _index_zstd}
+
+
+# BGZF caps members at 64 kB compressed, so this much input always fits.
+_BGZF_INPUT_SIZE = 65280
+_BGZF_EOF = bytes.fromhex(
+    '1f8b08040000000000ff0600424302001b0003000000000000000000')
+
+
+def _bgzf_member(data):
+    for level in (6, 0):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        deflated = compressor.compress(data) + compressor.flush()
+        # header (18) + deflated + crc32 and size (8)
+        block_size = 18 + len(deflated) + 8
+        if block_size <= 65536:
+            break
+    header = (b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff'
+              + struct.pack('<H', 6) + b'BC' + struct.pack('<HH', 2, block_size - 1))
+    trailer = struct.pack('<II', zlib.crc32(data), len(data))
+    return header + deflated + trailer
+
+
+def compress(source, destination, method='gzip', frame_size=2**20):
+    """
+    Compress a file in seekable frames.
+
+    The output is an ordinary gzip, xz, or zstd file, readable by the usual
+    tools, that can also be read with random access by :func:`open_file`.
+
+    Parameters
+    ----------
+    source : str
+        Path to the uncompressed file
+    destination : str
+        Path to write
+    method : {'gzip', 'xz', 'zstd'}, optional
+        gzip is written as BGZF, as by ``bgzip``, with frames of about 64 kB.
+    frame_size : int, optional
+        Uncompressed bytes per frame for xz and zstd. Smaller frames make
+        random access cheaper and compression less effective.
+    """
+    if method == 'gzip':
+        chunk_size = _BGZF_INPUT_SIZE
+        compress_chunk = _bgzf_member
+    elif method == 'xz':
+        chunk_size = frame_size
+        compress_chunk = lzma.compress
+    elif method == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Install the zstandard package to write zstd.")
+        chunk_size = frame_size
+        compressor = zstandard.ZstdCompressor(write_content_size=True)
+        compress_chunk = compressor.compress
+    else:
+        raise ValueError(
+            f"method must be 'gzip', 'xz', or 'zstd', not {method!r}")
+    with open(source, 'rb') as input_file, open(destination, 'wb') as output_file:
+        while True:
+            chunk = input_file.read(chunk_size)
+            if not chunk:
+                break
+            output_file.write(compress_chunk(chunk))
+        if method == 'gzip':
+            output_file.write(_BGZF_EOF)
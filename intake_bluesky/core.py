@@ -1,5 +1,7 @@
+import bisect
 import collections
-import copy
+import concurrent.futures
+import contextlib
 import event_model
 from datetime import datetime
 import dask
@@ -11,17 +13,25 @@ import importlib
 import itertools
 import intake.catalog.base
 import errno
-import intake.container.base
 import intake_xarray.base
-from intake.compat import unpack_kwargs
+from intake.compat import pack_kwargs, unpack_kwargs
+from intake.container import serializer
 import msgpack
 import requests
 from requests.compat import urljoin
 import numpy
 import os
+import sys
+import threading
+from urllib3.util.retry import Retry
+import urllib.parse
 import warnings
 import xarray
 
+from .compression import open_file
+from .compression import random_access
+from . import wire
+
 
 def tail(filename, n=1, bsize=2048):
     """
@@ -33,6 +43,7 @@ def tail(filename, n=1, bsize=2048):
     Parameters
     ----------
     filename : string
+        The file may be compressed. See :func:`compression.open_file`.
     n: int
         number of lines
     bsize: int
@@ -41,16 +52,27 @@ def tail(filename, n=1, bsize=2048):
     -------
     line : generator
     """
-
-    # get newlines type, open in universal mode to find it
-    with open(filename, 'r', newline=None) as hfile:
-        if not hfile.readline():
+    with open_file(filename) as hfile:
+        # get newlines type from the end of the first line
+        first = hfile.readline()
+        if not first:
             return  # empty, no point
-        sep = hfile.newlines  # After reading a line, python gives us this
-    assert isinstance(sep, str), 'multiple newline types found, aborting'
+        if first.endswith(b'\r\n'):
+            sep = b'\r\n'
+        elif first.endswith(b'\r'):
+            sep = b'\r'
+        else:
+            sep = b'\n'
+
+        if not random_access(hfile):
+            # Seeking backward from the end of a compressed stream would
+            # decompress it over and over, so read it through once.
+            lines = collections.deque(itertools.chain([first], hfile), n)
+            for line in lines:
+                yield line.decode().rstrip()
+            return
 
-    # find a suitable seek position in binary mode
-    with open(filename, 'rb') as hfile:
+        # find a suitable seek position
         hfile.seek(0, os.SEEK_END)
         linecount = 0
         pos = 0
@@ -59,7 +81,7 @@ def tail(filename, n=1, bsize=2048):
             # read at least n lines + 1 more; we need to skip a partial line later on
             try:
                 hfile.seek(-bsize, os.SEEK_CUR)           # go backwards
-                linecount += hfile.read(bsize).count(sep.encode())  # count newlines
+                linecount += hfile.read(bsize).count(sep)  # count newlines
                 hfile.seek(-bsize, os.SEEK_CUR)           # go back again
             except IOError as e:
                 if e.errno == errno.EINVAL:
@@ -67,13 +89,11 @@ def tail(filename, n=1, bsize=2048):
                     bsize = hfile.tell()
                     hfile.seek(0, os.SEEK_SET)
                     pos = 0
-                    linecount += hfile.read(bsize).count(sep.encode())
+                    linecount += hfile.read(bsize).count(sep)
                     break
                 raise  # Some other I/O exception, re-raise
             pos = hfile.tell()
 
-    # Re-open in text mode
-    with open(filename, 'r') as hfile:
         hfile.seek(pos, os.SEEK_SET)  # our file position from above
         for line in hfile:
             # We've located n lines *or more*, so skip if needed
@@ -81,7 +101,7 @@ def tail(filename, n=1, bsize=2048):
                 linecount -= 1
                 continue
             # The rest we yield
-            yield line.rstrip()
+            yield line.decode().rstrip()
 
 
 def to_event_pages(get_event_cursor, page_size):
@@ -184,6 +204,63 @@ def interlace_event_pages(*gens):
         safe_next(indx)
 
 
+def pack_pages(documents, page_size):
+    """
+    Pack consecutive Events, and consecutive Datums, into pages.
+
+    Events share a page if they share an EventDescriptor, and Datums if they
+    share a Resource. Pages that come in are unpacked and packed again. Other
+    documents pass through, in order.
+
+    Parameters
+    ----------
+    documents : iterable
+        of (name, doc) pairs
+    page_size : int
+        Most Events or Datums per page
+
+    Yields
+    ------
+    name, doc : str, dict
+    """
+    buffer = []
+    key = None
+
+    def flush():
+        if not buffer:
+            return ()
+        if key[0] == 'event':
+            page = ('event_page', event_model.pack_event_page(*buffer))
+        else:
+            page = ('datum_page', event_model.pack_datum_page(*buffer))
+        buffer.clear()
+        return (page,)
+
+    for name, doc in documents:
+        if name in ('event', 'event_page'):
+            doc_key = ('event', doc['descriptor'])
+        elif name in ('datum', 'datum_page'):
+            doc_key = ('datum', doc['resource'])
+        else:
+            yield from flush()
+            yield name, doc
+            continue
+        if doc_key != key:
+            yield from flush()
+            key = doc_key
+        if name == 'event_page':
+            items = event_model.unpack_event_page(doc)
+        elif name == 'datum_page':
+            items = event_model.unpack_datum_page(doc)
+        else:
+            items = (doc,)
+        for item in items:
+            buffer.append(item)
+            if len(buffer) >= page_size:
+                yield from flush()
+    yield from flush()
+
+
 def interlace_event_page_chunks(*gens, chunk_size):
     """
     Take event_page generators and interlace their results by timestamp.
@@ -216,6 +293,7 @@ def interlace_event_page_chunks(*gens, chunk_size):
     while heap:
         _, indx, val = heapq.heappop(heap)
         yield val
+        safe_next(indx)
 
 
 def documents_to_xarray(*, start_doc, stop_doc, descriptor_docs,
@@ -234,6 +312,8 @@ def documents_to_xarray(*, start_doc, stop_doc, descriptor_docs,
     descriptor_docs : list
         EventDescriptor Documents
     filler : event_model.Filler
+        If it is a DaskFiller, each external field is a dask array, filled a
+        chunk of frames per task when computed. Otherwise it is filled now.
     get_resource : callable
         Expected signature ``get_resource(resource_uid) -> Resource``
     lookup_resource_for_datum : callable
@@ -274,43 +354,50 @@ def documents_to_xarray(*, start_doc, stop_doc, descriptor_docs,
         else:
             keys = list(data_keys)
 
-    # Collect a Dataset for each descriptor. Merge at the end.
-    datasets = []
+    # Collect the times and variables for each descriptor. Combine at the end.
+    blocks = []
     for descriptor in descriptor_docs:
         events = list(flatten_event_page_gen(get_event_pages(descriptor['uid'])))
         if not events:
             continue
-        if any(data_keys[key].get('external') for key in keys):
+        external_keys = [key for key in keys if data_keys[key].get('external')]
+        lazy = {}  # dask arrays of external fields, by key
+        if external_keys:
             filler('descriptor', descriptor)
-            for event in events:
-                try:
-                    filler('event', event)
-                except event_model.UnresolvableForeignKeyError as err:
-                    datum_id = err.key
-                    resource_uid = lookup_resource_for_datum(datum_id)
-                    resource = get_resource(resource_uid)
-                    filler('resource', resource)
-                    # Pre-fetch all datum for this resource.
-                    for datum_page in get_datum_pages(resource_uid):
-                        filler('datum_page', datum_page)
-                    # TODO -- When to clear the datum cache in filler?
-                    filler('event', event)
+            if isinstance(filler, DaskFiller):
+                filler._load_assets(
+                    (event['data'][key] for event in events
+                     for key in external_keys
+                     if not event.get('filled', {}).get(key, False)),
+                    get_resource, lookup_resource_for_datum, get_datum_pages)
+                lazy = filler.fill_event_pages(
+                    [event_model.pack_event_page(*events)],
+                    include=external_keys)
+            else:
+                for event in events:
+                    _fill(filler, 'event', event, get_resource,
+                          lookup_resource_for_datum, get_datum_pages)
         times = [ev['time'] for ev in events]
         seq_nums = [ev['seq_num'] for ev in events]
         uids = [ev['uid'] for ev in events]
-        data_table = _transpose(events, keys, 'data')
+        data_table = _transpose(events, [key for key in keys if key not in lazy],
+                                'data')
+        data_table.update(lazy)
         # external_keys = [k for k in data_keys if 'external' in data_keys[k]]
 
-        # Collect a DataArray for each field in Event, each field in
+        # Collect a variable for each field in Event, each field in
         # configuration, and 'seq_num'. The Event 'time' will be the
         # default coordinate.
-        data_arrays = {}
+        data_vars = {}
 
-        # Make DataArrays for Event data.
+        # Make variables for Event data.
         for key in keys:
             field_metadata = data_keys[key]
             # Verify the actual ndim by looking at the data.
-            ndim = numpy.asarray(data_table[key][0]).ndim
+            if key in lazy:
+                ndim = lazy[key].ndim - 1
+            else:
+                ndim = numpy.asarray(data_table[key][0]).ndim
             dims = None
             if 'dims' in field_metadata:
                 # As of this writing no Devices report dimension names ('dims')
@@ -324,29 +411,25 @@ def documents_to_xarray(*, start_doc, stop_doc, descriptor_docs,
             if dims is None:
                 # Construct the same default dimension names xarray would.
                 dims = tuple(f'dim_{i}' for i in range(ndim))
-            data_arrays[key] = xarray.DataArray(
-                data=data_table[key],
-                dims=('time',) + dims,
-                coords={'time': times},
-                name=key)
+            data_vars[key] = (('time',) + dims, data_table[key])
 
-        # Make DataArrays for configuration data.
+        # Make variables for configuration data.
         for object_name, config in descriptor.get('configuration', {}).items():
-            data_keys = config['data_keys']
+            config_data_keys = config['data_keys']
             # For configuration, label the dimension specially to
             # avoid key collisions.
             scoped_data_keys = {key: f'{object_name}:{key}'
-                                for key in data_keys}
+                                for key in config_data_keys}
             if include:
-                keys = {k: v for k, v in scoped_data_keys.items()
-                        if v in include}
+                config_keys = {k: v for k, v in scoped_data_keys.items()
+                               if v in include}
             elif exclude:
-                keys = {k: v for k, v in scoped_data_keys.items()
-                        if v not in include}
+                config_keys = {k: v for k, v in scoped_data_keys.items()
+                               if v not in exclude}
             else:
-                keys = scoped_data_keys
-            for key, scoped_key in keys.items():
-                field_metadata = data_keys[key]
+                config_keys = scoped_data_keys
+            for key, scoped_key in config_keys.items():
+                field_metadata = config_data_keys[key]
                 # Verify the actual ndim by looking at the data.
                 ndim = numpy.asarray(config['data'][key]).ndim
                 dims = None
@@ -362,33 +445,210 @@ def documents_to_xarray(*, start_doc, stop_doc, descriptor_docs,
                 if dims is None:
                     # Construct the same default dimension names xarray would.
                     dims = tuple(f'dim_{i}' for i in range(ndim))
-                data_arrays[scoped_key] = xarray.DataArray(
+                data_vars[scoped_key] = (
+                    ('time',) + dims,
                     # TODO Once we know we have one Event Descriptor
                     # per stream we can be more efficient about this.
-                    data=numpy.tile(config['data'][key],
-                                    (len(times),) + ndim * (1,)),
-                    dims=('time',) + dims,
-                    coords={'time': times},
-                    name=key)
-
-        # Finally, make DataArrays for 'seq_num' and 'uid'.
-        data_arrays['seq_num'] = xarray.DataArray(
-            data=seq_nums,
-            dims=('time',),
-            coords={'time': times},
-            name='seq_num')
-        data_arrays['uid'] = xarray.DataArray(
-            data=uids,
-            dims=('time',),
-            coords={'time': times},
-            name='uid')
-
-        datasets.append(xarray.Dataset(data_vars=data_arrays))
-    # Merge Datasets from all Event Descriptors into one representing the
-    # whole stream. (In the future we may simplify to one Event Descriptor
-    # per stream, but as of this writing we must account for the
-    # possibility of multiple.)
-    return xarray.merge(datasets)
+                    numpy.tile(config['data'][key],
+                               (len(times),) + ndim * (1,)))
+
+        # Finally, make variables for 'seq_num' and 'uid'.
+        data_vars['seq_num'] = (('time',), seq_nums)
+        data_vars['uid'] = (('time',), uids)
+
+        blocks.append((times, data_vars))
+    # Combine the variables from all Event Descriptors into one Dataset
+    # representing the whole stream. (In the future we may simplify to one
+    # Event Descriptor per stream, but as of this writing we must account for
+    # the possibility of multiple.)
+    return _combine_blocks(blocks)
+
+
+def _combine_blocks(blocks):
+    """
+    Combine ``(times, data_vars)`` from each Event Descriptor into a Dataset.
+
+    The result is the same as merging a Dataset made from each block, as
+    ``_merge_blocks`` does, but xarray.merge, which aligns and compares every
+    variable, is avoided in the common cases: one block, or blocks with the
+    same variables whose times do not overlap. Those are built directly,
+    concatenating the blocks in time order.
+    """
+    if not blocks:
+        return xarray.Dataset()
+    if len(blocks) > 1:
+        blocks = sorted(blocks, key=lambda block: block[0][0])
+        times = [numpy.asarray(block_times) for block_times, _ in blocks]
+        dims = [{key: var_dims for key, (var_dims, _) in data_vars.items()}
+                for _, data_vars in blocks]
+        ordered = (all(numpy.all(numpy.diff(t) > 0) for t in times)
+                   and all(before[-1] < after[0]
+                           for before, after in zip(times, times[1:])))
+        if not (ordered and all(d == dims[0] for d in dims[1:])):
+            return _merge_blocks(blocks)
+        data_vars = {
+            key: (var_dims, _concatenate(
+                [_as_array(block_vars[key][1]) for _, block_vars in blocks]))
+            for key, var_dims in dims[0].items()}
+        return xarray.Dataset(data_vars,
+                              coords={'time': numpy.concatenate(times)})
+    (times, data_vars), = blocks
+    return xarray.Dataset(data_vars, coords={'time': times})
+
+
+def _merge_blocks(blocks):
+    """
+    Merge a Dataset made from each block, keeping the blocks' dtypes.
+
+    xarray.merge pads each variable with NaN for the times of the other
+    blocks, which makes integers and booleans floats. A variable that every
+    block has is cast back to the dtype that concatenating the blocks would
+    give it. A variable that only some blocks have keeps the padding, and so
+    the float dtype.
+    """
+    merged = xarray.merge(
+        [xarray.Dataset(data_vars, coords={'time': block_times})
+         for block_times, data_vars in blocks])
+    for key in list(merged.data_vars):
+        if not all(key in data_vars for _, data_vars in blocks):
+            continue
+        dtype = numpy.result_type(*(_as_array(data_vars[key][1]).dtype
+                                    for _, data_vars in blocks))
+        if merged[key].dtype != dtype:
+            merged[key] = merged[key].astype(dtype)
+    return merged
+
+
+def _as_array(values):
+    "Make values a numpy array, unless they are a dask array already."
+    if isinstance(values, array.Array):
+        return values
+    return numpy.asarray(values)
+
+
+def _concatenate(arrays):
+    "Concatenate numpy arrays, or lazily if any is a dask array."
+    if any(isinstance(a, array.Array) for a in arrays):
+        return array.concatenate(arrays)
+    return numpy.concatenate(arrays)
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url, pool_size=10, max_retries=3, backoff_factor=0.5,
+                idempotent=False):
+    """
+    Return a requests.Session for the server at url, shared in this process.
+
+    The Session keeps connections alive and pools up to ``pool_size`` of
+    them, so that many requests to one server do not each open a new
+    connection.
+
+    Parameters
+    ----------
+    url : str
+        Address of the server. Only the scheme, host, and port matter.
+    pool_size : int, optional
+        Most connections to keep open to the server.
+    max_retries : int, optional
+        Retry requests that fail to connect up to this many times. Retry
+        idempotent requests that fail after connecting, or get a 502, 503, or
+        504 response, too.
+    backoff_factor : float, optional
+        Wait ``backoff_factor * 2 ** (n - 1)`` seconds before the nth retry.
+    idempotent : bool, optional
+        Whether the requests made with this Session may safely be sent
+        twice, such as the intake server's 'read' action. The intake server
+        takes every request as a POST, so this cannot be told from the method.
+        Requests that are not idempotent, such as 'open', are only retried
+        if they never reached the server. False by default.
+    """
+    split = urllib.parse.urlsplit(url)
+    # Connections must not be shared with a forked child process.
+    key = (os.getpid(), split.scheme, split.netloc,
+           pool_size, max_retries, backoff_factor, idempotent)
+    with _sessions_lock:
+        try:
+            return _sessions[key]
+        except KeyError:
+            pass
+        if idempotent:
+            # Any method, POST included
+            allowed_methods = None
+        else:
+            # Not POST, which is all the intake server takes
+            allowed_methods = Retry.DEFAULT_ALLOWED_METHODS
+        retry = Retry(total=max_retries, backoff_factor=backoff_factor,
+                      status_forcelist=(502, 503, 504),
+                      allowed_methods=allowed_methods,
+                      raise_on_status=False)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount(f'{split.scheme}://', adapter)
+        _sessions[key] = session
+        return session
+
+
+def get_partition(url, http_args, source_id, container, partition,
+                  session_kwargs=None, lazy=False):
+    """
+    Fetch a partition from an intake server, over a pooled connection.
+
+    This does the same as ``intake.container.base.get_partition`` but uses a
+    Session from :func:`get_session`, asks for the compressed, framed format
+    of :mod:`intake_bluesky.wire`, and decodes that as it arrives.
+
+    Parameters
+    ----------
+    url : str
+        Server address
+    http_args : dict
+        Passed through to ``requests.Session.post``, such as headers.
+    source_id : str
+        ID of the source in the server's cache
+    container : str
+        Type of data, like "python"
+    partition : serializable
+        Which partition to fetch
+    session_kwargs : dict, optional
+        Passed through to :func:`get_session`.
+    lazy : bool, optional
+        If the server sent the framed format, return a
+        :class:`intake_bluesky.wire.Partition` that reads and decodes
+        documents a frame at a time as it is iterated, instead of a list. It
+        holds the connection open until then.
+    """
+    session = get_session(url, idempotent=True, **(session_kwargs or {}))
+    payload = dict(action='read',
+                   source_id=source_id,
+                   accepted_formats=wire.accepted_formats(),
+                   accepted_compression=wire.accepted_compression(),
+                   partition=partition)
+    with contextlib.ExitStack() as stack:
+        response = stack.enter_context(session.post(
+            urljoin(url, '/v1/source'),
+            data=msgpack.packb(payload, **pack_kwargs),
+            stream=True, **http_args))
+        response.raise_for_status()
+        response.raw.decode_content = True
+        message, chunks = wire.read_response(response.raw)
+        framed = message['format'].startswith(wire.FORMAT_PREFIX)
+        if framed and message['compression'] == wire.PassthroughCompressor.name:
+            if not lazy:
+                return list(wire.decode_documents(chunks))
+            # The Partition reads the rest of the response, and closes it.
+            stack.pop_all()
+            return wire.Partition(chunks, close=response.close)
+        data = b''.join(chunks)
+    compressor = serializer.compression_registry[message['compression']]
+    data = compressor.decompress(data)
+    if lazy and framed:
+        return wire.Partition(data)
+    encoder = serializer.format_registry[message['format']]
+    return encoder.decode(data, container)
 
 
 class RemoteBlueskyRun(intake.catalog.base.RemoteCatalog):
@@ -413,6 +673,19 @@ class RemoteBlueskyRun(intake.catalog.base.RemoteCatalog):
     """
     name = 'bluesky-run'
 
+    # Connections to each server are pooled and reused. See get_session.
+    HTTP_POOL_SIZE = 10
+    HTTP_MAX_RETRIES = 3
+    HTTP_BACKOFF_FACTOR = 0.5
+
+    # canonical() and canonical_unfilled() fetch up to this many partitions
+    # ahead, concurrently, while holding no more than about this many bytes
+    # of fetched partitions that have not been yielded yet. Partitions in the
+    # framed wire format are read off their connections only as they are
+    # yielded, so they take up little until then.
+    PREFETCH_PARTITIONS = 4
+    PREFETCH_MAX_BYTES = 2**28
+
     def __init__(self, url, http_args, name, parameters, metadata=None, **kwargs):
         super().__init__(url=url, http_args=http_args, name=name,
                          metadata=metadata)
@@ -429,13 +702,24 @@ class RemoteBlueskyRun(intake.catalog.base.RemoteCatalog):
         if self._source_id is None:
             payload = dict(action='open', name=self.name,
                            parameters=self.parameters)
-            req = requests.post(urljoin(self.url, '/v1/source'),
-                                data=msgpack.packb(payload, use_bin_type=True),
-                                **self.http_args)
+            req = self._session.post(
+                urljoin(self.url, '/v1/source'),
+                data=msgpack.packb(payload, use_bin_type=True),
+                **self.http_args)
             req.raise_for_status()
             response = msgpack.unpackb(req.content, **unpack_kwargs)
             self._parse_open_response(response)
 
+    @property
+    def _session_kwargs(self):
+        return dict(pool_size=self.HTTP_POOL_SIZE,
+                    max_retries=self.HTTP_MAX_RETRIES,
+                    backoff_factor=self.HTTP_BACKOFF_FACTOR)
+
+    @property
+    def _session(self):
+        return get_session(self.url, **self._session_kwargs)
+
     def _parse_open_response(self, response):
         self.npartitions = response['npartitions']
         self.metadata = response['metadata']
@@ -448,13 +732,13 @@ class RemoteBlueskyRun(intake.catalog.base.RemoteCatalog):
 
     def _load_metadata(self):
         if self.bag is None:
-            self.raw_parts = [dask.delayed(intake.container.base.get_partition)(
-                self.url, self.http_args, self._source_id, self.container, (i, True)
-            )
+            self.raw_parts = [dask.delayed(get_partition)(
+                self.url, self.http_args, self._source_id, self.container, (i, True),
+                self._session_kwargs)
                           for i in range(self.npartitions)]
-            self.parts = [dask.delayed(intake.container.base.get_partition)(
-                self.url, self.http_args, self._source_id, self.container, (i, False)
-            )
+            self.parts = [dask.delayed(get_partition)(
+                self.url, self.http_args, self._source_id, self.container, (i, False),
+                self._session_kwargs)
                           for i in range(self.npartitions)]
             self.bag = dask.bag.from_delayed(self.parts)
         return self._schema
@@ -481,9 +765,54 @@ class RemoteBlueskyRun(intake.catalog.base.RemoteCatalog):
     def _close(self):
         self.bag = None
 
+    def _prefetch_partitions(self, raw, page_size=None):
+        self._load_metadata()
+        fetch = functools.partial(get_partition, self.url, self.http_args,
+                                  self._source_id, self.container,
+                                  session_kwargs=self._session_kwargs,
+                                  lazy=True)
+        options = (raw,) if page_size is None else (raw, page_size)
+        return prefetch_map(
+            lambda i: fetch((i, *options)), range(self.npartitions),
+            max_in_flight=self.PREFETCH_PARTITIONS,
+            max_buffered_bytes=self.PREFETCH_MAX_BYTES)
+
+    def read_stream(self, stream_name, include=None, exclude=None,
+                    seq_num=None, time=None):
+        """
+        Read some fields and some Events from one stream.
+
+        The server reads only the selected fields and Events and sends them
+        as columns of arrays, not as Event documents.
+
+        Parameters
+        ----------
+        stream_name : str
+        include : list, optional
+            Fields ('data keys') to include. By default all are included.
+        exclude : list, optional
+            Fields ('data keys') to exclude. By default none are excluded.
+        seq_num : tuple, optional
+            ``(start, stop)``. Read Events with ``start <= seq_num < stop``.
+            Either bound may be None.
+        time : tuple, optional
+            ``(start, stop)``, the same for Event time
+
+        Returns
+        -------
+        dataset : xarray.Dataset
+        """
+        self._load_metadata()
+        partition = dict(stream=stream_name, include=include, exclude=exclude,
+                         seq_num=seq_num, time=time)
+        pages = get_partition(self.url, self.http_args, self._source_id,
+                              self.container, partition,
+                              session_kwargs=self._session_kwargs, lazy=True)
+        return columns_to_dataset(columns for _, columns in pages)
+
     def canonical(self):
-        for i in range(self.npartitions):
-            for name, doc in self._get_partition((i, False)):
+        for partition in self._prefetch_partitions(raw=False):
+            for name, doc in partition:
                 yield name, doc
 
     def read_canonical(self):
@@ -493,8 +822,43 @@ class RemoteBlueskyRun(intake.catalog.base.RemoteCatalog):
         yield from self.canonical()
 
     def canonical_unfilled(self):
-        for i in range(self.npartitions):
-            for name, doc in self._get_partition((i, True)):
+        for partition in self._prefetch_partitions(raw=True):
+            for name, doc in partition:
+                yield name, doc
+
+    def canonical_pages(self, page_size=100):
+        """
+        Yield the documents of canonical(), with Events and Datums in pages.
+
+        The server packs the pages, so fewer, larger objects are sent and
+        decoded. It packs each partition on its own, so pages do not span
+        partitions, and the documents come in the same order as canonical().
+
+        Parameters
+        ----------
+        page_size : int, optional
+            Most Events or Datums per page
+        """
+        for partition in self._prefetch_partitions(raw=False,
+                                                   page_size=page_size):
+            for name, doc in partition:
+                yield name, doc
+
+    def canonical_pages_unfilled(self, page_size=100):
+        """
+        Yield the documents of canonical_unfilled(), with Events and Datums in
+        pages.
+
+        See canonical_pages().
+
+        Parameters
+        ----------
+        page_size : int, optional
+            Most Events or Datums per page
+        """
+        for partition in self._prefetch_partitions(raw=True,
+                                                   page_size=page_size):
+            for name, doc in partition:
                 yield name, doc
 
     def __repr__(self):
@@ -549,7 +913,18 @@ class BlueskyRun(intake.catalog.Catalog):
     container = 'bluesky-run'
     version = '0.0.1'
     partition_access = True
+    # Partitions hold up to PARTITION_SIZE documents, or fewer if the filled
+    # Events are estimated (from their EventDescriptors) to take more than
+    # about PARTITION_BYTES. See estimate_event_size. Unfilled partitions
+    # have the same bounds, though their Events are smaller: a partition
+    # index must select the same Events filled or not, and a
+    # RemoteBlueskyRun is told only one npartitions for both. So with large
+    # external data, unfilled partitions are smaller, and more, than bytes
+    # alone would call for.
     PARTITION_SIZE = 100
+    PARTITION_BYTES = 2**26
+    # read_partition_unfilled keeps the Datums of up to this many Resources.
+    DATUM_CACHE_SIZE = 8
 
     def __init__(self,
                  get_run_start,
@@ -575,6 +950,7 @@ class BlueskyRun(intake.catalog.Catalog):
         self._lookup_resource_for_datum = lookup_resource_for_datum
         self._get_datum_pages = get_datum_pages
         self.filler = filler
+        self._datum_cache = {}  # See _get_datums.
         super().__init__(**kwargs)
 
     def __repr__(self):
@@ -607,7 +983,13 @@ class BlueskyRun(intake.catalog.Catalog):
         for doc in self._descriptors:
             count += self._get_event_count(doc['uid'])
         count += (self._run_stop_doc is not None)
-        self.npartitions = int(numpy.ceil(count / self.PARTITION_SIZE))
+        # This depends only on the EventDescriptors, so the partitions of a
+        # Run do not change from one reading to the next.
+        event_size = max(map(estimate_event_size, self._descriptors),
+                         default=0)
+        self._partition_size = max(1, min(
+            self.PARTITION_SIZE, self.PARTITION_BYTES // max(1, event_size)))
+        self.npartitions = int(numpy.ceil(count / self._partition_size))
 
         self._schema = intake.source.base.Schema(
             datashape=None,
@@ -668,13 +1050,73 @@ class BlueskyRun(intake.catalog.Catalog):
             for name, doc in self.read_partition((i, True)):
                 yield name, doc
 
+    def canonical_pages(self, page_size=100):
+        """
+        Yield the documents of canonical(), with Events in pages.
+
+        The Events, in the same order as canonical(), are packed into pages of
+        at most ``page_size``, a new one wherever the EventDescriptor changes,
+        as ``pack_pages`` does, and filled a page at a time.
+
+        Parameters
+        ----------
+        page_size : int, optional
+            Most Events per page
+        """
+        yield from self._canonical_pages(False, page_size)
+
+    def canonical_pages_unfilled(self, page_size=100):
+        """
+        Yield the documents of canonical_unfilled(), with Events and Datums in
+        pages.
+
+        Ahead of each EventPage come the Resources, and a DatumPage for each,
+        that it references and that have not come before. See
+        canonical_pages().
+
+        Parameters
+        ----------
+        page_size : int, optional
+            Most Events per page
+        """
+        yield from self._canonical_pages(True, page_size)
+
+    def _canonical_pages(self, raw, page_size):
+        self._load()
+        yield 'start', self._get_run_start()
+        for descriptor in self._descriptors:
+            if not raw:
+                self.filler('descriptor', descriptor)
+            yield 'descriptor', descriptor
+        emitted = set()
+        events = interlace_event_pages(
+            *(self._get_event_pages(descriptor_uid=doc['uid'])
+              for doc in self._descriptors))
+        pages = pack_pages((('event', event) for event in events), page_size)
+        for _, page in pages:
+            if raw:
+                datum_ids = (
+                    datum_id
+                    for key, filled in page.get('filled', {}).items()
+                    for datum_id, is_filled in zip(page['data'][key], filled)
+                    if not is_filled)
+                yield from self._datum_documents(datum_ids, emitted)
+            else:
+                page = _fill(self.filler, 'event_page', page,
+                             self._get_resource,
+                             self._lookup_resource_for_datum,
+                             self._get_datum_pages)
+            yield 'event_page', page
+        if self._run_stop_doc is not None:
+            yield 'stop', self._run_stop_doc
+
     def read_partition_unfilled(self, i):
         """Fetch one chunk of documents.
         """
         self._load()
         payload = []
-        start = i * self.PARTITION_SIZE
-        stop = (1 + i) * self.PARTITION_SIZE
+        start = i * self._partition_size
+        stop = (1 + i) * self._partition_size
         if start < self._offset:
             payload.extend(
                 itertools.islice(
@@ -684,48 +1126,144 @@ class BlueskyRun(intake.catalog.Catalog):
                     start,
                     stop))
         descriptor_uids = [doc['uid'] for doc in self._descriptors]
-        skip = max(0, start - len(payload))
+        skip = max(0, start - self._offset)
         limit = stop - start - len(payload)
-        # print('start, stop, skip, limit', start, stop, skip, limit)
-        datum_ids = set()
         if limit > 0:
 
-            events = itertools.islice(interlace_event_pages(
+            events = list(itertools.islice(interlace_event_pages(
                     *(self._get_event_pages(descriptor_uid=descriptor_uid)
-                      for descriptor_uid in descriptor_uids)), skip, limit)
-
-            for event in events:
-                for key, is_filled in event['filled'].items():
-                    if not is_filled:
-                        datum_id = event['data'][key]
-                        if datum_id not in datum_ids:
-                            if '/' in datum_id:
-                                resource_uid, _ = datum_id.split('/', 1)
-                            else:
-                                resource_uid = self._lookup_resource_for_datum(datum_id)
-                            resource = self._get_resource(uid=resource_uid)
-                            payload.append(('resource', resource))
-                            for datum_page in self._get_datum_pages(resource_uid):
-                                # TODO Greedily cache but lazily emit.
-                                payload.append(('datum_page', datum_page))
-                                datum_ids |= set(datum_page['datum_id'])
-                payload.append(('event', event))
+                      for descriptor_uid in descriptor_uids)), skip, skip + limit))
+
+            # Emit only the Datums that these Events reference ahead of them.
+            payload.extend(self._datum_documents(
+                event['data'][key]
+                for event in events
+                for key, is_filled in event['filled'].items()
+                if not is_filled))
+            payload.extend(('event', event) for event in events)
             if i == self.npartitions - 1 and self._run_stop_doc is not None:
                 payload.append(('stop', self._run_stop_doc))
         for _, doc in payload:
             doc.pop('_id', None)
         return payload
 
+    def _datum_documents(self, datum_ids, emitted=None):
+        """
+        Return the Resources, and Datums, that these datum_ids reference.
+
+        Each Resource is followed by one DatumPage of its referenced Datums.
+        Documents whose uid or datum_id is in ``emitted`` are left out, and
+        those returned are added to it.
+        """
+        if emitted is None:
+            emitted = set()
+        referenced = {}  # {resource_uid: {datum_id: datum}}
+        for datum_id in datum_ids:
+            if datum_id in emitted:
+                continue
+            resource_uid = self._resource_for_datum(datum_id)
+            datums = referenced.setdefault(resource_uid, {})
+            if datum_id not in datums:
+                datum = self._get_datums(resource_uid).get(datum_id)
+                if datum is not None:
+                    datums[datum_id] = datum
+        documents = []
+        for resource_uid, datums in referenced.items():
+            if resource_uid not in emitted:
+                emitted.add(resource_uid)
+                documents.append(
+                    ('resource', self._get_resource(uid=resource_uid)))
+            if datums:
+                emitted.update(datums)
+                documents.append(
+                    ('datum_page', event_model.pack_datum_page(*datums.values())))
+        return documents
+
+    def _get_datums(self, resource_uid):
+        """
+        Return ``{datum_id: datum}`` for all of a Resource's Datums.
+
+        The Datums of the last few Resources are kept, so that later
+        partitions do not fetch them again.
+        """
+        # Replace the dict rather than mutate it, so that threads reading
+        # partitions concurrently need no lock.
+        cache = self._datum_cache
+        try:
+            return cache[resource_uid]
+        except KeyError:
+            pass
+        datums = {datum['datum_id']: datum
+                  for datum_page in self._get_datum_pages(resource_uid)
+                  for datum in event_model.unpack_datum_page(datum_page)}
+        kept = list(cache.items())
+        kept = kept[max(0, len(kept) + 1 - self.DATUM_CACHE_SIZE):]
+        self._datum_cache = dict(kept + [(resource_uid, datums)])
+        return datums
+
+    def _resource_for_datum(self, datum_id):
+        if '/' in datum_id:
+            resource_uid, _ = datum_id.split('/', 1)
+            return resource_uid
+        for resource_uid, datums in self._datum_cache.items():
+            if datum_id in datums:
+                return resource_uid
+        return self._lookup_resource_for_datum(datum_id)
+
+    def read_stream(self, stream_name, include=None, exclude=None,
+                    seq_num=None, time=None):
+        """
+        Read some fields and some Events from one stream.
+
+        Parameters
+        ----------
+        stream_name : str
+        include : list, optional
+            Fields ('data keys') to include. By default all are included.
+        exclude : list, optional
+            Fields ('data keys') to exclude. By default none are excluded.
+        seq_num : tuple, optional
+            ``(start, stop)``. Read Events with ``start <= seq_num < stop``.
+            Either bound may be None.
+        time : tuple, optional
+            ``(start, stop)``, the same for Event time
+
+        Returns
+        -------
+        dataset : xarray.Dataset
+        """
+        partition = dict(stream=stream_name, include=include, exclude=exclude,
+                         seq_num=seq_num, time=time)
+        return columns_to_dataset(
+            columns for _, columns in self.read_partition(partition))
+
     def read_partition(self, index):
         """Fetch one chunk of documents.
+
+        ``index`` is ``(i, raw)``, or ``(i, raw, page_size)`` to pack the
+        partition's Events and Datums into pages, as
+        ``RemoteBlueskyRun.canonical_pages`` asks for. Or else it is a
+        dict of the parameters of ``read_stream``, with the stream name as
+        'stream', to fetch ``('columns', columns)`` pairs from
+        ``BlueskyEventStream.read_columns``.
         """
+        if isinstance(index, dict):
+            self._load()
+            params = {key: index[key] for key in ('include', 'exclude')
+                      if index.get(key) is not None}
+            stream = self[index['stream']](**params)
+            return [('columns', columns) for columns in stream.read_columns(
+                seq_num=index.get('seq_num'), time=index.get('time'))]
+        if len(index) == 3:
+            i, raw, page_size = index
+            return list(pack_pages(self.read_partition((i, raw)), page_size))
         i, raw = index
         if raw:
             return self.read_partition_unfilled(i)
         self._load()
         payload = []
-        start = i * self.PARTITION_SIZE
-        stop = (1 + i) * self.PARTITION_SIZE
+        start = i * self._partition_size
+        stop = (1 + i) * self._partition_size
         if start < self._offset:
             payload.extend(
                 itertools.islice(
@@ -735,18 +1273,19 @@ class BlueskyRun(intake.catalog.Catalog):
                     start,
                     stop))
         descriptor_uids = [doc['uid'] for doc in self._descriptors]
-        skip = max(0, start - len(payload))
+        skip = max(0, start - self._offset)
         limit = stop - start - len(payload)
         if limit > 0:
 
             events = itertools.islice(interlace_event_pages(
                     *(self._get_event_pages(descriptor_uid=descriptor_uid)
-                      for descriptor_uid in descriptor_uids)), skip, limit)
+                      for descriptor_uid in descriptor_uids)), skip, skip + limit)
 
             for descriptor in self._descriptors:
                 self.filler('descriptor', descriptor)
             for event in events:
-                self._fill(event)  # in place (for now)
+                _fill(self.filler, 'event', event, self._get_resource,
+                      self._lookup_resource_for_datum, self._get_datum_pages)
                 payload.append(('event', event))
             if i == self.npartitions - 1 and self._run_stop_doc is not None:
                 payload.append(('stop', self._run_stop_doc))
@@ -754,36 +1293,6 @@ class BlueskyRun(intake.catalog.Catalog):
             doc.pop('_id', None)
         return payload
 
-    def _fill(self, event, last_datum_id=None):
-        try:
-            self.filler('event', event)
-        except event_model.UnresolvableForeignKeyError as err:
-            datum_id = err.key
-            if datum_id == last_datum_id:
-                # We tried to fetch this Datum on the last trip
-                # trip through this method, and apparently it did not
-                # work. We are in an infinite loop. Bail!
-                raise
-
-            if '/' in datum_id:
-                resource_uid, _ = datum_id.split('/', 1)
-            else:
-                resource_uid = self._lookup_resource_for_datum(datum_id)
-
-            resource = self._get_resource(uid=resource_uid)
-            self.filler('resource', resource)
-            # Pre-fetch all datum for this resource.
-            for datum_page in self._get_datum_pages(
-                    resource_uid=resource_uid):
-                self.filler('datum_page', datum_page)
-            # TODO -- When to clear the datum cache in filler?
-
-            # Re-enter and try again now that the Filler has consumed the
-            # missing Datum. There might be another missing Datum in this same
-            # Event document (hence this re-entrant structure) or might be good
-            # to go.
-            self._fill(event, last_datum_id=datum_id)
-
     def read(self):
         raise NotImplementedError(
             "Reading the BlueskyRun itself is not supported. Instead read one "
@@ -822,6 +1331,8 @@ class BlueskyEventStream(intake_xarray.base.DataSourceMixin):
         Expected signature ``get_datum_pages(resource_uid) -> generator``
         where ``generator`` yields datum_page documents
     filler : event_model.Filler
+        If it is a DaskFiller, external fields are read lazily, as dask
+        arrays. Otherwise they are filled when the stream is read.
     metadata : dict
         passed through to base class
     include : list, optional
@@ -898,17 +1409,472 @@ class BlueskyEventStream(intake_xarray.base.DataSourceMixin):
             include=self.include,
             exclude=self.exclude)
 
+    def read_columns(self, seq_num=None, time=None):
+        """
+        Read Events from this stream as columns, a page at a time.
+
+        Only the fields selected by ``include`` and ``exclude`` are read and
+        filled, and only for Events in the given ranges. Configuration is not
+        included.
+
+        Parameters
+        ----------
+        seq_num : tuple, optional
+            ``(start, stop)``. Read Events with ``start <= seq_num < stop``.
+            Either bound may be None.
+        time : tuple, optional
+            ``(start, stop)``, the same for Event time
+
+        Yields
+        ------
+        columns : dict
+            The 'uid', 'time', and 'seq_num' of the Events, and dicts mapping
+            each field to its 'data', as arrays, and to its 'dims'.
+        """
+        descriptors = [doc for doc in self._get_event_descriptors()
+                       if doc.get('name') == self._stream_name]
+        if not descriptors:
+            return
+        for descriptor in descriptors:
+            # Not every Event Descriptor in a stream need have every field.
+            data_keys = descriptor['data_keys']
+            keys = _select_keys(data_keys, self.include, self.exclude)
+            needs_descriptor = True
+            for event_page in self._get_event_pages(descriptor['uid']):
+                selected = numpy.flatnonzero(
+                    _in_range(event_page['seq_num'], seq_num)
+                    & _in_range(event_page['time'], time))
+                if not len(selected):
+                    continue
+
+                def take(column):
+                    return [column[i] for i in selected]
+
+                page = {'descriptor': descriptor['uid'],
+                        'uid': take(event_page['uid']),
+                        'time': take(event_page['time']),
+                        'seq_num': take(event_page['seq_num']),
+                        'data': {key: take(event_page['data'][key])
+                                 for key in keys},
+                        'timestamps': {key: take(event_page['timestamps'][key])
+                                       for key in keys},
+                        'filled': {key: take(column) for key, column
+                                   in event_page.get('filled', {}).items()
+                                   if key in keys}}
+                if not all(all(column) for column in page['filled'].values()):
+                    if needs_descriptor:
+                        self.filler('descriptor', descriptor)
+                        needs_descriptor = False
+                    page = _fill(self.filler, 'event_page', page,
+                                 self._get_resource,
+                                 self._lookup_resource_for_datum,
+                                 self._get_datum_pages)
+                data = {key: numpy.asarray(page['data'][key]) for key in keys}
+                yield {'uid': page['uid'],
+                       'time': numpy.asarray(page['time']),
+                       'seq_num': numpy.asarray(page['seq_num']),
+                       'data': data,
+                       'dims': {key: _field_dims(data_keys[key],
+                                                 data[key].ndim - 1)
+                                for key in keys}}
+
+
+def _select_keys(data_keys, include, exclude):
+    "Apply ``include`` or ``exclude`` to a stream's data keys."
+    if include and exclude:
+        raise ValueError(
+            "The parameters `include` and `exclude` are mutually exclusive.")
+    if include:
+        return [key for key in data_keys if key in include]
+    if exclude:
+        return [key for key in data_keys if key not in exclude]
+    return list(data_keys)
+
+
+def _in_range(values, bounds):
+    "Mask the values within half-open ``(start, stop)`` bounds."
+    values = numpy.asarray(values)
+    mask = numpy.ones(len(values), dtype=bool)
+    if bounds is not None:
+        start, stop = bounds
+        if start is not None:
+            mask &= values >= start
+        if stop is not None:
+            mask &= values < stop
+    return mask
+
+
+def _field_dims(field_metadata, ndim):
+    "Name a field's dimensions, as reported or as xarray would by default."
+    dims = field_metadata.get('dims')
+    if dims is not None and len(dims) == ndim:
+        return tuple(dims)
+    return tuple(f'dim_{i}' for i in range(ndim))
+
+
+def _fill(filler, name, doc, get_resource, lookup_resource_for_datum,
+          get_datum_pages):
+    """
+    Fill a document, first giving filler any Resource and Datum it lacks.
+
+    Returns the filled document.
+    """
+    last_datum_id = None
+    while True:
+        try:
+            _, filled_doc = filler(name, doc)
+            return filled_doc
+        except event_model.UnresolvableForeignKeyError as err:
+            datum_id = err.key
+            if datum_id == last_datum_id:
+                # Fetching this Datum did not work last time. Bail!
+                raise
+            last_datum_id = datum_id
+            if '/' in datum_id:
+                resource_uid, _ = datum_id.split('/', 1)
+            else:
+                resource_uid = lookup_resource_for_datum(datum_id)
+            filler('resource', get_resource(resource_uid))
+            # Pre-fetch all datum for this resource.
+            for datum_page in get_datum_pages(resource_uid):
+                filler('datum_page', datum_page)
+
+
+def columns_to_dataset(columns):
+    """
+    Assemble the pages from ``BlueskyEventStream.read_columns`` into a Dataset.
+
+    Parameters
+    ----------
+    columns : iterable
+        of dicts yielded by ``BlueskyEventStream.read_columns``
+
+    Returns
+    -------
+    dataset : xarray.Dataset
+    """
+    # Group the pages by their fields, which may differ between Event
+    # Descriptors, and combine the groups as documents_to_xarray does.
+    groups = {}
+    for page in columns:
+        fields = tuple((key, tuple(dims)) for key, dims in page['dims'].items())
+        groups.setdefault(fields, []).append(page)
+    return _combine_blocks([_columns_block(pages) for pages in groups.values()])
+
+
+def _columns_block(columns):
+    "Make ``(times, data_vars)``, in time order, from pages with one set of fields."
+    times = numpy.concatenate([page['time'] for page in columns])
+    # Pages from more than one Event Descriptor may interleave in time.
+    order = numpy.argsort(times, kind='stable')
+    data_vars = {
+        key: (('time',) + tuple(dims),
+              numpy.concatenate([page['data'][key] for page in columns])[order])
+        for key, dims in columns[0]['dims'].items()}
+    data_vars['seq_num'] = (
+        ('time',), numpy.concatenate([page['seq_num'] for page in columns])[order])
+    data_vars['uid'] = (
+        ('time',), numpy.asarray([uid for page in columns
+                                  for uid in page['uid']])[order])
+    return times[order], data_vars
+
+
+# Rough sizes, in bytes, of a Python object held in a list or dict, and of a
+# document, used to estimate memory without walking every object.
+_OBJECT_SIZE = 100
+_DOCUMENT_SIZE = 4096
+
+
+class _Column:
+    """
+    A growable column of values.
+
+    Numbers are kept in a numpy array, which takes a fraction of the memory of
+    a list of Python numbers. Arrays of higher dimension, such as filled
+    images, are kept as the arrays that were added, as long as they have the
+    same shape after the first axis. Anything else, or numbers of mixed type,
+    fall back to a list. Values come back out as the type they went in as:
+    lists of Python numbers, or numpy arrays.
+    """
+    __slots__ = ('_array', '_size', '_chunks', '_chunk_offsets', '_list',
+                 '_pending', '_from_array')
+
+    # Values are added to the array in batches of about this many, so that
+    # adding one Event at a time is cheap.
+    BATCH_SIZE = 1024
+
+    def __init__(self):
+        self._array = None  # numbers, with room to grow
+        self._size = 0  # how much of _array is filled
+        self._chunks = None  # arrays of higher dimension, as added
+        self._chunk_offsets = None  # how many values come before each chunk
+        self._list = None  # everything, once numpy has been given up on
+        self._pending = []  # values waiting to be added to _array
+        self._from_array = None
+
+    def __len__(self):
+        if self._list is not None:
+            return len(self._list)
+        if self._chunks is not None:
+            return self._chunk_offsets[-1] + len(self._chunks[-1])
+        return self._size + len(self._pending)
+
+    @staticmethod
+    def _as_array(values):
+        "Convert values to a 1D numeric array if it can be done losslessly."
+        if isinstance(values, numpy.ndarray):
+            if values.ndim == 1 and values.dtype.kind in 'biufc':
+                return values
+            return None
+        # numpy would turn [1, 2.5] into [1.0, 2.5], which is not the same.
+        types = set(map(type, values))
+        if len(types) != 1 or not types <= {bool, int, float}:
+            return None
+        array = numpy.asarray(values)
+        if array.dtype.kind not in 'biuf':
+            # for example, integers too big for int64
+            return None
+        return array
+
+    @staticmethod
+    def _as_list(values):
+        "Convert values to a list, keeping arrays of higher dimension."
+        if isinstance(values, numpy.ndarray):
+            if values.ndim > 1:
+                return list(values)
+            return values.tolist()
+        return values
+
+    def _add_chunk(self, values):
+        "Add an array of higher dimension as it is, if it fits with the rest."
+        if self._chunks is None:
+            if self._array is not None or self._list is not None:
+                return False
+            self._chunks = [values]
+            self._chunk_offsets = [0]
+        elif values.shape[1:] == self._chunks[0].shape[1:]:
+            self._chunk_offsets.append(len(self))
+            self._chunks.append(values)
+        else:
+            return False
+        return True
+
+    def _add(self, values):
+        "Add values to the array or the chunks, or give up on numpy."
+        if (isinstance(values, numpy.ndarray) and values.ndim > 1
+                and self._add_chunk(values)):
+            return
+        array = None if self._chunks is not None else self._as_array(values)
+        if (array is not None and self._array is not None
+                and array.dtype.kind != self._array.dtype.kind):
+            array = None
+        if array is None:
+            if self._array is not None:
+                self._list = self._array[:self._size].tolist()
+            elif self._chunks is not None:
+                self._list = [row for chunk in self._chunks for row in chunk]
+            else:
+                self._list = []
+            self._list.extend(self._as_list(values))
+            self._array = None
+            self._chunks = self._chunk_offsets = None
+            return
+        if self._array is None:
+            dtype = array.dtype
+            self._array = numpy.empty(max(len(array), self.BATCH_SIZE), dtype)
+        else:
+            dtype = numpy.promote_types(self._array.dtype, array.dtype)
+        new_size = self._size + len(array)
+        if new_size > len(self._array) or dtype != self._array.dtype:
+            grown = numpy.empty(max(new_size, 2 * len(self._array)), dtype)
+            grown[:self._size] = self._array[:self._size]
+            self._array = grown
+        self._array[self._size:new_size] = array
+        self._size = new_size
+
+    def _flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self._add(pending)
+
+    def extend(self, values):
+        if not len(values):
+            return
+        if self._from_array is None:
+            self._from_array = isinstance(values, numpy.ndarray)
+        if self._list is not None:
+            self._list.extend(self._as_list(values))
+        elif isinstance(values, numpy.ndarray) or self._chunks is not None:
+            self._flush()
+            self._add(values)
+        else:
+            self._pending.extend(values)
+            if len(self._pending) >= self.BATCH_SIZE:
+                self._flush()
+
+    @property
+    def nbytes(self):
+        nbytes = len(self._pending) * _OBJECT_SIZE
+        if self._array is not None:
+            nbytes += self._array.nbytes
+        if self._chunks is not None:
+            nbytes += sum(chunk.nbytes for chunk in self._chunks)
+        if self._list is not None:
+            nbytes += sum(getattr(value, 'nbytes', _OBJECT_SIZE)
+                          for value in self._list)
+        return nbytes
+
+    def get(self, start, stop):
+        self._flush()
+        if self._chunks is not None:
+            stop = min(stop, len(self))
+            first = bisect.bisect_right(self._chunk_offsets, start) - 1
+            last = bisect.bisect_left(self._chunk_offsets, stop)
+            pieces = [
+                chunk[max(start - offset, 0):stop - offset]
+                for chunk, offset in zip(self._chunks[first:last],
+                                         self._chunk_offsets[first:last])]
+            return numpy.concatenate(pieces or [self._chunks[0][:0]])
+        if self._array is None:
+            values = (self._list or [])[start:stop]
+            if self._from_array:
+                return numpy.asarray(values)
+            return values
+        values = self._array[start:min(stop, self._size)]
+        if self._from_array:
+            return values.copy()
+        return values.tolist()
+
+
+class _PageColumns:
+    """
+    The contents of many EventPages or DatumPages, stored column by column.
+
+    Only pages with the same structure (keys) can be stored together.
+    """
+    __slots__ = ('_fixed', '_columns', '_nested', 'structure', 'count')
+
+    def __init__(self, page, fixed_keys):
+        self._fixed = {key: page[key] for key in fixed_keys}
+        self._columns = {}
+        self._nested = {}
+        for key, value in page.items():
+            if key in fixed_keys:
+                continue
+            if isinstance(value, dict):
+                self._nested[key] = {inner_key: _Column() for inner_key in value}
+            else:
+                self._columns[key] = _Column()
+        self.structure = self.structure_of(page)
+        self.count = 0
+
+    @staticmethod
+    def structure_of(page):
+        return tuple(
+            (key, tuple(value) if isinstance(value, dict) else None)
+            for key, value in page.items())
+
+    @property
+    def nbytes(self):
+        columns = list(self._columns.values())
+        for nested in self._nested.values():
+            columns.extend(nested.values())
+        return sum(column.nbytes for column in columns)
+
+    def append(self, page):
+        for key, column in self._columns.items():
+            column.extend(page[key])
+        for key, nested in self._nested.items():
+            for inner_key, column in nested.items():
+                column.extend(page[key][inner_key])
+        self.count = len(next(iter(self._columns.values())))
+
+    def pages(self, start, stop, page_size):
+        stop = min(stop, self.count)
+        for page_start in range(start, stop, page_size):
+            page_stop = min(page_start + page_size, stop)
+            page = dict(self._fixed)
+            for key, column in self._columns.items():
+                page[key] = column.get(page_start, page_stop)
+            for key, nested in self._nested.items():
+                page[key] = {inner_key: column.get(page_start, page_stop)
+                             for inner_key, column in nested.items()}
+            yield page
+
+
+class _PagedDocuments:
+    """
+    The EventPages of one descriptor, or DatumPages of one resource.
+
+    Pages are stored in columns. A page with a different structure from the
+    one before it starts a new set of columns.
+    """
+    __slots__ = ('_fixed_keys', '_segments', 'count')
+
+    def __init__(self, fixed_keys):
+        self._fixed_keys = fixed_keys
+        self._segments = []
+        self.count = 0
+
+    @property
+    def nbytes(self):
+        return sum(segment.nbytes for segment in self._segments)
+
+    def append(self, page):
+        structure = _PageColumns.structure_of(page)
+        if not self._segments or self._segments[-1].structure != structure:
+            self._segments.append(_PageColumns(page, self._fixed_keys))
+        segment = self._segments[-1]
+        self.count -= segment.count
+        segment.append(page)
+        self.count += segment.count
+
+    def pages(self, skip=0, limit=None, page_size=2500):
+        """
+        Yield pages holding items skip through skip + limit.
+        """
+        stop = self.count if limit is None else min(self.count, skip + limit)
+        offset = 0
+        for segment in self._segments:
+            if offset >= stop:
+                break
+            if skip < offset + segment.count:
+                yield from segment.pages(max(skip - offset, 0),
+                                         stop - offset, page_size)
+            offset += segment.count
+
 
 class DocumentCache(event_model.DocumentRouter):
+    """
+    Hold all the documents of one Run in memory.
+
+    EventPages and DatumPages are stored column by column rather than as the
+    documents that came in, and handed back out as pages of at most
+    ``PAGE_SIZE``.
+    """
+    PAGE_SIZE = 2500
+
     def __init__(self):
         self.descriptors = {}
         self.resources = {}
-        self.event_pages = collections.defaultdict(list)
-        self.datum_pages_by_resource = collections.defaultdict(list)
+        self._event_pages = collections.defaultdict(
+            functools.partial(_PagedDocuments, ('descriptor',)))
+        self._datum_pages = collections.defaultdict(
+            functools.partial(_PagedDocuments, ('resource',)))
         self.resource_uid_by_datum_id = {}
         self.start_doc = None
         self.stop_doc = None
 
+    @property
+    def nbytes(self):
+        "Estimate the memory held, in bytes."
+        pages = itertools.chain(self._event_pages.values(),
+                                self._datum_pages.values())
+        num_documents = 2 + len(self.descriptors) + len(self.resources)
+        return (sum(paged.nbytes for paged in pages)
+                + num_documents * _DOCUMENT_SIZE
+                + len(self.resource_uid_by_datum_id) * _OBJECT_SIZE)
+
     def start(self, doc):
         self.start_doc = doc
 
@@ -916,10 +1882,10 @@ class DocumentCache(event_model.DocumentRouter):
         self.stop_doc = doc
 
     def event_page(self, doc):
-        self.event_pages[doc['descriptor']].append(doc)
+        self._event_pages[doc['descriptor']].append(doc)
 
     def datum_page(self, doc):
-        self.datum_pages_by_resource[doc['resource']].append(doc)
+        self._datum_pages[doc['resource']].append(doc)
         for datum_id in doc['datum_id']:
             self.resource_uid_by_datum_id[datum_id] = doc['resource']
 
@@ -929,20 +1895,606 @@ class DocumentCache(event_model.DocumentRouter):
     def resource(self, doc):
         self.resources[doc['uid']] = doc
 
+    def get_event_pages(self, descriptor_uid, skip=0, limit=None):
+        """
+        Yield EventPages for the Events skip through skip + limit.
+        """
+        if descriptor_uid not in self._event_pages:
+            return iter(())
+        return self._event_pages[descriptor_uid].pages(skip, limit,
+                                                       self.PAGE_SIZE)
+
+    def get_event_count(self, descriptor_uid):
+        if descriptor_uid not in self._event_pages:
+            return 0
+        return self._event_pages[descriptor_uid].count
+
+    def get_datum_pages(self, resource_uid, skip=0, limit=None):
+        """
+        Yield DatumPages for the Datums skip through skip + limit.
+        """
+        if resource_uid not in self._datum_pages:
+            return iter(())
+        return self._datum_pages[resource_uid].pages(skip, limit,
+                                                     self.PAGE_SIZE)
+
+
+class RunCache:
+    """
+    Cache of parsed Runs, evicting the least recently used beyond a budget.
+
+    The same parsed documents are shared by every BlueskyRun opened from a
+    cached entry. Copies of a RunCache share the cache: it is not copied.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Approximate total memory to spend on the cached Runs. A Run larger
+        than this is not cached.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._items = collections.OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"<RunCache {len(self)} Runs, "
+                f"{self.nbytes} of {self.max_bytes} bytes>")
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        """
+        Return the value cached under key, or None.
+        """
+        with self._lock:
+            try:
+                value, _ = self._items[key]
+            except KeyError:
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value, nbytes):
+        """
+        Cache value under key, evicting others to stay within the budget.
+
+        A value larger than the whole budget is not cached, and any value
+        cached under the same key before is dropped, as it is stale.
+        """
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return
+            self._items[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_nbytes) = self._items.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __dask_tokenize__(self):
+        # Catalog entries' arguments are tokenized. Do not hash the contents.
+        return (type(self).__name__, id(self))
+
+
+def _sizeof(obj):
+    """
+    Estimate the memory held by obj and the objects it contains, in bytes.
+
+    Follows dicts, lists, tuples, sets, and the attributes of other objects,
+    including slots. Objects referenced more than once are counted once.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif not isinstance(obj, type):
+            if hasattr(obj, '__dict__'):
+                stack.append(vars(obj))
+            for cls in type(obj).__mro__:
+                for name in getattr(cls, '__slots__', ()):
+                    if hasattr(obj, name):
+                        stack.append(getattr(obj, name))
+    return total
+
+
+def _cached(run_cache, key, build):
+    """
+    Get a value from a RunCache, or build it and cache it.
+
+    If run_cache is None, just build it.
+    """
+    if run_cache is None:
+        return build()
+    value = run_cache.get(key)
+    if value is None:
+        value = build()
+        run_cache.put(key, value, value.nbytes)
+    return value
+
+
+class HandlerPool:
+    """
+    Share handler instances among Resources that refer to the same files.
+
+    ``event_model.Filler`` makes a handler for each Resource and keeps it for
+    as long as the Filler lives. With a pool, Resources that have the same
+    spec, root, resource_path, and resource_kwargs---even from different
+    Runs---share one handler, and at most ``max_open`` handlers are kept. The
+    least recently used beyond that are closed, if they have a ``close``
+    method, once no thread is using them, and reopened if needed again.
+
+    Copies of a HandlerPool share the pool: it is not copied.
+
+    Parameters
+    ----------
+    max_open : int
+        Most handlers to keep open at once.
+
+    Attributes
+    ----------
+    opened : int
+        Number of handlers made
+    closed : int
+        Number of handlers evicted from the pool
+    hits : int
+        Number of times an open handler was reused
+    """
+    def __init__(self, max_open):
+        self.max_open = max_open
+        self.opened = 0
+        self.closed = 0
+        self.hits = 0
+        self._handlers = collections.OrderedDict()
+        # Leases, by id of handler, and evicted handlers that are still leased
+        self._leases = collections.Counter()
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"<HandlerPool {len(self)} of {self.max_open} open, "
+                f"opened={self.opened} closed={self.closed} "
+                f"hits={self.hits}>")
+
+    def __len__(self):
+        return len(self._handlers)
+
+    def acquire(self, spec, handler_class, args, kwargs, owner=None):
+        """
+        Lease the handler for these arguments, making it if need be.
+
+        The handler is not closed, even if it is evicted from the pool, until
+        every lease on it is given back by :meth:`release`. A handler is only
+        shared among leases with the same ``owner``, such as a thread.
+        """
+        key = (spec, _freeze(args), _freeze(kwargs), owner)
+        with self._lock:
+            try:
+                handler = self._handlers[key]
+            except KeyError:
+                pass
+            else:
+                self._handlers.move_to_end(key)
+                self.hits += 1
+                self._leases[id(handler)] += 1
+                return handler
+        # Do not hold the lock while opening files.
+        handler = handler_class(*args, **kwargs)
+        with self._lock:
+            self.opened += 1
+            if key in self._handlers:
+                # Another thread made one first.
+                evicted = [handler]
+                handler = self._handlers[key]
+                self._handlers.move_to_end(key)
+            else:
+                evicted = []
+                self._handlers[key] = handler
+            self._leases[id(handler)] += 1
+            while len(self._handlers) > self.max_open:
+                _, evicted_handler = self._handlers.popitem(last=False)
+                evicted.append(evicted_handler)
+            self.closed += len(evicted)
+            evicted = self._retire(evicted)
+        _close_all(evicted)
+        return handler
+
+    def release(self, handler):
+        "Give back a lease from :meth:`acquire`."
+        with self._lock:
+            self._leases[id(handler)] -= 1
+            if self._leases[id(handler)]:
+                return
+            del self._leases[id(handler)]
+            handler = self._retired.pop(id(handler), None)
+        if handler is not None:
+            _close_all([handler])
+
+    @contextlib.contextmanager
+    def lease(self, spec, handler_class, args, kwargs, owner=None):
+        "Lease a handler, as :meth:`acquire` does, for a with block."
+        handler = self.acquire(spec, handler_class, args, kwargs, owner)
+        try:
+            yield handler
+        finally:
+            self.release(handler)
+
+    def _retire(self, evicted):
+        # Hold on to evicted handlers that are leased, to close them when they
+        # are released. Return the others, to close now. Call with the lock.
+        unleased = []
+        for handler in evicted:
+            if self._leases.get(id(handler)):
+                self._retired[id(handler)] = handler
+            else:
+                unleased.append(handler)
+        return unleased
+
+    def clear(self):
+        "Close all the handlers, or, if they are leased, once released."
+        with self._lock:
+            evicted = list(self._handlers.values())
+            self._handlers.clear()
+            self.closed += len(evicted)
+            evicted = self._retire(evicted)
+        _close_all(evicted)
+
+    def make_filler(self, handler_registry, **kwargs):
+        """
+        Make an event_model.Filler that gets its handlers from this pool.
+
+        Parameters
+        ----------
+        handler_registry : dict
+            Maps each asset spec to a handler class.
+        **kwargs :
+            Additional keyword arguments are passed through to
+            event_model.Filler.
+        """
+        pooled_registry = {}
+        for spec, handler_class in handler_registry.items():
+            if isinstance(handler_class, _PooledHandler):
+                if handler_class.pool is self:
+                    pooled_registry[spec] = handler_class
+                    continue
+                handler_class = handler_class.handler_class
+            pooled_registry[spec] = _PooledHandler(self, spec, handler_class)
+        # The Filler would otherwise keep every handler, by Resource, itself.
+        return event_model.Filler(pooled_registry,
+                                  handler_cache=_NoHandlerCache(), **kwargs)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        # Handlers hold open files; a pickled pool starts out empty.
+        return (type(self), (self.max_open,))
+
+    def __dask_tokenize__(self):
+        # Catalog entries' arguments are tokenized. Do not hash the contents.
+        return (type(self).__name__, id(self))
+
+
+class _PooledHandler:
+    """
+    Stand-in for a handler class in a Filler's handler registry.
+
+    Called as the handler class would be, it returns a :class:`_Lease`, which
+    leases a handler from the pool each time it is called. If per_thread is
+    True, each thread leases handlers of its own.
+    """
+    def __init__(self, pool, spec, handler_class, per_thread=False):
+        self.pool = pool
+        self.spec = spec
+        self.handler_class = handler_class
+        self.per_thread = per_thread
+
+    def __repr__(self):
+        return f"<pooled {self.handler_class!r}>"
+
+    def __call__(self, *args, **kwargs):
+        return _Lease(self.pool, self.spec, self.handler_class, args, kwargs,
+                      self.per_thread)
+
+
+class _Lease:
+    """
+    Stand-in for a handler, which holds a lease on it only while it is called.
+
+    The pool may evict the handler between calls. It is not closed during one.
+    """
+    def __init__(self, pool, spec, handler_class, args, kwargs,
+                 per_thread=False):
+        self.pool = pool
+        self.spec = spec
+        self.handler_class = handler_class
+        self.args = args
+        self.kwargs = kwargs
+        self.per_thread = per_thread
+
+    def __call__(self, *args, **kwargs):
+        owner = threading.get_ident() if self.per_thread else None
+        with self.pool.lease(self.spec, self.handler_class, self.args,
+                             self.kwargs, owner) as handler:
+            return handler(*args, **kwargs)
+
+
+class _NoHandlerCache(dict):
+    "A handler cache for event_model.Filler that does not keep anything."
+    def __setitem__(self, key, value):
+        pass
+
+
+def _close_all(handlers):
+    for handler in handlers:
+        close = getattr(handler, 'close', None)
+        if close is not None:
+            close()
+
+
+def _freeze(obj):
+    "Make a hashable equivalent of obj, made of dicts, lists, and scalars."
+    if isinstance(obj, dict):
+        return tuple(sorted((key, _freeze(value))
+                            for key, value in obj.items()))
+    if isinstance(obj, (list, tuple)):
+        return tuple(map(_freeze, obj))
+    return obj
+
+
+class DocumentIndex:
+    """
+    Record where the documents of one Run are, without holding onto the bulk.
+
+    RunStart, RunStop, EventDescriptor, and Resource documents are kept. For
+    Event, EventPage, Datum, and DatumPage documents only their positions, as
+    reported by the generator that produced them, are kept along with how
+    many Events or Datums come before each. The bulky documents can then be
+    read back lazily, a page at a time, starting from any one of them.
+    """
+    def __init__(self):
+        self.descriptors = {}
+        self.resources = {}
+        self.event_positions = collections.defaultdict(list)
+        self.event_offsets = collections.defaultdict(list)
+        self.event_counts = collections.defaultdict(int)
+        self.datum_positions = collections.defaultdict(list)
+        self.datum_offsets = collections.defaultdict(list)
+        self.datum_counts = collections.defaultdict(int)
+        self.resource_uid_by_datum_id = {}
+        self.start_doc = None
+        self.stop_doc = None
+
+    def __call__(self, position, name, doc):
+        if name == 'start':
+            self.start_doc = doc
+        elif name == 'stop':
+            self.stop_doc = doc
+        elif name == 'descriptor':
+            self.descriptors[doc['uid']] = doc
+        elif name == 'resource':
+            self.resources[doc['uid']] = doc
+        elif name == 'event':
+            self._add_event(doc['descriptor'], position, 1)
+        elif name == 'event_page':
+            self._add_event(doc['descriptor'], position, len(doc['seq_num']))
+        elif name == 'datum':
+            self._add_datum(doc['resource'], position, 1)
+            self.resource_uid_by_datum_id[doc['datum_id']] = doc['resource']
+        elif name == 'datum_page':
+            self._add_datum(doc['resource'], position, len(doc['datum_id']))
+            for datum_id in doc['datum_id']:
+                self.resource_uid_by_datum_id[datum_id] = doc['resource']
+
+    @property
+    def nbytes(self):
+        "Estimate the memory held, in bytes."
+        num_documents = 2 + len(self.descriptors) + len(self.resources)
+        # a position and an offset for each
+        num_positions = sum(map(len, itertools.chain(
+            self.event_positions.values(), self.datum_positions.values())))
+        return (num_documents * _DOCUMENT_SIZE
+                + (2 * num_positions + len(self.resource_uid_by_datum_id))
+                * _OBJECT_SIZE)
+
+    def _add_event(self, descriptor_uid, position, count):
+        self.event_positions[descriptor_uid].append(position)
+        self.event_offsets[descriptor_uid].append(
+            self.event_counts[descriptor_uid])
+        self.event_counts[descriptor_uid] += count
+
+    def _add_datum(self, resource_uid, position, count):
+        self.datum_positions[resource_uid].append(position)
+        self.datum_offsets[resource_uid].append(
+            self.datum_counts[resource_uid])
+        self.datum_counts[resource_uid] += count
+
+
+def _seek(positions, offsets, skip, limit):
+    """
+    Find the positions holding items skip through skip + limit.
+
+    offsets gives the number of items before each position. Return those
+    positions and how many items to skip in the first of them.
+    """
+    start = max(bisect.bisect_right(offsets, skip) - 1, 0)
+    if limit is None:
+        stop = len(positions)
+    else:
+        stop = bisect.bisect_left(offsets, skip + limit, start)
+    if start >= stop:
+        return [], 0
+    return positions[start:stop], skip - offsets[start]
+
+
+def _slice_page(page, start, stop, fixed_keys):
+    "Slice every column of an EventPage or DatumPage."
+    return {key: (value if key in fixed_keys
+                  else {inner_key: inner_value[start:stop]
+                        for inner_key, inner_value in value.items()}
+                  if isinstance(value, dict)
+                  else value[start:stop])
+            for key, value in page.items()}
+
+
+def _slice_pages(pages, skip, limit, length_key, fixed_keys):
+    """
+    Yield the items skip through skip + limit of pages, splitting pages.
+
+    length_key names a column whose length is the number of items in a page.
+    """
+    stop = None if limit is None else skip + limit
+    offset = 0
+    for page in pages:
+        if stop is not None and offset >= stop:
+            break
+        length = len(page[length_key])
+        page_start = max(skip - offset, 0)
+        page_stop = length if stop is None else min(stop - offset, length)
+        if page_start < page_stop:
+            if page_start == 0 and page_stop == length:
+                yield page
+            else:
+                yield _slice_page(page, page_start, page_stop, fixed_keys)
+        offset += length
+
+
+def _repage(items, name, pack, page_size):
+    """
+    Pack the (name, doc) pairs in items into pages of at most page_size.
+
+    Documents that are already pages pass through as they are.
+    """
+    buffer = []
+    for item_name, doc in items:
+        if item_name == name:
+            buffer.append(doc)
+            if len(buffer) == page_size:
+                yield pack(*buffer)
+                buffer.clear()
+        else:
+            if buffer:
+                yield pack(*buffer)
+                buffer.clear()
+            yield doc
+    if buffer:
+        yield pack(*buffer)
+
 
 class BlueskyRunFromGenerator(BlueskyRun):
+    """
+    Catalog representing one Run, backed by a generator of documents.
+
+    Parameters
+    ----------
+    gen_func : callable
+        Expected signature ``gen_func(*gen_args, **gen_kwargs) -> generator``
+        where ``generator`` yields (name, doc) pairs
+    gen_args : tuple
+    gen_kwargs : dict
+    filler : event_model.Filler, optional
+    index_func : callable, optional
+        Expected signature
+        ``index_func(*gen_args, **gen_kwargs) -> generator``
+        where ``generator`` yields (start, stop, (name, doc)) giving the
+        position of each document. If this and ``read_func`` are given, the
+        Run is *streamed*: only its small documents are kept in memory, and
+        Events and Datums are read back from their positions on demand.
+    read_func : callable, optional
+        Expected signature
+        ``read_func(*gen_args, positions, **gen_kwargs) -> generator``
+        where ``generator`` yields the (name, doc) pair at each position.
+    tail_func : callable, optional
+        Expected signature
+        ``tail_func(*gen_args, offset, **gen_kwargs) -> generator``
+        where ``generator`` yields (start, stop, (name, doc)) for each
+        complete document from ``offset`` on. If given, the Run is *live*: it
+        reads its documents with this, instead of ``gen_func`` or
+        ``index_func``, and each time it is reloaded it reads only the
+        documents added since the last time.
+    run_cache : RunCache, optional
+        If given, along with ``cache_key``, look for the parsed documents in
+        this cache before reading them, and add them to it after. Live Runs,
+        which change, are not cached.
+    cache_key : hashable, optional
+        Identifies what the generator yields, such as
+        ``(filename, mtime, size)``.
+    **kwargs :
+        Additional keyword arguments are passed through to the base class,
+        BlueskyRun.
+    """
+    # Group single Events and Datums read back in streaming mode into pages of
+    # at most this many.
+    STREAM_PAGE_SIZE = 2500
 
-    def __init__(self, gen_func, gen_args, gen_kwargs, filler=None, **kwargs):
+    # Reads any new documents, if the Run is live. See _follow.
+    _refresh = None
+
+    def __init__(self, gen_func, gen_args, gen_kwargs, filler=None,
+                 index_func=None, read_func=None, tail_func=None,
+                 run_cache=None, cache_key=None, **kwargs):
 
         if filler is None:
             filler = event_model.Filler({}, inplace=True)
 
-        document_cache = DocumentCache()
+        if (index_func is None) != (read_func is None):
+            raise ValueError(
+                "The parameters `index_func` and `read_func` must be given "
+                "together.")
+        if run_cache is not None and cache_key is None:
+            raise ValueError(
+                "The parameter `cache_key` must be given with `run_cache`.")
+        if index_func is not None:
+            self._init_streaming(gen_args, gen_kwargs, filler, index_func,
+                                 read_func, tail_func, run_cache, cache_key,
+                                 **kwargs)
+            return
+
+        if tail_func is None:
+            def parse():
+                document_cache = DocumentCache()
+                for item in gen_func(*gen_args, **gen_kwargs):
+                    document_cache(*item)
 
-        for item in gen_func(*gen_args, **gen_kwargs):
-            document_cache(*item)
+                assert document_cache.start_doc is not None
+                return document_cache
 
-        assert document_cache.start_doc is not None
+            document_cache = _cached(run_cache, ('documents', cache_key),
+                                     parse)
+        else:
+            document_cache = DocumentCache()
+            self._follow(tail_func, gen_args, gen_kwargs,
+                         lambda position, name, doc: document_cache(name, doc))
 
         def get_run_start():
             return document_cache.start_doc
@@ -954,13 +2506,10 @@ class BlueskyRunFromGenerator(BlueskyRun):
             return document_cache.descriptors.values()
 
         def get_event_pages(descriptor_uid, skip=0, limit=None):
-            if skip != 0 and limit is not None:
-                raise NotImplementedError
-            return document_cache.event_pages[descriptor_uid]
+            return document_cache.get_event_pages(descriptor_uid, skip, limit)
 
         def get_event_count(descriptor_uid):
-            return sum(len(page['seq_num'])
-                       for page in (document_cache.event_pages[descriptor_uid]))
+            return document_cache.get_event_count(descriptor_uid)
 
         def get_resource(uid):
             return document_cache.resources[uid]
@@ -969,9 +2518,81 @@ class BlueskyRunFromGenerator(BlueskyRun):
             return document_cache.resource_uid_by_datum_id[datum_id]
 
         def get_datum_pages(resource_uid, skip=0, limit=None):
-            if skip != 0 and limit is not None:
-                raise NotImplementedError
-            return document_cache.datum_pages_by_resource[resource_uid]
+            return document_cache.get_datum_pages(resource_uid, skip, limit)
+
+        super().__init__(
+            get_run_start=get_run_start,
+            get_run_stop=get_run_stop,
+            get_event_descriptors=get_event_descriptors,
+            get_event_pages=get_event_pages,
+            get_event_count=get_event_count,
+            get_resource=get_resource,
+            lookup_resource_for_datum=lookup_resource_for_datum,
+            get_datum_pages=get_datum_pages,
+            filler=filler,
+            **kwargs)
+
+    def _init_streaming(self, gen_args, gen_kwargs, filler, index_func,
+                        read_func, tail_func, run_cache, cache_key, **kwargs):
+        if tail_func is None:
+            def index():
+                document_index = DocumentIndex()
+                for start, _, item in index_func(*gen_args, **gen_kwargs):
+                    document_index(start, *item)
+
+                assert document_index.start_doc is not None
+                return document_index
+
+            document_index = _cached(run_cache, ('index', cache_key), index)
+        else:
+            document_index = DocumentIndex()
+            self._follow(tail_func, gen_args, gen_kwargs, document_index)
+
+        def read(positions):
+            return read_func(*gen_args, positions=positions, **gen_kwargs)
+
+        # Do not refer to self in these closures: dask tokenizes them by
+        # pickling, and unpickling a Run initializes it afresh, which would
+        # tokenize them again.
+        page_size = self.STREAM_PAGE_SIZE
+
+        def get_run_start():
+            return document_index.start_doc
+
+        def get_run_stop():
+            return document_index.stop_doc
+
+        def get_event_descriptors():
+            return document_index.descriptors.values()
+
+        def get_event_pages(descriptor_uid, skip=0, limit=None):
+            positions, skip = _seek(
+                document_index.event_positions[descriptor_uid],
+                document_index.event_offsets[descriptor_uid], skip, limit)
+            pages = _repage(read(positions), 'event',
+                            event_model.pack_event_page,
+                            page_size)
+            return _slice_pages(pages, skip, limit, 'seq_num',
+                                ('descriptor',))
+
+        def get_event_count(descriptor_uid):
+            return document_index.event_counts[descriptor_uid]
+
+        def get_resource(uid):
+            return document_index.resources[uid]
+
+        def lookup_resource_for_datum(datum_id):
+            return document_index.resource_uid_by_datum_id[datum_id]
+
+        def get_datum_pages(resource_uid, skip=0, limit=None):
+            positions, skip = _seek(
+                document_index.datum_positions[resource_uid],
+                document_index.datum_offsets[resource_uid], skip, limit)
+            pages = _repage(read(positions), 'datum',
+                            event_model.pack_datum_page,
+                            page_size)
+            return _slice_pages(pages, skip, limit, 'datum_id',
+                                ('resource',))
 
         super().__init__(
             get_run_start=get_run_start,
@@ -985,6 +2606,32 @@ class BlueskyRunFromGenerator(BlueskyRun):
             filler=filler,
             **kwargs)
 
+    def _follow(self, tail_func, gen_args, gen_kwargs, consume):
+        """
+        Make this Run live: read new documents each time it is reloaded.
+
+        Documents are passed to ``consume(position, name, doc)``. Only
+        complete documents are consumed; a partially-written one at the end is
+        read on a later reload, once it is complete.
+        """
+        offset = 0
+
+        def refresh():
+            nonlocal offset
+            for start, stop, item in tail_func(*gen_args, offset=offset,
+                                               **gen_kwargs):
+                consume(start, *item)
+                offset = stop
+
+        self._refresh = refresh
+
+    def force_reload(self):
+        # This is called by Catalog.__init__ and by reload(), but not when
+        # partitions are read, so a live Run only grows when asked to.
+        if self._refresh is not None:
+            self._refresh()
+        super().force_reload()
+
 
 def _transpose(in_data, keys, field):
     """Turn a list of dicts into dict of lists
@@ -1078,6 +2725,176 @@ def parse_handler_registry(handler_registry):
     return result
 
 
+def make_filler(handler_registry, handler_pool=None):
+    """
+    Make the Filler for a Catalog from its handler_registry and handler_pool.
+
+    Parameters
+    ----------
+    handler_registry : dict or None
+        Maps each asset spec to a handler class or its 'import path'.
+    handler_pool : int or HandlerPool, optional
+        Most handlers to keep open, shared among Runs, or a HandlerPool. If
+        None, each Resource gets its own handler.
+
+    Returns
+    -------
+    filler, handler_pool : event_model.Filler, HandlerPool or None
+    """
+    parsed_handler_registry = parse_handler_registry(handler_registry or {})
+    if handler_pool is not None and not isinstance(handler_pool, HandlerPool):
+        handler_pool = HandlerPool(handler_pool)
+    if handler_pool is None:
+        filler = event_model.Filler(parsed_handler_registry, inplace=True)
+    else:
+        filler = handler_pool.make_filler(parsed_handler_registry,
+                                          inplace=True)
+    return filler, handler_pool
+
+
+def parallel_map(func, items, max_workers=1, pool='thread'):
+    """
+    Apply func to each of items, optionally on a pool of workers.
+
+    The results are returned in the same order as items, however many workers
+    there are.
+
+    Parameters
+    ----------
+    func : callable
+        Must be importable by name (e.g. a module-level function) if ``pool``
+        is ``'process'``.
+    items : iterable
+    max_workers : int, optional
+        If greater than 1, run on a pool of this many workers. By default,
+        run serially in this thread.
+    pool : {'thread', 'process'}, optional
+        Type of pool. A thread pool suits I/O-bound work, such as reading from
+        network filesystems; a process pool suits CPU-bound decoding.
+
+    Returns
+    -------
+    results : list
+    """
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    if pool == 'thread':
+        executor_class = concurrent.futures.ThreadPoolExecutor
+    elif pool == 'process':
+        executor_class = concurrent.futures.ProcessPoolExecutor
+    else:
+        raise ValueError(
+            f"pool must be 'thread' or 'process', not {pool!r}")
+    with executor_class(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
+
+
+def prefetch_map(func, items, max_in_flight=4, max_buffered_bytes=None):
+    """
+    Lazily apply func to each of items, running a few ahead on threads.
+
+    Results are yielded in the same order as items. While the caller works
+    on one, up to ``max_in_flight`` more are computed, which hides the
+    latency of I/O such as network requests.
+
+    Parameters
+    ----------
+    func : callable
+    items : iterable
+    max_in_flight : int, optional
+        Most items to work on, or hold the results of, at once.
+    max_buffered_bytes : int, optional
+        Do not start on another item if the results not yet yielded would
+        then take up more than this much memory. Results still being computed
+        are assumed to be as big as the average so far, so at first, until
+        one is finished, only one item is worked on. By default, there is no
+        limit but ``max_in_flight``.
+
+    Yields
+    ------
+    result
+    """
+    sizes = []
+
+    def sized(item):
+        result = func(item)
+        if max_buffered_bytes is not None:
+            sizes.append(_sizeof(result))
+        return result
+
+    def room_for_another():
+        if not pending or max_buffered_bytes is None:
+            return True
+        if not sizes:
+            return False
+        average = sum(sizes) / len(sizes)
+        return (len(pending) + 1) * average <= max_buffered_bytes
+
+    items = iter(items)
+    pending = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(max_in_flight) as executor:
+        try:
+            while True:
+                while len(pending) < max_in_flight and room_for_another():
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        break
+                    pending.append(executor.submit(sized, item))
+                if not pending:
+                    return
+                yield pending.popleft().result()
+        finally:
+            # If the caller stops early, do not fetch the rest.
+            for future in pending:
+                future.cancel()
+
+
+def prefix_bounds(prefix):
+    """
+    Bound the strings that start with a given prefix.
+
+    A string ``s`` starts with ``prefix`` exactly when
+    ``lower <= s < upper``. This holds in Python's ordering of strings and in
+    MongoDB's default one, so a prefix can be looked up in anything sorted,
+    such as a list (using bisect) or a database index.
+
+    Parameters
+    ----------
+    prefix : str
+
+    Returns
+    -------
+    lower, upper : str, str or None
+        ``upper`` is None if there is no upper bound.
+    """
+    stripped = prefix.rstrip(chr(sys.maxunicode))
+    if not stripped:
+        return prefix, None
+    return prefix, stripped[:-1] + chr(ord(stripped[-1]) + 1)
+
+
+def prefix_query(prefix):
+    """
+    MongoDB condition matching strings that start with a given prefix.
+
+    Unlike an unanchored ``$regex``, this range can be answered from an index.
+
+    Parameters
+    ----------
+    prefix : str
+
+    Returns
+    -------
+    condition : dict
+    """
+    lower, upper = prefix_bounds(prefix)
+    if upper is None:
+        return {'$gte': lower}
+    return {'$gte': lower, '$lt': upper}
+
+
 intake.registry['remote-bluesky-run'] = RemoteBlueskyRun
 intake.container.container_map['bluesky-run'] = RemoteBlueskyRun
 
@@ -1176,6 +2993,8 @@ def dataarray_page_to_dataset_page(dataarray_page):
 
 
 class DaskFiller(event_model.Filler):
+    # Most handlers each thread's Filler keeps open
+    HANDLER_CACHE_SIZE = 8
 
     def __init__(self, *args, inplace=False, **kwargs):
         if inplace:
@@ -1185,45 +3004,346 @@ class DaskFiller(event_model.Filler):
         # set inplace=True here, even though the user documents will never be
         # modified in place.
         super().__init__(*args, inplace=True, **kwargs)
+        # Maps (descriptor uid, key) to the (shape, dtype) of one frame.
+        self._frame_info = {}
 
     def event_page(self, doc):
-
-        @dask.delayed
-        def delayed_fill(event_page, key):
-            self.fill_event_page(event_page, include=key)
-            return numpy.asarray(event_page['data'][key])
-
         descriptor = self._descriptor_cache[doc['descriptor']]
         needs_filling = {key for key, val in descriptor['data_keys'].items()
                          if 'external' in val}
-        filled_doc = copy.deepcopy(doc)
+        # Copy only the mappings that change, or that a consumer marking
+        # data as filled would change. Every other column is shared with the
+        # original, which is not modified.
+        filled_doc = dict(doc)
+        filled_doc['data'] = dict(doc['data'])
+        if 'filled' in doc:
+            filled_doc['filled'] = dict(doc['filled'])
 
         for key in needs_filling:
-            shape = extract_shape(descriptor, key)
-            dtype = extract_dtype(descriptor, key)
+            values = doc['data'][key]
+            filled = doc.get('filled', {}).get(key, [False] * len(values))
+            if not len(values):
+                continue
+            shape, dtype = self.frame_info(descriptor, key, values[0],
+                                           filled[0])
             filled_doc['data'][key] = array.from_delayed(
-                delayed_fill(filled_doc, key), shape=shape, dtype=dtype)
+                dask.delayed(self._fill_frames)(
+                    doc['descriptor'], key, list(values), list(filled)),
+                shape=(len(values),) + shape, dtype=dtype)
         return filled_doc
 
     def event(self, doc):
-
-        @dask.delayed
-        def delayed_fill(event, key):
-            self.fill_event(event, include=key)
-            return numpy.asarray(event['data'][key])
-
         descriptor = self._descriptor_cache[doc['descriptor']]
         needs_filling = {key for key, val in descriptor['data_keys'].items()
                          if 'external' in val}
-        filled_doc = copy.deepcopy(doc)
+        # Copy only the mappings that change, or that a consumer marking
+        # data as filled would change. Every other field is shared with the
+        # original, which is not modified.
+        filled_doc = dict(doc)
+        filled_doc['data'] = dict(doc['data'])
+        if 'filled' in doc:
+            filled_doc['filled'] = dict(doc['filled'])
 
         for key in needs_filling:
-            shape = extract_shape(descriptor, key)
-            dtype = extract_dtype(descriptor, key)
+            filled = doc.get('filled', {}).get(key, False)
+            shape, dtype = self.frame_info(descriptor, key, doc['data'][key],
+                                           filled)
             filled_doc['data'][key] = array.from_delayed(
-                delayed_fill(filled_doc, key), shape=shape, dtype=dtype)
+                dask.delayed(self._fill_frame)(
+                    doc['descriptor'], key, doc['data'][key], filled),
+                shape=shape, dtype=dtype)
         return filled_doc
 
+    def frame_info(self, descriptor, key, value, filled=False):
+        """
+        Find the shape and dtype of one frame of an external field.
+
+        The descriptor does not always report these reliably, so the first
+        time this is asked about a field of a given EventDescriptor it fills
+        one frame, ``value``, to find out. The answer is cached and used for
+        every lazy array of that field made after.
+
+        Parameters
+        ----------
+        descriptor : dict
+            EventDescriptor
+        key : str
+            Field ('data key')
+        value :
+            A datum_id for this field, from any Event using this descriptor.
+        filled : bool, optional
+            Whether ``value`` is already filled.
+
+        Returns
+        -------
+        shape, dtype : tuple, numpy.dtype
+            If the frame cannot be filled yet, because its Datum or Resource
+            has not been given to this Filler, fall back to what the
+            descriptor reports, and do not cache that. If the handler fails
+            to read it, fall back to the descriptor too, and cache that.
+        """
+        cache_key = (descriptor['uid'], key)
+        try:
+            return self._frame_info[cache_key]
+        except KeyError:
+            pass
+        reported = (tuple(extract_shape(descriptor, key)),
+                    extract_dtype(descriptor, key))
+        try:
+            frame = self._fill_frame(descriptor['uid'], key, value, filled)
+        except event_model.UnresolvableForeignKeyError:
+            return reported
+        except Exception:
+            # The handler failed. Making the lazy arrays must not, so go by
+            # the descriptor. Filling them will raise the error, if it lasts.
+            self._frame_info[cache_key] = reported
+            return reported
+        info = self._frame_info[cache_key] = (frame.shape, frame.dtype)
+        return info
+
+    def _fill_frame(self, descriptor_uid, key, value, filled):
+        """
+        Fill one field of one Event.
+
+        The base class fills a throwaway Event holding just this field, so
+        that nothing the user passed in is modified.
+        """
+        event = {'descriptor': descriptor_uid,
+                 'data': {key: value},
+                 'filled': {key: filled}}
+        self._thread_filler().fill_event(event, include=[key])
+        return numpy.asarray(event['data'][key])
+
+    def _thread_filler(self):
+        """
+        Return a Filler for the current thread's use only.
+
+        Tasks run concurrently under dask's threaded and distributed
+        schedulers. Each thread gets its own handlers, which need not be
+        thread-safe, and its own filling state, so no locks are taken. The
+        Resource, Datum, and EventDescriptor caches are shared: tasks only
+        read them. Each process builds its own Fillers, too: they are not
+        pickled.
+
+        Each thread keeps at most ``HANDLER_CACHE_SIZE`` handlers open. For
+        handlers from a HandlerPool in the handler registry, the pool keeps
+        them instead: this thread leases handlers of its own from it, which
+        count toward the pool's limit.
+        """
+        # Made on first use, and again after unpickling, which the base
+        # class may do without it.
+        per_thread = self.__dict__.get('_per_thread')
+        if per_thread is None:
+            per_thread = self.__dict__.setdefault('_per_thread', _PerThread())
+        try:
+            return per_thread.filler
+        except AttributeError:
+            # A pooled handler may be in use by other threads. Lease this
+            # thread's own from the pool instead.
+            handler_registry = {
+                spec: _PooledHandler(handler_class.pool, spec,
+                                     handler_class.handler_class,
+                                     per_thread=True)
+                if isinstance(handler_class, _PooledHandler) else handler_class
+                for spec, handler_class in self.handler_registry.items()}
+            filler = event_model.Filler(
+                handler_registry,
+                handler_cache=_LRUHandlerCache(self.HANDLER_CACHE_SIZE),
+                root_map=self.root_map,
+                resource_cache=self._resource_cache,
+                datum_cache=self._datum_cache,
+                descriptor_cache=self._descriptor_cache,
+                retry_intervals=self.retry_intervals,
+                inplace=True)
+            per_thread.filler = filler
+            return filler
+
+    def _fill_frames(self, descriptor_uid, key, values, filled):
+        "Fill one field of several Events, stacking the frames."
+        return numpy.asarray(
+            [self._fill_frame(descriptor_uid, key, value, is_filled)
+             for value, is_filled in zip(values, filled)])
+
+    def fill_event_pages(self, event_pages, chunk_size=100, include=None):
+        """
+        Make one dask array for each external field in a stream.
+
+        Unlike ``event`` and ``event_page``, which make a task for each field
+        of each Event, this makes a task for each chunk of frames, so the
+        size of the graph does not grow with the number of frames.
+
+        Parameters
+        ----------
+        event_pages : iterable
+            EventPages, all from one EventDescriptor, which this Filler must
+            already have been given. Datum and Resources must be given to it
+            before the arrays are computed; Datum given before this is called
+            are used to start a new chunk wherever the Resource changes.
+        chunk_size : int, optional
+            Most frames in one chunk.
+        include : list, optional
+            External fields to make arrays for. By default, all of them.
+
+        Returns
+        -------
+        arrays : dict
+            Maps each external field to a dask array with a frame for each
+            Event, stacked along the first axis. The shape and dtype of a
+            frame come from ``frame_info``.
+        """
+        event_pages = list(event_pages)
+        if not event_pages:
+            return {}
+        descriptor_uid = event_pages[0]['descriptor']
+        if any(page['descriptor'] != descriptor_uid for page in event_pages):
+            raise ValueError(
+                "All of the EventPages must come from one EventDescriptor.")
+        descriptor = self._descriptor_cache[descriptor_uid]
+        delayed_fill = dask.delayed(self._fill_frames)
+
+        arrays = {}
+        for key, data_key in descriptor['data_keys'].items():
+            if 'external' not in data_key:
+                continue
+            if include is not None and key not in include:
+                continue
+            values = []
+            filled = []
+            for page in event_pages:
+                values.extend(page['data'][key])
+                filled.extend(page.get('filled', {}).get(
+                    key, [False] * len(page['data'][key])))
+            if not len(values):
+                continue
+            shape, dtype = self.frame_info(descriptor, key, values[0],
+                                           filled[0])
+            chunks = []
+            for start, stop in self._chunk_bounds(values, filled, chunk_size):
+                chunks.append(array.from_delayed(
+                    delayed_fill(descriptor_uid, key, values[start:stop],
+                                 filled[start:stop]),
+                    shape=(stop - start,) + shape, dtype=dtype))
+            arrays[key] = array.concatenate(chunks)
+        return arrays
+
+    def _load_assets(self, datum_ids, get_resource, lookup_resource_for_datum,
+                     get_datum_pages):
+        """
+        Give this Filler the Resources and Datums it lacks for datum_ids.
+
+        All of a Resource's Datums are fetched at once, as ``_fill`` does.
+        """
+        for datum_id in datum_ids:
+            if datum_id in self._datum_cache:
+                continue
+            if '/' in datum_id:
+                resource_uid, _ = datum_id.split('/', 1)
+            else:
+                resource_uid = lookup_resource_for_datum(datum_id)
+            self('resource', get_resource(resource_uid))
+            for datum_page in get_datum_pages(resource_uid):
+                self('datum_page', datum_page)
+
+    def _chunk_bounds(self, datum_ids, filled, chunk_size):
+        """
+        Yield (start, stop) for chunks of at most chunk_size frames.
+
+        A chunk also ends where the Resource changes, so that each is read
+        with one handler. Datum that are not known yet, and data that is
+        already filled, do not end a chunk.
+        """
+        start = 0
+        resource_uid = None
+        for i, (datum_id, is_filled) in enumerate(zip(datum_ids, filled)):
+            if is_filled is False:
+                datum = self._datum_cache.get(datum_id)
+                if datum is not None:
+                    if resource_uid is not None and i > start and \
+                            datum['resource'] != resource_uid:
+                        yield start, i
+                        start = i
+                    resource_uid = datum['resource']
+            if i + 1 - start == chunk_size:
+                yield start, i + 1
+                start = i + 1
+        if start < len(datum_ids):
+            yield start, len(datum_ids)
+
+
+class _LRUHandlerCache(collections.OrderedDict):
+    """
+    A handler cache for event_model.Filler that keeps the most recently used.
+
+    Handlers beyond ``max_size`` are closed, if they have a ``close`` method.
+    Use it from one thread only.
+    """
+    def __init__(self, max_size):
+        super().__init__()
+        self.max_size = max_size
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_size:
+            _, evicted = self.popitem(last=False)
+            _close_all([evicted])
+
+    def __reduce__(self):
+        return (type(self), (self.max_size,))
+
+
+class _PerThread(threading.local):
+    "Thread-local storage that is pickled empty."
+    def __reduce__(self):
+        return (type(self), ())
+
+
+# Bytes per element for the JSON types that EventDescriptors report, and for
+# each Event's uid, time, seq_num, and so on
+_JSON_TYPE_SIZES = {'boolean': 1, 'integer': 8, 'number': 8, 'array': 8,
+                    'string': 64}
+_EVENT_OVERHEAD = 256
+
+
+def estimate_event_size(descriptor):
+    """
+    Estimate the size of one filled Event, in bytes, from its EventDescriptor.
+
+    Each field takes its number of elements, from its reported 'shape', times
+    the size of an element, from its 'dtype_str' if reported or else its
+    'dtype'. External fields are counted as filled. BlueskyRun sizes its
+    unfilled partitions by this too; see ``BlueskyRun.PARTITION_BYTES``.
+
+    Parameters
+    ----------
+    descriptor : dict
+        EventDescriptor document
+
+    Returns
+    -------
+    size : int
+    """
+    size = _EVENT_OVERHEAD
+    for key, data_key in descriptor['data_keys'].items():
+        try:
+            shape = extract_shape(descriptor, key)
+        except (RuntimeError, KeyError):
+            shape = data_key.get('shape') or ()
+        try:
+            itemsize = numpy.dtype(data_key['dtype_str']).itemsize
+        except (KeyError, TypeError):
+            itemsize = _JSON_TYPE_SIZES.get(data_key.get('dtype'), 8)
+        # Unknown lengths are reported as 0 or -1.
+        elements = int(numpy.prod([max(1, length or 1) for length in shape]))
+        # Also count the field's timestamp.
+        size += elements * itemsize + 8
+    return size
+
 
 def extract_shape(descriptor, key):
     """
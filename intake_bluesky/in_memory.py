@@ -1,13 +1,18 @@
+import bisect
+import collections
+import collections.abc
 import copy
-import event_model
+import itertools
 import intake
 import intake.catalog
 import intake.catalog.local
 import intake.source.base
 from mongoquery import Query
+import numbers
 
 
-from .core import parse_handler_registry
+from .core import make_filler
+from .core import prefix_bounds
 
 
 class SafeLocalCatalogEntry(intake.catalog.local.LocalCatalogEntry):
@@ -18,10 +23,137 @@ class SafeLocalCatalogEntry(intake.catalog.local.LocalCatalogEntry):
         return copy.deepcopy(super().describe())
 
 
+def _is_sequence(value):
+    return (isinstance(value, collections.abc.Sequence)
+            and not isinstance(value, str))
+
+
+class _FieldIndex:
+    """
+    Index of one RunStart field, used to narrow down searches.
+
+    Lookups give a superset of the uids of the runs that could match a
+    condition on the field, or None if the condition cannot be narrowed down.
+    The caller checks the candidates against the query itself, so the index
+    only has to be conservative, not exact. In particular, runs whose value is
+    a list or dict, which mongoquery matches element-wise, are always
+    candidates.
+    """
+    def __init__(self, field):
+        self.field = field
+        self._by_value = collections.defaultdict(set)
+        # Sorted (value, uid) keys, with the values alone alongside for
+        # bisecting by value.
+        self._sorted = {'number': ([], []), 'string': ([], [])}
+        self._unsortable = set()  # hashable, but neither numbers nor strings
+        self._other = set()  # lists, dicts, and other unhashable values
+
+    @staticmethod
+    def _kind(value):
+        if isinstance(value, str):
+            return 'string'
+        if isinstance(value, numbers.Real) and value == value:  # not NaN
+            return 'number'
+        return None
+
+    def add(self, uid, doc):
+        if self.field not in doc:
+            return
+        value = doc[self.field]
+        if isinstance(value, collections.abc.Mapping) or _is_sequence(value):
+            self._other.add(uid)
+            return
+        try:
+            self._by_value[value].add(uid)
+        except TypeError:
+            self._other.add(uid)
+            return
+        kind = self._kind(value)
+        if kind is None:
+            self._unsortable.add(uid)
+            return
+        keys, values = self._sorted[kind]
+        i = bisect.bisect_left(keys, (value, uid))
+        keys.insert(i, (value, uid))
+        values.insert(i, value)
+
+    def discard(self, uid, doc):
+        if self.field not in doc:
+            return
+        value = doc[self.field]
+        self._other.discard(uid)
+        self._unsortable.discard(uid)
+        try:
+            self._by_value[value].discard(uid)
+        except TypeError:
+            return
+        kind = self._kind(value)
+        if kind is None:
+            return
+        keys, values = self._sorted[kind]
+        i = bisect.bisect_left(keys, (value, uid))
+        if i < len(keys) and keys[i] == (value, uid):
+            del keys[i]
+            del values[i]
+
+    def _equal(self, value):
+        try:
+            found = self._by_value.get(value, ())
+        except TypeError:
+            found = ()
+        return set(found) | self._other
+
+    def _range(self, operator, bound):
+        kind = self._kind(bound)
+        if kind is None:
+            return None
+        keys, values = self._sorted[kind]
+        start, stop = 0, len(values)
+        if operator == '$gt':
+            start = bisect.bisect_right(values, bound)
+        elif operator == '$gte':
+            start = bisect.bisect_left(values, bound)
+        elif operator == '$lt':
+            stop = bisect.bisect_left(values, bound)
+        else:  # '$lte'
+            stop = bisect.bisect_right(values, bound)
+        found = {uid for _, uid in keys[start:stop]}
+        return found | self._unsortable | self._other
+
+    def candidates(self, condition):
+        if not isinstance(condition, collections.abc.Mapping):
+            return self._equal(condition)
+        result = None
+        for operator, argument in condition.items():
+            if operator == '$eq':
+                found = self._equal(argument)
+            elif operator == '$in' and _is_sequence(argument):
+                found = set().union(*map(self._equal, argument))
+            elif operator in ('$gt', '$gte', '$lt', '$lte'):
+                found = self._range(operator, argument)
+            else:
+                found = None
+            result = _intersect(result, found)
+        return result
+
+
+def _intersect(a, b):
+    "Intersect two sets of candidates, where None means 'all'."
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a & b
+
+
 class BlueskyInMemoryCatalog(intake.catalog.Catalog):
     name = 'bluesky-run-catalog'  # noqa
 
-    def __init__(self, handler_registry=None, query=None, **kwargs):
+    # RunStart fields indexed to speed up search()
+    INDEXED_FIELDS = ('time', 'plan_name', 'scan_id', 'sample')
+
+    def __init__(self, handler_registry=None, query=None, handler_pool=None,
+                 **kwargs):
         """
         This Catalog is backed by Python collections in memory.
 
@@ -37,24 +169,55 @@ class BlueskyInMemoryCatalog(intake.catalog.Catalog):
             ``{'SOME_SPEC': 'module.submodule.class_name'}``.
         query : dict, optional
             Mongo query that filters entries' RunStart documents
+        handler_pool : int or HandlerPool, optional
+            Share handlers among Resources that refer to the same files, and
+            keep at most this many open, closing the least recently used. A
+            HandlerPool may be given instead, to share one between Catalogs.
+            By default, each Resource gets its own handler, kept for the life
+            of the Catalog.
         **kwargs :
             Additional keyword arguments are passed through to the base class,
             Catalog.
         """
         self._query = query or {}
-        if handler_registry is None:
-            handler_registry = {}
-        parsed_handler_registry = parse_handler_registry(handler_registry)
-        self.filler = event_model.Filler(parsed_handler_registry, inplace=True)
+        self._query_matcher = Query(self._query)
+        self.filler, self._handler_pool = make_filler(handler_registry,
+                                                      handler_pool)
         self._uid_to_run_start_doc = {}
+        # Indexes maintained by upsert for __getitem__. Runs are ordered by a
+        # key (time, -n, uid) where n counts upserts of new uids, so that runs
+        # with equal times sort as they would in a stable sort by time.
+        self._upsert_counter = itertools.count()
+        self._uid_to_time_key = {}
+        self._time_keys = []  # sorted
+        self._scan_id_to_time_keys = collections.defaultdict(list)  # sorted
+        self._sorted_uids = []  # for looking up partial uids
+        self._field_indexes = [_FieldIndex(field)
+                               for field in self.INDEXED_FIELDS]
         super().__init__(**kwargs)
 
-    def upsert(self, start_doc, stop_doc, gen_func, gen_args, gen_kwargs):
-        if not Query(self._query).match(start_doc):
-            return
+    def upsert(self, start_doc, stop_doc, gen_func, gen_args, gen_kwargs,
+               **kwargs):
+        """
+        Add or replace the entry for one Run.
 
-        uid = start_doc['uid']
-        self._uid_to_run_start_doc[uid] = start_doc
+        Parameters
+        ----------
+        start_doc : dict
+            RunStart Document
+        stop_doc : dict or None
+            RunStop Document
+        gen_func : callable
+            Expected signature ``gen_func(*gen_args, **gen_kwargs) -> generator``
+            where ``generator`` yields the Run's (name, doc) pairs
+        gen_args : tuple
+        gen_kwargs : dict
+        **kwargs :
+            Additional keyword arguments are passed through to
+            BlueskyRunFromGenerator.
+        """
+        if not self._query_matcher.match(start_doc):
+            return
 
         entry = SafeLocalCatalogEntry(
             name=start_doc['uid'],
@@ -64,7 +227,8 @@ class BlueskyInMemoryCatalog(intake.catalog.Catalog):
             args={'gen_func': gen_func,
                   'gen_args': gen_args,
                   'gen_kwargs': gen_kwargs,
-                  'filler': self.filler},
+                  'filler': self.filler,
+                  **kwargs},
             cache=None,  # ???
             parameters=[],
             metadata={'start': start_doc, 'stop': stop_doc},
@@ -72,34 +236,134 @@ class BlueskyInMemoryCatalog(intake.catalog.Catalog):
             getenv=True,
             getshell=True,
             catalog=self)
+        self._insert(start_doc, entry)
+
+    def _insert(self, start_doc, entry):
+        uid = start_doc['uid']
+        self._index(start_doc)
+        self._uid_to_run_start_doc[uid] = start_doc
         self._entries[uid] = entry
 
+    def _index(self, start_doc):
+        "Add a RunStart document to the indexes, replacing any old version."
+        uid = start_doc['uid']
+        old_key = self._uid_to_time_key.get(uid)
+        if old_key is None:
+            n = next(self._upsert_counter)
+            bisect.insort(self._sorted_uids, uid)
+        else:
+            n = -old_key[1]
+            self._discard(self._time_keys, old_key)
+            old_doc = self._uid_to_run_start_doc[uid]
+            for field_index in self._field_indexes:
+                field_index.discard(uid, old_doc)
+            old_scan_id = old_doc.get('scan_id')
+            try:
+                self._discard(self._scan_id_to_time_keys[old_scan_id], old_key)
+            except TypeError:
+                # unhashable scan_id, never indexed
+                pass
+        key = (start_doc['time'], -n, uid)
+        self._uid_to_time_key[uid] = key
+        bisect.insort(self._time_keys, key)
+        try:
+            bisect.insort(self._scan_id_to_time_keys[start_doc.get('scan_id')],
+                          key)
+        except TypeError:
+            # An unhashable scan_id cannot equal an integer anyway.
+            pass
+        for field_index in self._field_indexes:
+            field_index.add(uid, start_doc)
+
+    @staticmethod
+    def _discard(keys, key):
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    def _candidates(self, query):
+        """
+        Narrow down the runs that could match a query, using the indexes.
+
+        Returns a superset of the uids of matching runs, in the order they
+        were added, or None if the query cannot be narrowed down.
+        """
+        indexes = {index.field: index for index in self._field_indexes}
+
+        def plan(query):
+            if not isinstance(query, collections.abc.Mapping):
+                return None
+            result = None
+            for key, condition in query.items():
+                if key == '$and' and _is_sequence(condition):
+                    found = None
+                    for subquery in condition:
+                        found = _intersect(found, plan(subquery))
+                elif key == '$or' and _is_sequence(condition):
+                    found = set()
+                    for subquery in condition:
+                        subquery_found = plan(subquery)
+                        if subquery_found is None:
+                            found = None
+                            break
+                        found |= subquery_found
+                elif key in indexes:
+                    found = indexes[key].candidates(condition)
+                else:
+                    found = None
+                result = _intersect(result, found)
+            return result
+
+        uids = plan(query)
+        if uids is None:
+            return None
+        return sorted(uids, key=lambda uid: -self._uid_to_time_key[uid][1])
+
     def search(self, query):
         """
         Return a new Catalog with a subset of the entries in this Catalog.
 
+        Runs are narrowed down using indexes on the fields in
+        ``INDEXED_FIELDS`` where the query allows, and then checked against
+        the query. Entries are shared with this Catalog, not rebuilt.
+
         Parameters
         ----------
         query : dict
         """
+        # Every entry here already matches self._query, so only the new
+        # query needs checking.
+        matcher = Query(query)
+        uids = self._candidates(query)
+        if uids is None:
+            uids = list(self._uid_to_run_start_doc)
         if self._query:
             query = {'$and': [self._query, query]}
         cat = type(self)(
             query=query,
-            handler_registry=self.filler.handler_registry,
             name='search results',
             getenv=self.getenv,
             getshell=self.getshell,
             auth=self.auth,
             metadata=(self.metadata or {}).copy(),
-            storage_options=self.storage_options)
-        for key, entry in self._entries.items():
-            args = entry._captured_init_kwargs['args']
-            cat.upsert(args['gen_func'],
-                       args['gen_args'],
-                       args['gen_kwargs'])
+            storage_options=self.storage_options,
+            **self._search_kwargs())
+        for uid in uids:
+            if uid in cat._uid_to_run_start_doc:
+                # cat loaded a newer version of it itself.
+                continue
+            start_doc = self._uid_to_run_start_doc[uid]
+            if matcher.match(start_doc):
+                cat._insert(start_doc, self._entries[uid])
         return cat
 
+    def _search_kwargs(self):
+        """
+        Arguments, particular to this class, for the Catalog made by search().
+        """
+        return {'handler_registry': self.filler.handler_registry,
+                'handler_pool': self._handler_pool}
+
     def __getitem__(self, name):
         # If this came from a client, we might be getting '-1'.
         try:
@@ -109,10 +373,13 @@ class BlueskyInMemoryCatalog(intake.catalog.Catalog):
                 uid = name
             else:
                 # Try looking up by *partial* uid.
-                matches = []
-                for uid, run_start_doc in list(self._uid_to_run_start_doc.items()):
-                    if uid.startswith(name):
-                        matches.append(uid)
+                lower, upper = prefix_bounds(name)
+                start = bisect.bisect_left(self._sorted_uids, lower)
+                if upper is None:
+                    stop = len(self._sorted_uids)
+                else:
+                    stop = bisect.bisect_left(self._sorted_uids, upper, start)
+                matches = self._sorted_uids[start:stop]
                 if not matches:
                     raise KeyError(name)
                 elif len(matches) > 1:
@@ -123,25 +390,21 @@ class BlueskyInMemoryCatalog(intake.catalog.Catalog):
                 else:
                     uid, = matches
         else:
-            # Sort in reverse chronological order (most recent first).
-            time_sorted = sorted(self._uid_to_run_start_doc.values(),
-                                 key=lambda doc: -doc['time'])
+            # The indexes are sorted in chronological order (most recent last).
             if N < 0:
                 # Interpret negative N as "the Nth from last entry".
-                if -N > len(time_sorted):
+                if -N > len(self._time_keys):
                     raise IndexError(
-                        f"Catalog only contains {len(time_sorted)} "
+                        f"Catalog only contains {len(self._time_keys)} "
                         f"runs.")
-                uid = time_sorted[-N - 1]['uid']
+                *_, uid = self._time_keys[N]
             else:
                 # Interpret positive N as
                 # "most recent entry with scan_id == N".
-                for run_start_doc in time_sorted:
-                    if run_start_doc.get('scan_id') == N:
-                        uid = run_start_doc['uid']
-                        break
-                else:
+                time_keys = self._scan_id_to_time_keys.get(N)
+                if not time_keys:
                     raise KeyError(f"No run with scan_id={N}")
+                *_, uid = time_keys[-1]
         return self._entries[uid]
 
     def __len__(self):
@@ -1,13 +1,89 @@
+import functools
 import glob
 import json
+import numpy
 import os
 import pathlib
 
 from .in_memory import BlueskyInMemoryCatalog
+from .compression import open_file
+from .core import parallel_map
+from .core import RunCache
 from .core import tail
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def gen(filename):
+
+def _orjson_loads(line):
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError:
+        # orjson is stricter than the standard library, which, for example,
+        # writes and reads NaN. Let the standard library have a go.
+        return json.loads(line)
+
+
+# Maps decoder name to a function that decodes one line. Only decoders whose
+# libraries are installed are listed.
+DECODERS = {'json': json.loads}
+if orjson is not None:
+    DECODERS['orjson'] = _orjson_loads
+
+
+def _columns_to_arrays(columns):
+    "Replace lists of numbers with numpy arrays, in place."
+    for key, column in columns.items():
+        try:
+            array = numpy.asarray(column)
+        except ValueError:
+            # Ragged
+            continue
+        if array.dtype.kind in 'biuf':
+            columns[key] = array
+
+
+def _decode(line, loads, numpy_arrays):
+    name, doc = loads(line)
+    if numpy_arrays and name == 'event_page':
+        _columns_to_arrays(doc['data'])
+        _columns_to_arrays(doc['timestamps'])
+    return name, doc
+
+
+@functools.lru_cache()
+def get_decoder(decoder='auto', numpy_arrays=False):
+    """
+    Get a function that decodes one line of a JSONL file into (name, doc).
+
+    Parameters
+    ----------
+    decoder: str, optional
+        Name of a decoder in ``DECODERS``. By default, use the fastest one
+        installed.
+    numpy_arrays: boolean, optional
+        If True, decode the numeric columns of EventPages' data and timestamps
+        as numpy arrays instead of lists. False by default.
+
+    Returns
+    -------
+    decode: callable
+        Expected signature ``decode(line) -> (name, doc)``
+    """
+    if decoder == 'auto':
+        decoder = 'orjson' if 'orjson' in DECODERS else 'json'
+    try:
+        loads = DECODERS[decoder]
+    except KeyError:
+        raise ValueError(
+            f"The decoder {decoder!r} is unknown or its library is not "
+            f"installed. The options are {list(DECODERS)}.") from None
+    return functools.partial(_decode, loads=loads, numpy_arrays=numpy_arrays)
+
+
+def gen(filename, decoder='auto', numpy_arrays=False):
     """
     A JSONL file generator.
 
@@ -15,14 +91,87 @@ def gen(filename):
     ----------
     filename: str
         JSONL file to load.
+    decoder: str, optional
+        See :func:`get_decoder`.
+    numpy_arrays: boolean, optional
+        See :func:`get_decoder`.
+    """
+    decode = get_decoder(decoder, numpy_arrays)
+    with open_file(filename) as file:
+        for line in file:
+            name, doc = decode(line)
+            yield (name, doc)
+
+
+def gen_with_offsets(filename, offset=0, decoder='auto', numpy_arrays=False):
+    """
+    A JSONL file generator that also reports where each document is.
+
+    Parameters
+    ----------
+    filename: str
+        JSONL file to load.
+    offset: int, optional
+        Byte offset of the line to start from. By default, start at the
+        beginning of the file.
+    decoder: str, optional
+        See :func:`get_decoder`.
+    numpy_arrays: boolean, optional
+        See :func:`get_decoder`.
+
+    Yields
+    ------
+    start, stop, (name, doc)
+        Byte offsets delimiting the line, and the document on it. A trailing
+        line that is incomplete, perhaps because the file is being written to,
+        is not yielded.
     """
-    with open(filename, 'r') as file:
+    decode = get_decoder(decoder, numpy_arrays)
+    with open_file(filename) as file:
+        file.seek(offset)
+        start = offset
         for line in file:
-            name, doc = json.loads(line)
+            stop = start + len(line)
+            if line.strip():
+                try:
+                    name, doc = decode(line)
+                except json.JSONDecodeError:
+                    if line.endswith(b'\n'):
+                        raise
+                    # This is a partially-written last line.
+                    return
+                yield start, stop, (name, doc)
+            start = stop
+
+
+def gen_at(filename, positions, decoder='auto', numpy_arrays=False):
+    """
+    Read the documents at the given byte offsets of a JSONL file.
+
+    Parameters
+    ----------
+    filename: str
+        JSONL file to load.
+    positions: iterable
+        Byte offsets of lines, as given by :func:`gen_with_offsets`.
+    decoder: str, optional
+        See :func:`get_decoder`.
+    numpy_arrays: boolean, optional
+        See :func:`get_decoder`.
+
+    Yields
+    ------
+    name, doc
+    """
+    decode = get_decoder(decoder, numpy_arrays)
+    with open_file(filename) as file:
+        for position in positions:
+            file.seek(position)
+            name, doc = decode(file.readline())
             yield (name, doc)
 
 
-def get_stop(filename):
+def get_stop(filename, decoder='auto'):
     """
     Returns the stop_doc of a Bluesky JSONL file.
 
@@ -32,16 +181,21 @@ def get_stop(filename):
     ----------
     filename: str
         JSONL file to load.
+    decoder: str, optional
+        See :func:`get_decoder`.
     Returns
     -------
     stop_doc: dict or None
         A Bluesky run_stop document or None if one is not present.
     """
+    decode = get_decoder(decoder)
     stop_doc = None
-    lastline, = tail(filename)
+    # If the file is being written to, its last line may be partial, in
+    # which case tail gives it along with the complete line before it.
+    *_, lastline = tail(filename)
     if lastline:
         try:
-            name, doc = json.loads(lastline)
+            name, doc = decode(lastline)
         except json.JSONDecodeError:
             ...
             # stop_doc will stay None if it can't be decoded correctly.
@@ -51,11 +205,32 @@ def get_stop(filename):
     return stop_doc
 
 
+def _read_header(filename, decoder='auto'):
+    """
+    Read the RunStart and RunStop documents from a JSONL file.
+
+    Returns None if the file is empty.
+    """
+    decode = get_decoder(decoder)
+    with open_file(filename) as file:
+        try:
+            name, start_doc = decode(file.readline())
+        except json.JSONDecodeError as e:
+            if not file.readline():
+                # Empty file, maybe being written to currently
+                return None
+            raise e
+    return start_doc, get_stop(filename, decoder)
+
+
 class BlueskyJSONLCatalog(BlueskyInMemoryCatalog):
     name = 'bluesky-jsonl-catalog'  # noqa
 
     def __init__(self, paths, *,
-                 handler_registry=None, query=None, **kwargs):
+                 handler_registry=None, query=None, stream=False, live=False,
+                 max_workers=1, pool='thread', run_cache=None,
+                 handler_pool=None, decoder='auto', numpy_arrays=False,
+                 **kwargs):
         """
         This Catalog is backed by a newline-delimited JSON (jsonl) file.
 
@@ -73,6 +248,40 @@ class BlueskyJSONLCatalog(BlueskyInMemoryCatalog):
             ``{'SOME_SPEC': 'module.submodule.class_name'}``.
         query : dict, optional
             Mongo query that filters entries' RunStart documents
+        stream : boolean, optional
+            If True, do not hold each Run's Events and Datums in memory when it
+            is opened, but read them back from the file as they are needed.
+            False by default.
+        live : boolean, optional
+            If True, Runs follow their files as they are written. Each time a
+            Run is reloaded, with its ``reload()`` or ``force_reload()``
+            method, it reads only what has been added to the end of its file
+            since the last time, stopping short of any partially-written
+            document. False by default.
+        max_workers : int, optional
+            If greater than 1, read the RunStart and RunStop documents of new
+            or changed files on a pool of this many workers. Entries are still
+            added in a deterministic order. By default, read them serially.
+        pool : {'thread', 'process'}, optional
+            Type of pool used when ``max_workers`` is greater than 1.
+            ``'thread'`` by default.
+        run_cache : int or RunCache, optional
+            Keep parsed Runs in memory, up to a budget of this many bytes, so
+            that opening a Run again does not re-read its file unless the
+            file has changed. A RunCache may be given instead, to share one
+            between Catalogs. By default, Runs are not kept.
+        handler_pool : int or HandlerPool, optional
+            Share handlers among Resources that refer to the same files, and
+            keep at most this many open, closing the least recently used. A
+            HandlerPool may be given instead, to share one between Catalogs.
+            By default, each Resource gets its own handler, kept for the life
+            of the Catalog.
+        decoder : str, optional
+            Name of the JSON decoder to use, one of ``DECODERS``. By default,
+            use the fastest one installed.
+        numpy_arrays : boolean, optional
+            If True, decode the numeric columns of EventPages as numpy arrays
+            instead of lists. False by default.
         **kwargs :
             Additional keyword arguments are passed through to the base class,
             Catalog.
@@ -81,48 +290,66 @@ class BlueskyJSONLCatalog(BlueskyInMemoryCatalog):
         if isinstance(paths, (str, pathlib.Path)):
             paths = [paths]
         self.paths = paths
-        self._filename_to_mtime = {}
+        self.stream = stream
+        self.live = live
+        self.max_workers = max_workers
+        self.pool = pool
+        self.decoder = decoder
+        self.numpy_arrays = numpy_arrays
+        if run_cache is not None and not isinstance(run_cache, RunCache):
+            run_cache = RunCache(run_cache)
+        self._run_cache = run_cache
+        # Files already read by the Catalog that this is a search result of
+        self._filename_to_mtime = dict(kwargs.pop('filename_to_mtime', {}))
         super().__init__(handler_registry=handler_registry,
                          query=query,
+                         handler_pool=handler_pool,
                          **kwargs)
 
     def _load(self):
+        filenames = []
+        cache_keys = []
         for path in self.paths:
-            for filename in glob.glob(path):
-                mtime = os.path.getmtime(filename)
+            for filename in sorted(glob.glob(path)):
+                stat = os.stat(filename)
+                mtime = stat.st_mtime
                 if mtime == self._filename_to_mtime.get(filename):
                     # This file has not changed since last time we loaded it.
                     continue
                 self._filename_to_mtime[filename] = mtime
-                with open(filename, 'r') as file:
-                    try:
-                        name, start_doc = json.loads(file.readline())
-                    except json.JSONDecodeError as e:
-                        if not file.readline():
-                            # Empty file, maybe being written to currently
-                            continue
-                        raise e
-                stop_doc = get_stop(filename)
-                self.upsert(start_doc, stop_doc, gen, (filename,), {})
-
-    def search(self, query):
-        """
-        Return a new Catalog with a subset of the entries in this Catalog.
+                filenames.append(filename)
+                cache_keys.append((filename, mtime, stat.st_size))
+        gen_kwargs = {'decoder': self.decoder,
+                      'numpy_arrays': self.numpy_arrays}
+        headers = parallel_map(functools.partial(_read_header,
+                                                 decoder=self.decoder),
+                               filenames,
+                               max_workers=self.max_workers, pool=self.pool)
+        for filename, cache_key, header in zip(filenames, cache_keys, headers):
+            if header is None:
+                continue
+            start_doc, stop_doc = header
+            run_kwargs = {}
+            if self._run_cache is not None:
+                run_kwargs.update(run_cache=self._run_cache,
+                                  cache_key=cache_key)
+            if self.stream:
+                run_kwargs.update(index_func=gen_with_offsets, read_func=gen_at)
+            if self.live:
+                run_kwargs.update(tail_func=gen_with_offsets)
+            self.upsert(start_doc, stop_doc, gen, (filename,), gen_kwargs,
+                        **run_kwargs)
 
-        Parameters
-        ----------
-        query : dict
-        """
-        if self._query:
-            query = {'$and': [self._query, query]}
-        cat = type(self)(
-            paths=self.paths,
-            query=query,
-            handler_registry=self.filler.handler_registry,
-            name='search results',
-            getenv=self.getenv,
-            getshell=self.getshell,
-            auth=self.auth,
-            metadata=(self.metadata or {}).copy(),
-            storage_options=self.storage_options)
-        return cat
+    def _search_kwargs(self):
+        # The search results start from this Catalog's entries and only read
+        # the files that are new or have changed since it last loaded.
+        return {**super()._search_kwargs(),
+                'paths': self.paths,
+                'stream': self.stream,
+                'live': self.live,
+                'max_workers': self.max_workers,
+                'pool': self.pool,
+                'decoder': self.decoder,
+                'numpy_arrays': self.numpy_arrays,
+                'run_cache': self._run_cache,
+                'filename_to_mtime': self._filename_to_mtime}
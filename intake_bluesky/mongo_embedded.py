@@ -9,7 +9,8 @@ import intake.source.base
 import pymongo
 import pymongo.errors
 
-from .core import parse_handler_registry
+from .core import make_filler
+from .core import prefix_query
 
 
 class _Entries(collections.abc.Mapping):
@@ -109,11 +110,11 @@ class _Entries(collections.abc.Mapping):
             query = {'$and': [self.catalog._query, {'uid': name}]}
             header_doc = self.catalog._db.header.find_one(query)
             if header_doc is None:
-                regex_query = {
+                partial_uid_query = {
                     '$and': [self.catalog._query,
-                             {'start.uid': {'$regex': f'{name}.*'}}]}
+                             {'start.uid': prefix_query(name)}]}
                 matches = list(
-                    self.catalog._db.header.find(regex_query).limit(10))
+                    self.catalog._db.header.find(partial_uid_query).limit(10))
                 if not matches:
                     raise KeyError(name)
                 elif len(matches) == 1:
@@ -168,7 +169,7 @@ class _Entries(collections.abc.Mapping):
 
 class BlueskyMongoCatalog(intake.catalog.Catalog):
     def __init__(self, datastore_db, *, handler_registry=None,
-                 query=None, **kwargs):
+                 query=None, handler_pool=None, **kwargs):
         """
         This Catalog is backed by a MongoDB with an embedded data model.
 
@@ -187,6 +188,12 @@ class BlueskyMongoCatalog(intake.catalog.Catalog):
             ``{'SOME_SPEC': 'module.submodule.class_name'}``.
         query : dict, optional
             MongoDB query. Used internally by the ``search()`` method.
+        handler_pool : int or HandlerPool, optional
+            Share handlers among Resources that refer to the same files, and
+            keep at most this many open, closing the least recently used. A
+            HandlerPool may be given instead, to share one between Catalogs.
+            By default, each Resource gets its own handler, kept for the life
+            of the Catalog.
         **kwargs :
             Additional keyword arguments are passed through to the base class,
             Catalog.
@@ -200,10 +207,8 @@ class BlueskyMongoCatalog(intake.catalog.Catalog):
 
         self._query = query or {}
 
-        if handler_registry is None:
-            handler_registry = {}
-        parsed_handler_registry = parse_handler_registry(handler_registry)
-        self.filler = event_model.Filler(parsed_handler_registry, inplace=True)
+        self.filler, self._handler_pool = make_filler(handler_registry,
+                                                      handler_pool)
         super().__init__(**kwargs)
 
     def _get_event_pages(self, descriptor_uid, skip=0, limit=None):
@@ -260,6 +265,7 @@ class BlueskyMongoCatalog(intake.catalog.Catalog):
             datastore_db=self._db,
             query=query,
             handler_registry=self.filler.handler_registry,
+            handler_pool=self._handler_pool,
             name='search results',
             getenv=self.getenv,
             getshell=self.getshell,
@@ -1,5 +1,4 @@
 import collections.abc
-import event_model
 from functools import partial
 import intake
 import intake.catalog
@@ -8,7 +7,8 @@ import intake.source.base
 import pymongo
 import pymongo.errors
 
-from .core import parse_handler_registry
+from .core import make_filler
+from .core import prefix_query
 from .core import to_event_pages
 from .core import to_datum_pages
 
@@ -70,10 +70,10 @@ class _Entries(collections.abc.Mapping):
             query = {'$and': [self.catalog._query, {'uid': name}]}
             run_start_doc = collection.find_one(query)
             if run_start_doc is None:
-                regex_query = {
+                partial_uid_query = {
                     '$and': [self.catalog._query,
-                             {'uid': {'$regex': f'{name}.*'}}]}
-                matches = list(collection.find(regex_query).limit(10))
+                             {'uid': prefix_query(name)}]}
+                matches = list(collection.find(partial_uid_query).limit(10))
                 if not matches:
                     raise KeyError(name)
                 elif len(matches) == 1:
@@ -128,7 +128,8 @@ class _Entries(collections.abc.Mapping):
 
 class BlueskyMongoCatalog(intake.catalog.Catalog):
     def __init__(self, metadatastore_db, asset_registry_db, *,
-                 handler_registry=None, query=None, **kwargs):
+                 handler_registry=None, query=None, handler_pool=None,
+                 **kwargs):
         """
         This Catalog is backed by a pair of MongoDBs with "layout 1".
 
@@ -147,6 +148,12 @@ class BlueskyMongoCatalog(intake.catalog.Catalog):
             ``{'SOME_SPEC': 'module.submodule.class_name'}``.
         query : dict, optional
             MongoDB query. Used internally by the ``search()`` method.
+        handler_pool : int or HandlerPool, optional
+            Share handlers among Resources that refer to the same files, and
+            keep at most this many open, closing the least recently used. A
+            HandlerPool may be given instead, to share one between Catalogs.
+            By default, each Resource gets its own handler, kept for the life
+            of the Catalog.
         **kwargs :
             Additional keyword arguments are passed through to the base class,
             Catalog.
@@ -174,10 +181,8 @@ class BlueskyMongoCatalog(intake.catalog.Catalog):
         self._asset_registry_db = assets_db
 
         self._query = query or {}
-        if handler_registry is None:
-            handler_registry = {}
-        parsed_handler_registry = parse_handler_registry(handler_registry)
-        self.filler = event_model.Filler(parsed_handler_registry, inplace=True)
+        self.filler, self._handler_pool = make_filler(handler_registry,
+                                                      handler_pool)
         super().__init__(**kwargs)
 
     def _get_run_stop(self, run_start_uid):
@@ -266,6 +271,7 @@ class BlueskyMongoCatalog(intake.catalog.Catalog):
             asset_registry_db=self._asset_registry_db,
             query=query,
             handler_registry=self.filler.handler_registry,
+            handler_pool=self._handler_pool,
             name='search results',
             getenv=self.getenv,
             getshell=self.getshell,
@@ -1,9 +1,17 @@
+import functools
 import glob
+import mmap
 import msgpack
 import msgpack_numpy
 import os
 import pathlib
+import struct
 
+from .compression import detect
+from .compression import open_file
+from .compression import random_access
+from .core import parallel_map
+from .core import RunCache
 from .in_memory import BlueskyInMemoryCatalog
 
 
@@ -11,8 +19,238 @@ UNPACK_OPTIONS = dict(object_hook=msgpack_numpy.decode,
                       raw=False,
                       max_buffer_size=1_000_000_000)
 
+# When reading through a memory map, objects that fit in this many bytes are
+# copied out and decoded, or skipped, by msgpack itself, which is faster for
+# small objects. Larger ones are walked and decoded in place so that their
+# arrays are not copied.
+MEMORY_MAP_THRESHOLD = 65_536
 
-def gen(filename):
+# The first, smaller, window tried for such objects
+_SMALL_WINDOW = 4096
+
+# Read files in chunks of this many bytes where reading them through msgpack's
+# Unpacker would not do.
+_READ_SIZE = 2**20
+
+
+class _Truncated(Exception):
+    "Raised when an object runs past the end of the buffer."
+
+
+class _MappedDecoder:
+    """
+    Decode msgpack objects in place from a buffer, such as a memory map.
+
+    Arrays encoded by msgpack_numpy come back as read-only numpy arrays that
+    are views onto the buffer, not copies. There is no limit on object size.
+    """
+    _SIZES = {0xc4: 1, 0xc5: 2, 0xc6: 4,  # bin
+              0xc7: 1, 0xc8: 2, 0xc9: 4,  # ext
+              0xd9: 1, 0xda: 2, 0xdb: 4,  # str
+              0xdc: 2, 0xdd: 4,  # array
+              0xde: 2, 0xdf: 4}  # map
+    _NUMBERS = {0xca: '>f', 0xcb: '>d',
+                0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q',
+                0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q'}
+    _KINDS = {0xc4: 'bin', 0xc5: 'bin', 0xc6: 'bin',
+              0xd9: 'str', 0xda: 'str', 0xdb: 'str',
+              0xdc: 'array', 0xdd: 'array',
+              0xde: 'map', 0xdf: 'map'}
+    _FIXEXT = {0xd4: 1, 0xd5: 2, 0xd6: 4, 0xd7: 8, 0xd8: 16}
+
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer)
+
+    def _read(self, fmt, pos):
+        size = struct.calcsize(fmt)
+        if pos + size > len(self.buffer):
+            raise _Truncated
+        value, = struct.unpack_from(fmt, self.buffer, pos)
+        return value, pos + size
+
+    def _header(self, pos):
+        """
+        Parse the header of the object at pos.
+
+        Returns (kind, value, pos) where kind is one of 'value', 'bin',
+        'str', 'ext', 'array', or 'map'. For 'value' the value is the decoded
+        object; otherwise it is the length (or, for 'ext', a (code, length)
+        pair) and pos is the start of the payload.
+        """
+        if pos >= len(self.buffer):
+            raise _Truncated
+        byte = self.buffer[pos]
+        pos += 1
+        if byte <= 0x7f:
+            return 'value', byte, pos
+        if byte >= 0xe0:
+            return 'value', byte - 0x100, pos
+        if byte <= 0x8f:
+            return 'map', byte & 0x0f, pos
+        if byte <= 0x9f:
+            return 'array', byte & 0x0f, pos
+        if byte <= 0xbf:
+            return 'str', byte & 0x1f, pos
+        if byte == 0xc0:
+            return 'value', None, pos
+        if byte == 0xc2:
+            return 'value', False, pos
+        if byte == 0xc3:
+            return 'value', True, pos
+        if byte in self._NUMBERS:
+            value, pos = self._read(self._NUMBERS[byte], pos)
+            return 'value', value, pos
+        if byte in self._FIXEXT:
+            code, pos = self._read('>b', pos)
+            return 'ext', (code, self._FIXEXT[byte]), pos
+        if byte in self._SIZES:
+            size = self._SIZES[byte]
+            length, pos = self._read({1: '>B', 2: '>H', 4: '>I'}[size], pos)
+            if 0xc7 <= byte <= 0xc9:
+                code, pos = self._read('>b', pos)
+                return 'ext', (code, length), pos
+            return self._KINDS[byte], length, pos
+        raise ValueError(f"Invalid msgpack type byte {byte:#x} at {pos - 1}")
+
+    def end(self, pos):
+        "Return the position just past the object at pos, without decoding."
+        small = self._unpack_small(pos, skip=True)
+        if small is not None:
+            _, stop = small
+            return stop
+        return self._end_in_place(pos)
+
+    def _unpack_small(self, pos, skip=False):
+        """
+        Read the object at pos with msgpack, if it is small.
+
+        Returns (item, stop), with item None if skip, or None if the object
+        does not fit in ``MEMORY_MAP_THRESHOLD`` bytes.
+        """
+        # Most documents are far smaller than the threshold. Try a small
+        # window first, so as not to copy out more than needed.
+        for size in (_SMALL_WINDOW, MEMORY_MAP_THRESHOLD):
+            unpacker = msgpack.Unpacker(**UNPACK_OPTIONS)
+            unpacker.feed(self.buffer[pos:pos + size])
+            try:
+                item = unpacker.skip() if skip else unpacker.unpack()
+            except msgpack.OutOfData:
+                if pos + size >= len(self.buffer):
+                    # Truncated
+                    return None
+                continue
+            return item, pos + unpacker.tell()
+        return None
+
+    def _end_in_place(self, pos):
+        # Walk the headers, stepping over payloads. Large objects are mostly
+        # payload, so there are few headers to walk.
+        remaining = 1
+        while remaining:
+            kind, value, pos = self._header(pos)
+            remaining -= 1
+            if kind == 'array':
+                remaining += value
+            elif kind == 'map':
+                remaining += 2 * value
+            elif kind in ('bin', 'str'):
+                pos += value
+            elif kind == 'ext':
+                pos += value[1]
+        if pos > len(self.buffer):
+            raise _Truncated
+        return pos
+
+    def decode(self, pos):
+        "Decode the object at pos. Return the object and the position after."
+        kind, value, pos = self._header(pos)
+        if kind == 'value':
+            return value, pos
+        if kind in ('bin', 'str', 'ext'):
+            length = value[1] if kind == 'ext' else value
+            stop = pos + length
+            if stop > len(self.buffer):
+                raise _Truncated
+            payload = self.buffer[pos:stop]
+            if kind == 'str':
+                return str(payload, 'utf-8'), stop
+            if kind == 'ext':
+                code = value[0]
+                if code == -1:
+                    return msgpack.Timestamp.from_bytes(bytes(payload)), stop
+                return msgpack.ExtType(code, bytes(payload)), stop
+            # Leave bin as a view for now. The enclosing map decides whether
+            # it is an array's data or should be copied into bytes.
+            return payload, stop
+        if kind == 'array':
+            result = []
+            for _ in range(value):
+                item, pos = self.decode(pos)
+                if isinstance(item, memoryview):
+                    item = bytes(item)
+                result.append(item)
+            return result, pos
+        # kind == 'map'
+        result = {}
+        for _ in range(value):
+            key, pos = self.decode(pos)
+            if isinstance(key, memoryview):
+                key = bytes(key)
+            item, pos = self.decode(pos)
+            result[key] = item
+        if b'nd' in result:
+            # msgpack_numpy builds the array on top of the view, no copy.
+            return msgpack_numpy.decode(result), pos
+        for key, item in result.items():
+            if isinstance(item, memoryview):
+                result[key] = bytes(item)
+        return result, pos
+
+    def unpack(self, pos):
+        "Decode the object at pos, choosing the faster way given its size."
+        small = self._unpack_small(pos)
+        if small is not None:
+            return small
+        stop = self._end_in_place(pos)
+        item, _ = self.decode(pos)
+        return item, stop
+
+
+def _map(filename):
+    """
+    Memory-map a file read-only. Return None if it is empty.
+
+    The map is not closed explicitly: arrays decoded from it keep it alive,
+    and it is released when the last of them is.
+    """
+    with open(filename, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            return None
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _mappable(filename, memory_map):
+    "Whether to memory-map a file. Compressed files cannot be."
+    return memory_map and detect(filename) is None
+
+
+def _gen_mapped(filename, offset):
+    buffer = _map(filename)
+    if buffer is None:
+        return
+    decoder = _MappedDecoder(buffer)
+    start = offset
+    while start < len(buffer):
+        try:
+            item, stop = decoder.unpack(start)
+        except _Truncated:
+            # This is a partially-written last object.
+            return
+        yield start, stop, item
+        start = stop
+
+
+def gen(filename, memory_map=False):
     """
     A msgpack generator
 
@@ -20,12 +258,115 @@ def gen(filename):
     ----------
     filename: str
         msgpack file to laod.
+    memory_map: boolean, optional
+        If True, read the file through a memory map, and return numpy arrays
+        as read-only views onto it instead of copies. Compressed files are
+        read normally. False by default.
     """
-    with open(filename, 'rb') as file:
+    if _mappable(filename, memory_map):
+        for _, _, item in _gen_mapped(filename, 0):
+            yield item
+        return
+    with open_file(filename) as file:
         yield from msgpack.Unpacker(file, **UNPACK_OPTIONS)
 
 
-def get_stop(filename):
+def gen_with_offsets(filename, offset=0, memory_map=False):
+    """
+    A msgpack generator that also reports where each document is.
+
+    Parameters
+    ----------
+    filename: str
+        msgpack file to load.
+    offset: int, optional
+        Byte offset of the object to start from. By default, start at the
+        beginning of the file.
+    memory_map: boolean, optional
+        If True, read the file through a memory map. See :func:`gen`.
+
+    Yields
+    ------
+    start, stop, (name, doc)
+        Byte offsets delimiting the object, and the document it holds. A
+        trailing object that is incomplete, perhaps because the file is being
+        written to, is not yielded.
+    """
+    if _mappable(filename, memory_map):
+        yield from _gen_mapped(filename, offset)
+        return
+    with open_file(filename) as file:
+        file.seek(offset)
+        unpacker = msgpack.Unpacker(file, **UNPACK_OPTIONS)
+        start = offset
+        for name, doc in unpacker:
+            stop = offset + unpacker.tell()
+            yield start, stop, (name, doc)
+            start = stop
+
+
+def gen_at(filename, positions, memory_map=False):
+    """
+    Read the documents at the given byte offsets of a msgpack file.
+
+    Parameters
+    ----------
+    filename: str
+        msgpack file to load.
+    positions: iterable
+        Byte offsets of objects, as given by :func:`gen_with_offsets`.
+    memory_map: boolean, optional
+        If True, read the file through a memory map. See :func:`gen`.
+
+    Yields
+    ------
+    name, doc
+    """
+    if _mappable(filename, memory_map):
+        buffer = _map(filename)
+        if buffer is None:
+            return
+        decoder = _MappedDecoder(buffer)
+        for position in positions:
+            (name, doc), _ = decoder.unpack(position)
+            yield (name, doc)
+        return
+    with open_file(filename) as file:
+        if random_access(file):
+            for position in positions:
+                file.seek(position)
+                unpacker = msgpack.Unpacker(file, **UNPACK_OPTIONS)
+                name, doc = next(unpacker)
+                yield (name, doc)
+            return
+        # Streamed compressed files cannot seek backward without starting
+        # over, so read what is asked for in one pass, in file order.
+        positions = list(positions)
+        if positions == sorted(positions):
+            for _, (name, doc) in _read_forward(file, positions):
+                yield (name, doc)
+            return
+        found = dict(_read_forward(file, sorted(set(positions))))
+        for position in positions:
+            yield found[position]
+
+
+def _read_forward(file, positions):
+    "Yield (position, item) for sorted positions, reading file forward once."
+    unpacker = msgpack.Unpacker(file, **UNPACK_OPTIONS)
+    last_position = item = None
+    for position in positions:
+        if position != last_position:
+            while unpacker.tell() < position:
+                unpacker.skip()
+            if unpacker.tell() != position:
+                raise ValueError(f"No object starts at offset {position}")
+            item = next(unpacker)
+            last_position = position
+        yield position, item
+
+
+def get_stop(filename, memory_map=False):
     """
     Returns the stop_doc of a Bluesky msgpack file.
 
@@ -35,22 +376,83 @@ def get_stop(filename):
     ----------
     filename: str
         msgpack file to load.
+    memory_map: boolean, optional
+        If True, read the file through a memory map. See :func:`gen`.
     Returns
     -------
     stop_doc: dict or None
         A Bluesky run_stop document or None if one is not present.
     """
-    with open(filename, 'rb') as file:
-        for name, doc in msgpack.Unpacker(file, **UNPACK_OPTIONS):
-            if name == 'stop':
-                return doc
+    if _mappable(filename, memory_map):
+        buffer = _map(filename)
+        if buffer is None:
+            return None
+        decoder = _MappedDecoder(buffer)
+        start = last = 0
+        while start < len(buffer):
+            try:
+                start, last = decoder.end(start), start
+            except _Truncated:
+                break
+        if last == start:
+            return None
+        (name, doc), _ = decoder.unpack(last)
+        if name == 'stop':
+            return doc
+        return None
+    with open_file(filename) as file:
+        # Skip over the documents without building them, keeping the bytes
+        # from the start of the last complete one, and decode that at the
+        # end. This reads the file once, forward, which is all that a
+        # streamed compressed file can do cheaply.
+        unpacker = msgpack.Unpacker(**UNPACK_OPTIONS)
+        kept = bytearray()
+        kept_start = start = last = 0
+        while True:
+            chunk = file.read(_READ_SIZE)
+            if not chunk:
+                break
+            unpacker.feed(chunk)
+            kept += chunk
+            while True:
+                try:
+                    unpacker.skip()
+                except msgpack.OutOfData:
+                    break
+                start, last = unpacker.tell(), start
+            del kept[:last - kept_start]
+            kept_start = last
+        if last == start:
+            return None
+        name, doc = msgpack.unpackb(kept[:start - last],
+                                    object_hook=msgpack_numpy.decode,
+                                    raw=False)
+        if name == 'stop':
+            return doc
+        return None
+
+
+def _read_header(filename, memory_map=False):
+    """
+    Read the RunStart and RunStop documents from a msgpack file.
+
+    Returns None if the file is empty.
+    """
+    try:
+        name, start_doc = next(gen(filename, memory_map=memory_map))
+    except StopIteration:
+        # Empty file, maybe being written to currently
+        return None
+    return start_doc, get_stop(filename, memory_map=memory_map)
 
 
 class BlueskyMsgpackCatalog(BlueskyInMemoryCatalog):
     name = 'bluesky-msgpack-catalog'  # noqa
 
     def __init__(self, paths, *,
-                 handler_registry=None, query=None, **kwargs):
+                 handler_registry=None, query=None, stream=False, live=False,
+                 memory_map=False, max_workers=1, pool='thread', run_cache=None,
+                 handler_pool=None, **kwargs):
         """
         This Catalog is backed by msgpack files.
 
@@ -68,6 +470,38 @@ class BlueskyMsgpackCatalog(BlueskyInMemoryCatalog):
             ``{'SOME_SPEC': 'module.submodule.class_name'}``.
         query : dict, optional
             Mongo query that filters entries' RunStart documents
+        stream : boolean, optional
+            If True, do not hold each Run's Events and Datums in memory when it
+            is opened, but read them back from the file as they are needed.
+            False by default.
+        live : boolean, optional
+            If True, Runs follow their files as they are written. Each time a
+            Run is reloaded, with its ``reload()`` or ``force_reload()``
+            method, it reads only what has been added to the end of its file
+            since the last time, stopping short of any partially-written
+            document. False by default.
+        memory_map : boolean, optional
+            If True, read files through a memory map, and give numpy arrays as
+            read-only views onto it instead of copies. This also lifts the
+            limit on the size of any one document. False by default.
+        max_workers : int, optional
+            If greater than 1, read the RunStart and RunStop documents of new
+            or changed files on a pool of this many workers. Entries are still
+            added in a deterministic order. By default, read them serially.
+        pool : {'thread', 'process'}, optional
+            Type of pool used when ``max_workers`` is greater than 1.
+            ``'thread'`` by default.
+        run_cache : int or RunCache, optional
+            Keep parsed Runs in memory, up to a budget of this many bytes, so
+            that opening a Run again does not re-read its file unless the
+            file has changed. A RunCache may be given instead, to share one
+            between Catalogs. By default, Runs are not kept.
+        handler_pool : int or HandlerPool, optional
+            Share handlers among Resources that refer to the same files, and
+            keep at most this many open, closing the least recently used. A
+            HandlerPool may be given instead, to share one between Catalogs.
+            By default, each Resource gets its own handler, kept for the life
+            of the Catalog.
         **kwargs :
             Additional keyword arguments are passed through to the base class,
             Catalog.
@@ -76,47 +510,62 @@ class BlueskyMsgpackCatalog(BlueskyInMemoryCatalog):
         if isinstance(paths, (str, pathlib.Path)):
             paths = [paths]
         self.paths = paths
-        self._filename_to_mtime = {}
+        self.stream = stream
+        self.live = live
+        self.max_workers = max_workers
+        self.pool = pool
+        self.memory_map = memory_map
+        if run_cache is not None and not isinstance(run_cache, RunCache):
+            run_cache = RunCache(run_cache)
+        self._run_cache = run_cache
+        # Files already read by the Catalog that this is a search result of
+        self._filename_to_mtime = dict(kwargs.pop('filename_to_mtime', {}))
         super().__init__(handler_registry=handler_registry,
                          query=query,
+                         handler_pool=handler_pool,
                          **kwargs)
 
     def _load(self):
+        filenames = []
+        cache_keys = []
         for path in self.paths:
-            for filename in glob.glob(path):
-                mtime = os.path.getmtime(filename)
+            for filename in sorted(glob.glob(path)):
+                stat = os.stat(filename)
+                mtime = stat.st_mtime
                 if mtime == self._filename_to_mtime.get(filename):
                     # This file has not changed since last time we loaded it.
                     continue
                 self._filename_to_mtime[filename] = mtime
-                with open(filename, 'rb') as file:
-                    unpacker = msgpack.Unpacker(file, **UNPACK_OPTIONS)
-                    try:
-                        name, start_doc = next(unpacker)
-                    except StopIteration:
-                        # Empty file, maybe being written to currently
-                        continue
-                stop_doc = get_stop(filename)
-                self.upsert(start_doc, stop_doc, gen, (filename,), {})
-
-    def search(self, query):
-        """
-        Return a new Catalog with a subset of the entries in this Catalog.
+                filenames.append(filename)
+                cache_keys.append((filename, mtime, stat.st_size))
+        gen_kwargs = {'memory_map': True} if self.memory_map else {}
+        headers = parallel_map(functools.partial(_read_header, **gen_kwargs),
+                               filenames,
+                               max_workers=self.max_workers, pool=self.pool)
+        for filename, cache_key, header in zip(filenames, cache_keys, headers):
+            if header is None:
+                continue
+            start_doc, stop_doc = header
+            run_kwargs = {}
+            if self._run_cache is not None:
+                run_kwargs.update(run_cache=self._run_cache,
+                                  cache_key=cache_key)
+            if self.stream:
+                run_kwargs.update(index_func=gen_with_offsets, read_func=gen_at)
+            if self.live:
+                run_kwargs.update(tail_func=gen_with_offsets)
+            self.upsert(start_doc, stop_doc, gen, (filename,), gen_kwargs,
+                        **run_kwargs)
 
-        Parameters
-        ----------
-        query : dict
-        """
-        if self._query:
-            query = {'$and': [self._query, query]}
-        cat = type(self)(
-            paths=self.paths,
-            query=query,
-            handler_registry=self.filler.handler_registry,
-            name='search results',
-            getenv=self.getenv,
-            getshell=self.getshell,
-            auth=self.auth,
-            metadata=(self.metadata or {}).copy(),
-            storage_options=self.storage_options)
-        return cat
+    def _search_kwargs(self):
+        # The search results start from this Catalog's entries and only read
+        # the files that are new or have changed since it last loaded.
+        return {**super()._search_kwargs(),
+                'paths': self.paths,
+                'stream': self.stream,
+                'live': self.live,
+                'max_workers': self.max_workers,
+                'pool': self.pool,
+                'memory_map': self.memory_map,
+                'run_cache': self._run_cache,
+                'filename_to_mtime': self._filename_to_mtime}
@@ -168,6 +168,55 @@ def test_canonical_unfilled(bundle):
         filler(name, doc)
 
 
+def test_canonical_pages(bundle):
+    run = bundle.cat['xyz']()[bundle.uid]()
+
+    def unpacked(documents):
+        for name, doc in documents:
+            if name == 'event_page':
+                for event in event_model.unpack_event_page(doc):
+                    yield 'event', event['uid']
+            elif name == 'datum_page':
+                for datum in event_model.unpack_datum_page(doc):
+                    yield 'datum', datum['datum_id']
+            else:
+                yield name, doc.get('uid')
+
+    def events(documents):
+        return [item for item in documents if item[0] == 'event']
+
+    def check(pages, expected, page_size):
+        assert 'event' not in (name for name, _ in pages)
+        assert all(len(doc['uid']) <= page_size
+                   for name, doc in pages if name == 'event_page')
+        actual = list(unpacked(pages))
+        assert actual[0] == expected[0] and actual[-1] == expected[-1]
+        assert sorted(actual, key=str) == sorted(expected, key=str)
+        # Events, of the baseline and primary streams, in the same order
+        assert events(actual) == events(expected)
+        # Resources and Datums come ahead of the Events that reference them.
+        seen = set()
+        for name, doc in pages:
+            if name == 'resource':
+                seen.add(doc['uid'])
+            elif name == 'datum_page':
+                assert doc['resource'] in seen
+                seen.update(doc['datum_id'])
+            elif name == 'event_page':
+                for key, filled in doc['filled'].items():
+                    for value, is_filled in zip(doc['data'][key], filled):
+                        assert is_filled or value in seen
+
+    expected = list(unpacked(run.canonical()))
+    expected_unfilled = list(unpacked(run.canonical_unfilled()))
+    for page_size in (1, 3, 1000):
+        pages = list(run.canonical_pages(page_size=page_size))
+        check(pages, expected, page_size)
+        assert list(unpacked(pages)) == expected
+        check(list(run.canonical_pages_unfilled(page_size=page_size)),
+              expected_unfilled, page_size)
+
+
 def test_read(bundle):
     run = bundle.cat['xyz']()[bundle.uid]()
     entry = run['primary']
@@ -186,3 +235,22 @@ def test_include_and_exclude(bundle):
     assert set(entry(include=['motor']).read().variables) == expected
     expected = set(['time', 'uid', 'seq_num', 'motor:motor_velocity'])
     assert set(entry(include=['motor:motor_velocity']).read().variables) == expected
+
+
+def test_read_stream(bundle):
+    run = bundle.cat['xyz']()[bundle.uid]()
+    full = run['primary']().read()
+    # The same Event data as read(), filled
+    ds = run.read_stream('primary')
+    for key in ds.data_vars:
+        numpy.testing.assert_array_equal(ds[key], full[key])
+    ds = run.read_stream('primary', include=['motor'])
+    assert set(ds.variables) == set(['time', 'uid', 'seq_num', 'motor'])
+    numpy.testing.assert_array_equal(ds['motor'], full['motor'])
+    numpy.testing.assert_array_equal(ds['uid'], full['uid'])
+    ds = run.read_stream('primary', exclude=['motor'], seq_num=(2, 4))
+    assert 'motor' not in ds.variables
+    assert list(ds['seq_num']) == [2, 3]
+    times = full['time'].values
+    ds = run.read_stream('primary', time=(times[1], None))
+    numpy.testing.assert_array_equal(ds['time'], times[1:])
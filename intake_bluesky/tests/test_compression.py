@@ -0,0 +1,63 @@
+import gzip
+import lzma
+import pytest
+from intake_bluesky.compression import compress, detect, open_file
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+METHODS = ['gzip', 'xz',
+           pytest.param('zstd', marks=pytest.mark.skipif(
+               zstandard is None, reason="zstandard is not installed"))]
+
+
+@pytest.fixture
+def raw(tmp_path):
+    filename = tmp_path / 'raw'
+    filename.write_bytes(b''.join(b'line %d\n' % i for i in range(100_000)))
+    return filename
+
+
+def check_random_access(filename, expected):
+    with open_file(str(filename)) as file:
+        assert file.read() == expected
+        file.seek(123_456)
+        assert file.read(1000) == expected[123_456:124_456]
+        assert file.tell() == 124_456
+        file.seek(-50, 2)
+        assert file.read() == expected[-50:]
+        file.seek(1)
+        assert file.readline() == expected[1:expected.index(b'\n') + 1]
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_compress(raw, method):
+    filename = raw.with_suffix('.' + method)
+    compress(str(raw), str(filename), method=method, frame_size=100_000)
+    assert detect(str(filename)) == method
+    check_random_access(filename, raw.read_bytes())
+
+
+def test_standard_tools(raw, tmp_path):
+    "Files written by the standard tools, with one or more frames, can be read."
+    data = raw.read_bytes()
+    filename = tmp_path / 'multi.gz'
+    filename.write_bytes(gzip.compress(data[:100_000]) + gzip.compress(data[100_000:]))
+    check_random_access(filename, data)
+    filename = tmp_path / 'single.xz'
+    filename.write_bytes(lzma.compress(data))
+    check_random_access(filename, data)
+    if zstandard is not None:
+        filename = tmp_path / 'multi.zst'
+        filename.write_bytes(
+            zstandard.ZstdCompressor(write_content_size=False).compress(data[:100_000])
+            + zstandard.ZstdCompressor().compress(data[100_000:]))
+        check_random_access(filename, data)
+
+
+def test_uncompressed(raw):
+    assert detect(str(raw)) is None
+    check_random_access(raw, raw.read_bytes())
@@ -1,8 +1,16 @@
+import copy
 import event_model
+import http.server
+import msgpack
+import numpy
 import os
+import pytest
 import tempfile
+import threading
+import time
 import xarray
 import intake_bluesky.core as core
+from intake_bluesky import wire
 from intake_bluesky.core import documents_to_xarray
 
 
@@ -58,6 +66,63 @@ def test_no_events():
         get_datum_pages=None)
 
 
+@pytest.mark.parametrize('interleaved', [False, True])
+def test_multiple_descriptors(interleaved):
+    "Combining descriptors gives the same Dataset as xarray.merge."
+    run_bundle = event_model.compose_run()
+    data_keys = {'x': {'source': '...', 'shape': [], 'dtype': 'number'},
+                 'img': {'source': '...', 'shape': [2, 3], 'dtype': 'array'}}
+    configuration = {'det': {
+        'data': {'gain': 2}, 'timestamps': {'gain': 0},
+        'data_keys': {'gain': {'source': '...', 'shape': [],
+                               'dtype': 'integer'}}}}
+    descriptors = [run_bundle.compose_descriptor(
+        data_keys=data_keys, name='primary', configuration=configuration)
+        for _ in range(3)]
+    pages = {}
+    for i, bundle in enumerate(descriptors):
+        times = ([3 * j + i for j in range(5)] if interleaved
+                 else [10 * i + j for j in range(5)])
+        pages[bundle.descriptor_doc['uid']] = event_model.pack_event_page(*(
+            bundle.compose_event(
+                data={'x': float(t), 'img': numpy.full((2, 3), t)},
+                timestamps={'x': t, 'img': t}, time=t)
+            for t in times))
+
+    def to_xarray(descriptor_docs):
+        return documents_to_xarray(
+            start_doc=run_bundle.start_doc,
+            stop_doc=None,
+            descriptor_docs=descriptor_docs,
+            get_event_pages=lambda uid: [pages[uid]],
+            filler=event_model.Filler({}, inplace=True),
+            get_resource=None,
+            lookup_resource_for_datum=None,
+            get_datum_pages=None)
+
+    descriptor_docs = [bundle.descriptor_doc for bundle in descriptors]
+    # Out of time order
+    descriptor_docs.reverse()
+    expected = xarray.merge([to_xarray([doc]) for doc in descriptor_docs])
+    actual = to_xarray(descriptor_docs)
+    assert actual.identical(expected)
+    assert list(actual['time']) == sorted(actual['time'].values)
+    assert actual['img'].shape == (15, 2, 3)
+    assert set(actual['det:gain'].values) == {2}
+    # The same dtypes whether the blocks are concatenated or merged
+    single = to_xarray(descriptor_docs[:1])
+    for key in ('x', 'img', 'det:gain', 'seq_num', 'uid'):
+        assert actual[key].dtype == single[key].dtype, key
+    assert actual['img'].dtype.kind == actual['det:gain'].dtype.kind == 'i'
+    # Excluded configuration is left out.
+    assert 'det:gain' not in documents_to_xarray(
+        start_doc=run_bundle.start_doc, stop_doc=None,
+        descriptor_docs=descriptor_docs, get_event_pages=lambda uid: [pages[uid]],
+        filler=event_model.Filler({}, inplace=True), get_resource=None,
+        lookup_resource_for_datum=None, get_datum_pages=None,
+        exclude=['det:gain'])
+
+
 def test_xarray_helpers():
     event_pages = list(event_page_gen(10, 5))
     dataarray_pages = [core.event_page_to_dataarray_page(page) for page in event_pages]
@@ -73,11 +138,29 @@ def test_interlace_event_page_chunks():
     interlaced = core.interlace_event_page_chunks(*page_gens, chunk_size=3)
 
     t0 = None
+    num_events = 0
     for chunk in interlaced:
         t1 = chunk['time'][0]
-        if t0:
-            assert t1 > t0
+        if t0 is not None:
+            assert t1 >= t0
         t0 = t1
+        assert len(chunk['uid']) <= 3
+        num_events += len(chunk['uid'])
+    # Every chunk of every generator is yielded.
+    assert num_events == 3 * 10 * 5
+
+
+def test_pack_pages():
+    events = list(event_model.unpack_event_page(next(event_page_gen(5, 1))))
+    other = [{**event, 'descriptor': 'OTHER'} for event in events[:2]]
+    documents = ([('start', {})] + [('event', event) for event in events]
+                 + [('event', event) for event in other] + [('stop', {})])
+    packed = list(core.pack_pages(documents, page_size=2))
+    assert [name for name, _ in packed] == (
+        ['start'] + 4 * ['event_page'] + ['stop'])
+    assert [doc['seq_num'] for _, doc in packed[1:-1]] == [
+        [0, 1], [2, 3], [4], [0, 1]]
+    assert packed[-2][1]['descriptor'] == 'OTHER'
 
 
 def test_tail():
@@ -87,3 +170,301 @@ def test_tail():
                 f.write(f'{i}\n')
             filename = f.name
         assert list(core.tail(filename, n=2)) == ['998', '999']
+
+
+@pytest.mark.parametrize('pool', ['thread', 'process'])
+def test_parallel_map(pool):
+    items = list(range(50))
+    assert core.parallel_map(str, items, max_workers=4, pool=pool) == list(map(str, items))
+    assert core.parallel_map(str, items) == list(map(str, items))
+    with pytest.raises(ValueError):
+        core.parallel_map(str, items, max_workers=4, pool='fibers')
+
+
+@pytest.mark.parametrize('prefix', ['', 'abc', 'ab\U0010ffff', '\U0010ffff'])
+def test_prefix_bounds(prefix):
+    lower, upper = core.prefix_bounds(prefix)
+    strings = ['', 'a', 'ab', 'abc', 'abc0', 'abd', 'ab\U0010ffff',
+               'ab\U0010ffff\U0010ffff', 'ac', '\U0010ffff', 'b']
+    for s in strings:
+        in_bounds = lower <= s and (upper is None or s < upper)
+        assert in_bounds == s.startswith(prefix)
+
+
+def test_run_cache():
+    cache = core.RunCache(max_bytes=100)
+    cache.put('a', 'A', 40)
+    cache.put('b', 'B', 40)
+    assert cache.get('a') == 'A'  # Now 'b' is the least recently used.
+    cache.put('c', 'C', 40)
+    assert 'b' not in cache
+    assert cache.get('a') == 'A'
+    assert cache.get('c') == 'C'
+    assert cache.nbytes == 80
+    cache.put('d', 'D', 101)  # too big to cache
+    assert 'd' not in cache
+    assert len(cache) == 2
+    # A value too big to cache replaces, and so drops, the one before it.
+    cache.put('a', 'A2', 101)
+    assert 'a' not in cache
+    assert cache.nbytes == 40
+
+
+def test_document_cache():
+    "EventPages come back out of the columns as they went in."
+    run_bundle = event_model.compose_run()
+    desc_bundle = run_bundle.compose_descriptor(
+        data_keys={key: {'source': '', 'dtype': 'number', 'shape': []}
+                   for key in 'xyz'},
+        name='primary')
+    cache = core.DocumentCache()
+    cache.PAGE_SIZE = 7
+    cache('start', run_bundle.start_doc)
+    cache('descriptor', desc_bundle.descriptor_doc)
+    events = []
+    for seq_num in range(1, 31):
+        event = desc_bundle.compose_event(
+            # x is an integer, except once; y is always a float; z is ragged.
+            data={'x': 2.5 if seq_num == 20 else seq_num,
+                  'y': seq_num / 2,
+                  'z': list(range(seq_num % 3))},
+            timestamps={key: seq_num for key in 'xyz'},
+            seq_num=seq_num)
+        events.append(event)
+        if seq_num > 10:
+            cache('event', event)
+    # Also take the first Events in one page with numpy columns.
+    page = event_model.pack_event_page(*events[:10])
+    page['data']['y'] = numpy.asarray(page['data']['y'])
+    cache('event_page', page)
+    uid = desc_bundle.descriptor_doc['uid']
+    assert cache.get_event_count(uid) == 30
+    pages = list(cache.get_event_pages(uid))
+    assert max(len(page['seq_num']) for page in pages) == 7
+    expected = events[10:] + events[:10]
+    actual = list(core.flatten_event_page_gen(pages))
+    assert actual == expected
+    assert [type(event['data']['x']) for event in actual] == [
+        type(event['data']['x']) for event in expected]
+    # Seek within the pages.
+    actual = list(core.flatten_event_page_gen(
+        cache.get_event_pages(uid, skip=5, limit=20)))
+    assert actual == expected[5:25]
+    assert list(cache.get_event_pages('no such descriptor')) == []
+    # The estimated memory grows with the number of Events held.
+    nbytes = cache.nbytes
+    assert nbytes > 30 * 8
+    cache('event_page', page)
+    assert cache.nbytes > nbytes
+
+
+def test_column_of_arrays():
+    "Arrays of higher dimension keep their dtype and shape, and are counted."
+    column = core._Column()
+    blocks = [numpy.full((2, 512, 512), i, 'uint16') for i in range(3)]
+    for block in blocks:
+        column.extend(block)
+    assert len(column) == 6
+    assert column.nbytes == 6 * 512 * 512 * 2
+    expected = numpy.concatenate(blocks)
+    actual = column.get(1, 5)
+    assert actual.dtype == numpy.uint16
+    assert actual.shape == (4, 512, 512)
+    numpy.testing.assert_array_equal(actual, expected[1:5])
+    assert column.get(6, 10).shape == (0, 512, 512)
+    # An array of another shape falls back to a list, keeping the arrays.
+    column.extend(numpy.zeros((1, 3, 3), 'uint16'))
+    assert len(column) == 7
+    assert column.nbytes == 6 * 512 * 512 * 2 + 9 * 2
+    actual = column.get(0, 2)
+    assert actual.dtype == numpy.uint16
+    numpy.testing.assert_array_equal(actual, expected[:2])
+
+
+class DummyHandler:
+    instances = []
+
+    def __init__(self, resource_path, **kwargs):
+        self.resource_path = resource_path
+        self.closed = False
+        DummyHandler.instances.append(self)
+
+    def __call__(self, index):
+        assert not self.closed
+        return (self.resource_path, index)
+
+    def close(self):
+        self.closed = True
+
+
+def test_handler_pool():
+    pool = core.HandlerPool(max_open=2)
+    filler = pool.make_filler({'DUMMY': DummyHandler}, inplace=False)
+    run_bundle = event_model.compose_run()
+    desc_bundle = run_bundle.compose_descriptor(
+        data_keys={'x': {'source': '', 'dtype': 'number', 'shape': [],
+                         'external': 'FILESTORE:'}},
+        name='primary')
+    filler('start', run_bundle.start_doc)
+    filler('descriptor', desc_bundle.descriptor_doc)
+
+    def fill(path):
+        resource_bundle = run_bundle.compose_resource(
+            spec='DUMMY', root='/', resource_path=path, resource_kwargs={})
+        datum = resource_bundle.compose_datum(datum_kwargs={'index': 1})
+        filler('resource', resource_bundle.resource_doc)
+        filler('datum', datum)
+        event = desc_bundle.compose_event(
+            data={'x': datum['datum_id']}, timestamps={'x': 0},
+            filled={'x': False})
+        _, filled_event = filler('event', event)
+        return filled_event['data']['x']
+
+    # Resources with the same path share a handler.
+    assert fill('a') == (os.path.join('/', 'a'), 1)
+    fill('a')
+    assert (pool.opened, pool.hits, pool.closed) == (1, 1, 0)
+    fill('b')
+    fill('c')
+    # The least recently used handler, for 'a', was closed.
+    assert (pool.opened, pool.closed, len(pool)) == (3, 1, 2)
+    assert [handler.closed for handler in DummyHandler.instances[-3:]] == [
+        True, False, False]
+    fill('a')
+    assert pool.opened == 4
+    pool.clear()
+    assert len(pool) == 0
+    assert all(handler.closed for handler in DummyHandler.instances[-4:])
+
+    # A handler in use is not closed when evicted, but once released.
+    args = (os.path.join('/', 'a'),)
+    with pool.lease('DUMMY', DummyHandler, args, {}) as handler:
+        fill('b')
+        fill('c')
+        assert handler not in pool._handlers.values()
+        assert not handler.closed
+        assert handler(2) == (args[0], 2)
+    assert handler.closed
+    with pool.lease('DUMMY', DummyHandler, args, {}) as handler:
+        pool.clear()
+        assert not handler.closed
+    assert handler.closed
+    assert not pool._leases and not pool._retired
+    # Copies, as made of catalog entries' arguments, share the pool.
+    assert copy.deepcopy(pool) is pool
+
+
+def test_get_session():
+    session = core.get_session('http://localhost:5000/v1/source')
+    # One Session per server, with its connections pooled.
+    assert core.get_session('http://localhost:5000/') is session
+    assert core.get_session('http://localhost:5001/') is not session
+    assert core.get_session('http://localhost:5000/',
+                            pool_size=2) is not session
+    adapter = session.get_adapter('http://localhost:5000/')
+    assert adapter._pool_maxsize == 10
+    assert adapter.max_retries.total == 3
+    # Only idempotent requests, like 'read', are retried after they reach the
+    # server. The intake server takes every request as a POST.
+    assert not adapter.max_retries.is_retry('POST', 503)
+    read_session = core.get_session('http://localhost:5000/', idempotent=True)
+    assert read_session is not session
+    read_adapter = read_session.get_adapter('http://localhost:5000/')
+    assert read_adapter.max_retries.is_retry('POST', 503)
+
+
+class FramedReplyHandler(http.server.BaseHTTPRequestHandler):
+    "Reply to any POST as the intake server replies to a 'read' request."
+    documents = [('start', {'uid': 'abc'}),
+                 ('event', {'data': {'image': numpy.ones((3, 3), 'uint16')}}),
+                 ('stop', {'uid': 'def'})]
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = msgpack.packb(
+            {'format': wire.FORMAT_PREFIX + 'zlib',
+             'compression': wire.PassthroughCompressor.name,
+             'container': 'bluesky-run',
+             'data': b''.join(wire.encode_documents(self.documents,
+                                                    frame_size=10))},
+            use_bin_type=True)
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_get_partition():
+    server = http.server.ThreadingHTTPServer(('localhost', 0),
+                                             FramedReplyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f'http://localhost:{server.server_port}/'
+        expected = FramedReplyHandler.documents
+        for lazy in (False, True):
+            partition = core.get_partition(url, {}, 'source', 'bluesky-run',
+                                           0, lazy=lazy)
+            assert isinstance(partition, list) != lazy
+            actual = list(partition)
+            assert [name for name, _ in actual] == ['start', 'event', 'stop']
+            image = actual[1][1]['data']['image']
+            assert image.dtype == numpy.uint16
+            numpy.testing.assert_array_equal(
+                image, expected[1][1]['data']['image'])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_prefetch_map():
+    lock = threading.Lock()
+    in_flight = 0
+    most_in_flight = 0
+
+    def fetch(i):
+        nonlocal in_flight, most_in_flight
+        with lock:
+            in_flight += 1
+            most_in_flight = max(most_in_flight, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return [i] * 1000
+
+    results = core.prefetch_map(fetch, range(20), max_in_flight=4)
+    assert [result[0] for result in results] == list(range(20))
+    assert 1 < most_in_flight <= 4
+
+    # With a tiny memory cap, fetch one at a time.
+    most_in_flight = 0
+    results = core.prefetch_map(fetch, range(5), max_in_flight=4,
+                                max_buffered_bytes=1)
+    consumed = []
+    for result in results:
+        time.sleep(0.02)
+        consumed.append(result[0])
+    assert consumed == list(range(5))
+    assert most_in_flight == 1
+    # With room for about two results, hold two at a time.
+    most_in_flight = 0
+    nbytes = core._sizeof([0] * 1000)
+    results = core.prefetch_map(fetch, range(10), max_in_flight=4,
+                                max_buffered_bytes=2 * nbytes)
+    assert [result[0] for result in results] == list(range(10))
+    assert most_in_flight == 2
+
+
+def test_estimate_event_size():
+    descriptor = {'data_keys': {
+        'x': {'dtype': 'number', 'shape': []},
+        'image': {'dtype': 'array', 'shape': [512, 256]},
+        'image_u16': {'dtype': 'array', 'shape': [512, 256],
+                      'dtype_str': '<u2'},
+        'unknown': {'dtype': 'array', 'shape': [-1, 0]}}}
+    size = core.estimate_event_size(descriptor)
+    assert size == (core._EVENT_OVERHEAD + 8 + 512 * 256 * (8 + 2) + 8
+                    + 4 * 8)
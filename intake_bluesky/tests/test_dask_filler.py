@@ -1,9 +1,14 @@
+import copy
+import dask
 import event_model
 from bluesky.plans import count
 import numpy
+import pytest
+import threading
+import time
 from ophyd.sim import NumpySeqHandler
 
-from ..core import DaskFiller
+from ..core import DaskFiller, HandlerPool
 
 
 def test_fill_event(RE, hw):
@@ -46,3 +51,214 @@ def test_fill_event_page(RE, hw):
     arr = dask_filled_event_page['data']['img'].compute()
     assert arr.shape == (1, 10, 10)
     assert isinstance(arr, numpy.ndarray)
+
+
+def test_fill_event_pages(RE, hw):
+    docs = []
+
+    def callback(name, doc):
+        docs.append((name, doc))
+
+    RE(count([hw.img], 5), callback)
+    dask_filler = DaskFiller({'NPY_SEQ': NumpySeqHandler})
+    event_pages = []
+    for name, doc in docs:
+        if name == 'event':
+            event_pages.append(event_model.pack_event_page(doc))
+        else:
+            dask_filler(name, doc)
+    arrays = dask_filler.fill_event_pages(event_pages, chunk_size=2)
+    assert list(arrays) == ['img']
+    arr = arrays['img']
+    # One task per chunk, not per frame
+    assert arr.chunks == ((2, 2, 1), (10,), (10,))
+    assert arr.shape == (5, 10, 10)
+    expected = [dask_filler.fill_event(event, inplace=False)['data']['img']
+                for name, event in docs if name == 'event']
+    assert numpy.array_equal(arr.compute(), numpy.asarray(expected))
+
+
+def test_documents_not_mutated(RE, hw):
+    docs = []
+
+    def callback(name, doc):
+        docs.append((name, doc))
+
+    RE(count([hw.img, hw.det], 3), callback)
+    event_page = event_model.pack_event_page(
+        *(doc for name, doc in docs if name == 'event'))
+    docs.append(('event_page', event_page))
+    originals = copy.deepcopy(docs)
+    dask_filler = DaskFiller({'NPY_SEQ': NumpySeqHandler})
+    filled_docs = [dask_filler(name, doc) for name, doc in docs]
+    filled_docs.append(
+        ('img', dask_filler.fill_event_pages([event_page])['img']))
+    dask.compute(filled_docs)
+    assert docs == originals
+    # Only the external data is new. Everything else is shared.
+    _, filled_page = filled_docs[-2]
+    assert filled_page['data']['det'] is event_page['data']['det']
+    assert filled_page['timestamps'] is event_page['timestamps']
+    assert filled_page['data'] is not event_page['data']
+    assert filled_page['filled'] is not event_page['filled']
+    # Marking the copy as filled leaves the original as it was.
+    filled_event = next(doc for name, doc in filled_docs if name == 'event')
+    for key in filled_event['filled']:
+        filled_event['filled'][key] = True
+        filled_page['filled'][key] = [True] * len(filled_page['uid'])
+    assert docs == originals
+
+
+def test_array_columns(RE, hw):
+    "Columns of EventPages may be numpy arrays, as some readers decode them."
+    docs = []
+
+    def callback(name, doc):
+        docs.append((name, doc))
+
+    RE(count([hw.img], 3), callback)
+    dask_filler = DaskFiller({'NPY_SEQ': NumpySeqHandler})
+    events = []
+    for name, doc in docs:
+        if name == 'event':
+            events.append(doc)
+        else:
+            dask_filler(name, doc)
+    expected = numpy.asarray(
+        [dask_filler.fill_event(event, inplace=False)['data']['img']
+         for event in events])
+    event_page = event_model.pack_event_page(*events)
+    event_page['data'] = {key: numpy.asarray(value)
+                          for key, value in event_page['data'].items()}
+    _, filled_page = dask_filler('event_page', event_page)
+    assert numpy.array_equal(filled_page['data']['img'].compute(), expected)
+    arrays = dask_filler.fill_event_pages([event_page])
+    assert numpy.array_equal(arrays['img'].compute(), expected)
+
+
+def test_frame_info(RE, hw):
+    "The shape and dtype of lazy arrays come from the data, not guesses."
+    docs = []
+
+    def callback(name, doc):
+        docs.append((name, doc))
+
+    RE(count([hw.img], 3), callback)
+    dask_filler = DaskFiller({'NPY_SEQ': NumpySeqHandler})
+    for name, doc in docs:
+        if name == 'descriptor':
+            # Misreport the shape, as some versions of ophyd do.
+            doc = copy.deepcopy(doc)
+            doc['data_keys']['img']['shape'] = [10, 10, 0]
+            doc['object_keys'] = {'img': ['img']}
+            doc['configuration']['img'] = {'data': {}}
+        if name in ('start', 'descriptor', 'resource', 'datum'):
+            dask_filler(name, doc)
+    events = [doc for name, doc in docs if name == 'event']
+    expected = numpy.asarray(
+        [dask_filler.fill_event(event, inplace=False)['data']['img']
+         for event in events])
+    _, event = dask_filler('event', events[0])
+    assert event['data']['img'].shape == expected.shape[1:]
+    assert event['data']['img'].dtype == expected.dtype
+    _, event_page = dask_filler('event_page',
+                                event_model.pack_event_page(*events))
+    assert event_page['data']['img'].shape == expected.shape
+    arrays = dask_filler.fill_event_pages(
+        [event_model.pack_event_page(*events)])
+    assert arrays['img'].shape == expected.shape
+    assert numpy.array_equal(arrays['img'].compute(), expected)
+
+
+class SingleThreadHandler(NumpySeqHandler):
+    "A handler that may only be used by the thread that made it."
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.thread = threading.get_ident()
+
+    def __call__(self, index):
+        assert threading.get_ident() == self.thread
+        time.sleep(0.001)  # Give other threads a chance to interleave.
+        return super().__call__(index)
+
+
+def test_parallel_fill(RE, hw):
+    docs = []
+
+    def callback(name, doc):
+        docs.append((name, doc))
+
+    RE(count([hw.img], 100), callback)
+    dask_filler = DaskFiller({'NPY_SEQ': SingleThreadHandler})
+    events = []
+    for name, doc in docs:
+        if name == 'event':
+            events.append(doc)
+        else:
+            dask_filler(name, doc)
+    expected = numpy.asarray(
+        [dask_filler.fill_event(event, inplace=False)['data']['img']
+         for event in events])
+    arrays = dask_filler.fill_event_pages(
+        [event_model.pack_event_page(*events)], chunk_size=1)
+    filled_events = [dask_filler('event', event)[1] for event in events]
+    with dask.config.set(scheduler='threads', num_workers=16):
+        for _ in range(5):
+            assert numpy.array_equal(arrays['img'].compute(), expected)
+            actual, = dask.compute(
+                [event['data']['img'] for event in filled_events])
+            assert numpy.array_equal(numpy.asarray(actual), expected)
+
+
+def test_pooled_handler_registry(RE, hw):
+    "Each thread leases handlers of its own from the pool."
+    docs = []
+
+    def callback(name, doc):
+        docs.append((name, doc))
+
+    RE(count([hw.img], 20), callback)
+    pool = HandlerPool(max_open=16)
+    handler_registry = pool.make_filler(
+        {'NPY_SEQ': SingleThreadHandler}).handler_registry
+    dask_filler = DaskFiller(handler_registry)
+    filled_events = []
+    for name, doc in docs:
+        _, filled_doc = dask_filler(name, doc)
+        if name == 'event':
+            filled_events.append(filled_doc)
+    with dask.config.set(scheduler='threads', num_workers=8):
+        actual, = dask.compute(
+            [event['data']['img'] for event in filled_events])
+    assert numpy.asarray(actual).shape == (20, 10, 10)
+    # One handler for each worker thread, and for this one, reused
+    assert 1 <= pool.opened <= 9
+    assert pool.hits > 0
+    assert pool.closed == 0
+
+
+class BrokenHandler(NumpySeqHandler):
+    "A handler whose files cannot be read."
+    def __call__(self, index):
+        raise RuntimeError("cannot read")
+
+
+def test_frame_info_handler_error(RE, hw):
+    "A failing handler does not stop the lazy arrays from being made."
+    docs = []
+
+    def callback(name, doc):
+        docs.append((name, doc))
+
+    RE(count([hw.img], 2), callback)
+    dask_filler = DaskFiller({'NPY_SEQ': BrokenHandler})
+    filled_events = []
+    for name, doc in docs:
+        _, filled_doc = dask_filler(name, doc)
+        if name == 'event':
+            filled_events.append(filled_doc)
+    descriptor = next(doc for name, doc in docs if name == 'descriptor')
+    image = filled_events[0]['data']['img']
+    assert image.shape == tuple(descriptor['data_keys']['img']['shape'])
+    with pytest.raises(RuntimeError):
+        image.compute()
@@ -0,0 +1,157 @@
+import event_model
+import numpy
+import pytest
+import uuid
+from intake_bluesky.in_memory import BlueskyInMemoryCatalog
+from mongoquery import Query
+
+
+def gen(start_doc, stop_doc):
+    yield 'start', start_doc
+    yield 'stop', stop_doc
+
+
+def make_catalog(start_docs, **kwargs):
+    cat = BlueskyInMemoryCatalog(**kwargs)
+    for start_doc in start_docs:
+        stop_doc = {'uid': str(uuid.uuid4()), 'run_start': start_doc['uid'],
+                    'time': start_doc['time'] + 1, 'exit_status': 'success'}
+        cat.upsert(start_doc, stop_doc, gen, (start_doc, stop_doc), {})
+    return cat
+
+
+def make_start_docs(n, **metadata):
+    # Give some runs equal times and some equal scan_ids.
+    return [{'uid': str(uuid.uuid4()), 'time': float(i // 2), 'scan_id': i // 3,
+             **{key: value(i) for key, value in metadata.items()}}
+            for i in range(n)]
+
+
+def test_getitem_by_integer():
+    start_docs = make_start_docs(20)
+    # Replace an early run with one that is more recent.
+    start_docs.append({**start_docs[3], 'time': 1000.0, 'scan_id': 2})
+    cat = make_catalog(start_docs)
+
+    # Compare with sorting the RunStart documents afresh.
+    by_uid = {doc['uid']: doc for doc in start_docs}
+    time_sorted = sorted(by_uid.values(), key=lambda doc: -doc['time'])
+    for N in range(1, len(time_sorted) + 1):
+        assert cat[-N].name == time_sorted[N - 1]['uid']
+    for scan_id in range(7):
+        expected = next(doc['uid'] for doc in time_sorted
+                        if doc['scan_id'] == scan_id)
+        assert cat[scan_id].name == expected
+    assert cat[2].name == start_docs[3]['uid']
+    with pytest.raises(IndexError):
+        cat[-len(time_sorted) - 1]
+    with pytest.raises(KeyError):
+        cat[7]
+
+
+def test_getitem_by_partial_uid():
+    start_docs = make_start_docs(5)
+    uids = ['abc123', 'abd456', 'abd789', 'b\U0010ffffx', 'c']
+    for start_doc, uid in zip(start_docs, uids):
+        start_doc['uid'] = uid
+    cat = make_catalog(start_docs)
+    assert cat['abc'].name == 'abc123'
+    assert cat['abd4'].name == 'abd456'
+    assert cat['b\U0010ffff'].name == 'b\U0010ffffx'
+    assert cat['abd789'].name == 'abd789'
+    with pytest.raises(ValueError):
+        cat['abd']
+    with pytest.raises(KeyError):
+        cat['abe']
+
+
+SAMPLES = ['Au', 'Cu', ['Au', 'Cu'], {'name': 'Au'}, None, float('nan'), 3]
+
+
+@pytest.mark.parametrize('query', [
+    {},
+    {'plan_name': 'count'},
+    {'plan_name': {'$in': ['count', 'scan']}},
+    {'scan_id': 2},
+    {'scan_id': {'$gt': 2, '$lte': 5}},
+    {'time': {'$gte': 3}},
+    {'time': {'$lt': 3}, 'plan_name': 'scan'},
+    {'sample': 'Au'},
+    {'sample': {'$eq': ['Au', 'Cu']}},
+    {'sample': {'$gt': 'B'}},
+    {'sample': {'$lt': 5}},
+    {'sample.name': 'Au'},
+    {'sample': {'$exists': False}},
+    {'$and': [{'time': {'$gt': 1}}, {'scan_id': {'$lt': 5}}]},
+    {'$or': [{'scan_id': 1}, {'plan_name': 'count'}]},
+    {'$or': [{'scan_id': 1}, {'purpose': 'test'}]},
+    {'$nor': [{'scan_id': 1}]},
+    {'scan_id': {'$ne': 1}},
+])
+def test_search(query):
+    "Indexed search gives the same results, in order, as checking every run."
+    start_docs = make_start_docs(
+        30,
+        plan_name=lambda i: ['count', 'scan', 'grid_scan'][i % 3],
+        purpose=lambda i: 'test' if i % 4 else 'real',
+        sample=lambda i: SAMPLES[i % len(SAMPLES)])
+    # Leave 'sample' out of some.
+    for start_doc in start_docs[::5]:
+        del start_doc['sample']
+    cat = make_catalog(start_docs)
+    expected = [doc['uid'] for doc in start_docs if Query(query).match(doc)]
+    assert list(cat.search(query)) == expected
+
+    # Nested search, narrowing down by time
+    expected = [doc['uid'] for doc in start_docs
+                if Query(query).match(doc) and doc['time'] > 5]
+    assert list(cat.search({'time': {'$gt': 5}}).search(query)) == expected
+    assert list(cat.search(query).search({'time': {'$gt': 5}})) == expected
+
+
+def test_search_after_upsert():
+    start_docs = make_start_docs(10, plan_name=lambda i: 'count')
+    cat = make_catalog(start_docs)
+    assert len(cat.search({'plan_name': 'count'})) == 10
+    # Replace a run, changing its plan_name.
+    cat.upsert({**start_docs[0], 'plan_name': 'scan'}, None, gen, (), {})
+    assert len(cat.search({'plan_name': 'count'})) == 9
+    assert list(cat.search({'plan_name': 'scan'})) == [start_docs[0]['uid']]
+    # A search result keeps the query for Runs added later.
+    results = cat.search({'plan_name': 'count'})
+    results.upsert({**start_docs[1], 'plan_name': 'scan'}, None, gen, (), {})
+    assert start_docs[1]['uid'] not in list(
+        results.search({'plan_name': 'scan'}))
+
+
+def test_read_stream_with_different_fields():
+    "The Event Descriptors of one stream need not have the same fields."
+    run_bundle = event_model.compose_run()
+    documents = [('start', run_bundle.start_doc)]
+    for i, keys in enumerate(['xy', 'x']):
+        # event_model will not compose these in one run. Stitch them.
+        desc_bundle = event_model.compose_run().compose_descriptor(
+            data_keys={key: {'source': '', 'dtype': 'integer', 'shape': []}
+                       for key in keys},
+            name='primary')
+        descriptor = {**desc_bundle.descriptor_doc,
+                      'run_start': run_bundle.start_doc['uid']}
+        documents.append(('descriptor', descriptor))
+        for j in range(3):
+            t = 10 * i + j
+            documents.append(('event', desc_bundle.compose_event(
+                data={key: t for key in keys},
+                timestamps={key: t for key in keys},
+                time=t)))
+    stop_doc = run_bundle.compose_stop()
+    documents.append(('stop', stop_doc))
+
+    cat = BlueskyInMemoryCatalog()
+    cat.upsert(run_bundle.start_doc, stop_doc, iter, (documents,), {})
+    run = cat[run_bundle.start_doc['uid']]()
+    ds = run.read_stream('primary')
+    assert list(ds['x']) == [0, 1, 2, 10, 11, 12]
+    assert ds['x'].dtype.kind == 'i'
+    assert list(ds['y'][:3]) == [0, 1, 2]
+    assert numpy.isnan(ds['y'][3:]).all()
+    assert list(run.read_stream('primary', include=['x'])['x']) == list(ds['x'])
@@ -1,5 +1,13 @@
 import intake_bluesky.jsonl # noqa
+from intake_bluesky.jsonl import BlueskyJSONLCatalog
+from intake_bluesky.compression import compress
+from intake_bluesky.core import BlueskyRun, BlueskyRunFromGenerator, DaskFiller
+import dask.array
+import event_model
 import intake
+import itertools
+import json
+import numpy
 from suitcase.jsonl import Serializer
 import os
 from pathlib import Path
@@ -66,3 +74,376 @@ sources:
     return types.SimpleNamespace(cat=cat,
                                  uid=uid,
                                  docs=docs)
+
+
+def test_stream(example_data, tmp_path):
+    "A streamed Run yields the same documents as one read into memory."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    expected = BlueskyJSONLCatalog(paths, handler_registry=handler_registry)[uid]()
+    actual = BlueskyJSONLCatalog(paths, handler_registry=handler_registry,
+                                 stream=True)[uid]()
+
+    def without_datum(gen):
+        # Datum may be grouped into pages differently.
+        return ((name, doc) for name, doc in gen if name != 'datum_page')
+
+    for (name, doc), (expected_name, expected_doc) in itertools.zip_longest(
+            without_datum(actual.canonical_unfilled()),
+            without_datum(expected.canonical_unfilled())):
+        assert name == expected_name
+        assert doc.get('uid') == expected_doc.get('uid')
+    assert actual['primary'].read().equals(expected['primary'].read())
+
+
+def test_external_fields_are_lazy(example_data, tmp_path):
+    "Given a DaskFiller, a stream reads external fields as dask arrays."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    run = BlueskyJSONLCatalog(paths, handler_registry=handler_registry)[uid]()
+    # By default, everything is filled when read.
+    full = run['primary']().read()
+    for key in full.variables:
+        assert isinstance(full[key].data, numpy.ndarray)
+    source = run['primary']()
+    source.filler = DaskFiller(run.filler.handler_registry)
+    lazy = source.to_dask()
+    descriptor, = source.metadata['descriptors']
+    for key, data_key in descriptor['data_keys'].items():
+        if 'external' in data_key:
+            assert isinstance(lazy[key].data, dask.array.Array)
+            assert lazy[key].data.npartitions < len(lazy['time'])
+        numpy.testing.assert_array_equal(lazy[key].values, full[key].values)
+
+
+def test_handler_pool(example_data, tmp_path):
+    "Streams read through a Catalog with a handler_pool share its handlers."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    cat = BlueskyJSONLCatalog(paths, handler_registry=handler_registry,
+                              handler_pool=4)
+    pool = cat._handler_pool
+    expected = BlueskyJSONLCatalog(
+        paths, handler_registry=handler_registry)[uid]()['primary'].read()
+    for _ in range(2):
+        actual = cat[uid]()['primary'].read()
+        assert actual.equals(expected)
+    resources = [doc for name, doc in docs if name == 'resource']
+    assert pool.opened == len(resources)
+    if resources:
+        assert pool.hits > 0
+
+
+@pytest.mark.parametrize('pool', ['thread', 'process'])
+def test_parallel_load(example_data, tmp_path, pool):
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    # Also include an empty file, which should be skipped.
+    empty = tmp_path / 'empty'
+    empty.touch()
+    paths.append(str(empty))
+    expected = BlueskyJSONLCatalog(paths)
+    actual = BlueskyJSONLCatalog(paths, max_workers=4, pool=pool)
+    assert list(actual) == list(expected) == [uid]
+
+
+@pytest.mark.parametrize('decoder', list(intake_bluesky.jsonl.DECODERS))
+def test_decoders(example_data, tmp_path, decoder):
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    expected = BlueskyJSONLCatalog(paths, handler_registry=handler_registry,
+                                   decoder='json')[uid]()
+    actual = BlueskyJSONLCatalog(paths, handler_registry=handler_registry,
+                                 decoder=decoder)[uid]()
+    assert actual['primary'].read().equals(expected['primary'].read())
+
+    # NaN is not strictly valid JSON, but the standard library writes it.
+    # EventPages' numeric columns may be decoded as numpy arrays.
+    filename = tmp_path / 'pages.jsonl'
+    event_page = {'descriptor': 'd', 'uid': ['a', 'b'], 'seq_num': [1, 2],
+                  'time': [0, 1], 'filled': {},
+                  'data': {'x': [1.5, float('nan')], 'y': ['s', 't'],
+                           'z': [[1, 2], [3]]},
+                  'timestamps': {'x': [0, 1], 'y': [0, 1], 'z': [0, 1]}}
+    filename.write_text(json.dumps(['event_page', event_page]) + '\n')
+    (name, doc), = intake_bluesky.jsonl.gen(str(filename), decoder=decoder,
+                                            numpy_arrays=True)
+    assert isinstance(doc['data']['x'], numpy.ndarray)
+    assert numpy.isnan(doc['data']['x'][1])
+    assert doc['data']['y'] == ['s', 't']
+    assert doc['data']['z'] == [[1, 2], [3]]
+    assert isinstance(doc['timestamps']['x'], numpy.ndarray)
+    (name, doc), = intake_bluesky.jsonl.gen(str(filename), decoder=decoder)
+    assert isinstance(doc['data']['x'], list)
+
+    with pytest.raises(ValueError):
+        intake_bluesky.jsonl.get_decoder('no-such-decoder')
+
+
+@pytest.mark.parametrize('method', ['gzip', 'xz'])
+def test_compressed(example_data, tmp_path, method):
+    "Compressed files are read transparently, with or without streaming."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    path, = serializer.artifacts['all']
+    compressed = f'{path}.{method}'
+    compress(str(path), compressed, method=method)
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    expected = BlueskyJSONLCatalog([str(path)],
+                                   handler_registry=handler_registry)[uid]()
+    for stream in (False, True):
+        actual = BlueskyJSONLCatalog([compressed], stream=stream,
+                                     handler_registry=handler_registry)[uid]()
+        assert actual.metadata['stop'] == expected.metadata['stop']
+        assert actual['primary'].read().equals(expected['primary'].read())
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_live(example_data, tmp_path, stream):
+    "A live Run reads what has been added to its file when it is reloaded."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    path, = serializer.artifacts['all']
+    content = Path(path).read_bytes()
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    expected = BlueskyJSONLCatalog([str(path)],
+                                   handler_registry=handler_registry)[uid]()
+
+    def uids(run):
+        # Datum may be grouped into pages differently.
+        return [(name, doc.get('uid'))
+                for name, doc in run.canonical_unfilled()
+                if name != 'datum_page']
+
+    # Write the file in two parts, cutting a line in half.
+    growing = tmp_path / 'growing.jsonl'
+    first_line_length = content.index(b'\n') + 1
+    cut = first_line_length + (len(content) - first_line_length) // 2
+    if content[cut - 1:cut] == b'\n':
+        cut += 1
+    growing.write_bytes(content[:cut])
+    cat = BlueskyJSONLCatalog([str(growing)], live=True, stream=stream,
+                              handler_registry=handler_registry)
+    run = cat[uid]()
+    before = uids(run)
+    assert before == uids(expected)[:len(before)]
+    assert run.metadata['stop'] is None
+    with open(growing, 'ab') as file:
+        file.write(content[cut:])
+    run.force_reload()
+    assert uids(run) == uids(expected)
+    assert run.metadata['stop'] == expected.metadata['stop']
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_run_cache(example_data, tmp_path, stream):
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    path, = serializer.artifacts['all']
+    cat = BlueskyJSONLCatalog([str(path)], run_cache=2**30, stream=stream)
+    run = cat[uid]()
+    # The second time, the parsed Run is reused.
+    assert cat[uid]()._get_run_start() is run._get_run_start()
+    assert len(cat._run_cache) == 1
+    # Search results share the cache.
+    assert cat.search({})[uid]()._get_run_start() is run._get_run_start()
+    # A changed file is read again.
+    mtime = os.path.getmtime(path)
+    os.utime(path, (mtime + 1, mtime + 1))
+    cat.force_reload()
+    assert cat[uid]()._get_run_start() is not run._get_run_start()
+    assert len(cat._run_cache) == 2
+
+
+def test_search_reuses_entries(example_data, tmp_path, monkeypatch):
+    "Search results start from the Catalog's entries, not from the files."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    cat = BlueskyJSONLCatalog(str(tmp_path / '*.jsonl'))
+    read = []
+    original = intake_bluesky.jsonl._read_header
+
+    def read_header(filename, *args, **kwargs):
+        read.append(filename)
+        return original(filename, *args, **kwargs)
+
+    monkeypatch.setattr(intake_bluesky.jsonl, '_read_header', read_header)
+    results = cat.search({'plan_name': docs[0][1]['plan_name']})
+    assert list(results) == [uid]
+    assert results[uid] is cat[uid]
+    assert not read
+    # New files are read when the search results are reloaded.
+    shutil.copy(serializer.artifacts['all'][0], tmp_path / 'copy.jsonl')
+    results.force_reload()
+    assert read == [str(tmp_path / 'copy.jsonl')]
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_skip_limit(example_data, tmp_path, monkeypatch, stream):
+    "Any slice of the Events or Datums can be read, splitting pages."
+    monkeypatch.setattr(BlueskyRunFromGenerator, 'STREAM_PAGE_SIZE', 2)
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    cat = BlueskyJSONLCatalog(paths, stream=stream)
+    run = cat[uid]()
+
+    def check(get_pages, unpack, uid):
+        items = list(itertools.chain.from_iterable(
+            map(unpack, get_pages(uid))))
+        for skip in sorted({0, 1, 2, 3, len(items) // 2, len(items) - 1,
+                            len(items), len(items) + 1}):
+            for limit in [None, 0, 1, 3, len(items)]:
+                stop = None if limit is None else skip + limit
+                actual = list(itertools.chain.from_iterable(
+                    map(unpack, get_pages(uid, skip=skip, limit=limit))))
+                assert actual == items[skip:stop]
+        return items
+
+    for descriptor in run._get_event_descriptors():
+        assert check(run._get_event_pages, event_model.unpack_event_page,
+                     descriptor['uid'])
+    resource_uids = {doc['resource'] for name, doc in docs
+                     if name in ('datum', 'datum_page')}
+    for resource_uid in resource_uids:
+        assert check(run._get_datum_pages, event_model.unpack_datum_page,
+                     resource_uid)
+
+
+def test_partition_bytes(example_data, tmp_path, monkeypatch):
+    "Runs with large Events are split into more, smaller partitions."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    cat = BlueskyJSONLCatalog(paths, handler_registry=handler_registry)
+    run = cat[uid]()
+    expected = [(name, doc.get('uid')) for name, doc in run.canonical()]
+    assert run.npartitions == 1
+
+    # Allow one Event per partition.
+    event_size = max(map(intake_bluesky.core.estimate_event_size,
+                         run._get_event_descriptors()))
+    monkeypatch.setattr(BlueskyRun, 'PARTITION_BYTES', event_size)
+    run = cat[uid]()
+    assert run.npartitions == len(expected)
+    actual = [(name, doc.get('uid')) for name, doc in run.canonical()]
+    assert actual == expected
+    assert cat[uid]().npartitions == run.npartitions
+
+
+@pytest.mark.parametrize('partition_size', [1, 2, 3, 7])
+def test_partition_offsets(example_data, tmp_path, monkeypatch, partition_size):
+    "Each partition picks up exactly where the one before it left off."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    cat = BlueskyJSONLCatalog(paths, handler_registry=handler_registry)
+    run = cat[uid]()
+    expected = [(name, doc['uid']) for name, doc in run.canonical()
+                if name in ('start', 'descriptor', 'event', 'stop')]
+
+    monkeypatch.setattr(BlueskyRun, 'PARTITION_SIZE', partition_size)
+    run = cat[uid]()
+    for raw in (False, True):
+        partitions = [run.read_partition((i, raw))
+                      for i in range(run.npartitions)]
+        assert all(len(partition) <= partition_size for partition in partitions
+                   if not raw)
+        actual = [(name, doc['uid']) for partition in partitions
+                  for name, doc in partition
+                  if name in ('start', 'descriptor', 'event', 'stop')]
+        assert actual == expected
+
+
+def test_datum_per_partition(example_data, tmp_path, monkeypatch):
+    "Each partition carries only the Datums that its Events reference."
+    monkeypatch.setattr(BlueskyRun, 'PARTITION_SIZE', 3)
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    run = BlueskyJSONLCatalog(paths)[uid]()
+    all_datum_ids = set()
+    for i in range(run.npartitions):
+        partition = run.read_partition((i, True))
+        resources = {doc['uid'] for name, doc in partition if name == 'resource'}
+        datum_ids = [datum_id for name, doc in partition
+                     if name == 'datum_page' for datum_id in doc['datum_id']]
+        assert all(datum_id.split('/')[0] in resources for datum_id in datum_ids)
+        referenced = {doc['data'][key] for name, doc in partition
+                      if name == 'event'
+                      for key, is_filled in doc['filled'].items()
+                      if not is_filled}
+        assert sorted(datum_ids) == sorted(referenced)
+        all_datum_ids.update(datum_ids)
+    expected = {datum_id for name, doc in docs if name == 'datum_page'
+                for datum_id in doc['datum_id']}
+    expected |= {doc['datum_id'] for name, doc in docs if name == 'datum'}
+    assert all_datum_ids == expected
+
+
+def test_stream_without_handler_registry(example_data, tmp_path):
+    "A streamed Run opens and reads lazily with the default handler registry."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    run = BlueskyJSONLCatalog(paths, stream=True)[uid]()
+    # Without a handler, external data cannot be filled.
+    run['primary'](include=['motor']).to_dask()
+    expected = sum(len(doc['seq_num']) if name == 'event_page' else 1
+                   for name, doc in docs if name in ('event', 'event_page'))
+    actual = [name for name, _ in run.canonical_unfilled()]
+    assert actual.count('event') == expected
+    assert actual[0] == 'start' and actual[-1] == 'stop'
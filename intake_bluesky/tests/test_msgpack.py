@@ -1,5 +1,13 @@
+import gzip
+import intake_bluesky.compression
 import intake_bluesky.msgpack  # noqa
+from intake_bluesky.msgpack import BlueskyMsgpackCatalog
+from intake_bluesky.compression import compress
 import intake
+import itertools
+import msgpack
+import msgpack_numpy
+import numpy
 from suitcase.msgpack import Serializer
 import os
 from pathlib import Path
@@ -65,3 +73,184 @@ sources:
     return types.SimpleNamespace(cat=cat,
                                  uid=uid,
                                  docs=docs)
+
+
+def test_stream(example_data, tmp_path):
+    "A streamed Run yields the same documents as one read into memory."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    expected = BlueskyMsgpackCatalog(paths, handler_registry=handler_registry)[uid]()
+    actual = BlueskyMsgpackCatalog(paths, handler_registry=handler_registry,
+                                   stream=True)[uid]()
+
+    def without_datum(gen):
+        # Datum may be grouped into pages differently.
+        return ((name, doc) for name, doc in gen if name != 'datum_page')
+
+    for (name, doc), (expected_name, expected_doc) in itertools.zip_longest(
+            without_datum(actual.canonical_unfilled()),
+            without_datum(expected.canonical_unfilled())):
+        assert name == expected_name
+        assert doc.get('uid') == expected_doc.get('uid')
+    assert actual['primary'].read().equals(expected['primary'].read())
+
+
+def test_memory_map(example_data, tmp_path):
+    "Large arrays are read as read-only views onto a memory map."
+    uid, docs = example_data
+    image = numpy.random.random((512, 512))
+    filename = str(tmp_path / 'large.msgpack')
+    with open(filename, 'wb') as file:
+        for item in [('start', {'uid': 'a'}),
+                     ('event', {'data': {'image': image}}),
+                     ('stop', {'uid': 'b'})]:
+            file.write(msgpack.packb(item, default=msgpack_numpy.encode,
+                                     use_bin_type=True))
+    (_, start_doc), (_, event), (_, stop_doc) = intake_bluesky.msgpack.gen(
+        filename, memory_map=True)
+    assert numpy.array_equal(event['data']['image'], image)
+    assert not event['data']['image'].flags.writeable
+    assert intake_bluesky.msgpack.get_stop(filename, memory_map=True) == stop_doc
+    # Small objects are skipped by msgpack, large ones walked in place.
+    offsets = [start for start, _, _ in intake_bluesky.msgpack.gen_with_offsets(
+        filename, memory_map=True)]
+    assert offsets[1] - offsets[0] < intake_bluesky.msgpack.MEMORY_MAP_THRESHOLD
+    assert offsets[2] - offsets[1] > intake_bluesky.msgpack.MEMORY_MAP_THRESHOLD
+    (_, event), = intake_bluesky.msgpack.gen_at(filename, offsets[1:2],
+                                                memory_map=True)
+    assert numpy.array_equal(event['data']['image'], image)
+
+    empty = str(tmp_path / 'empty.msgpack')
+    open(empty, 'wb').close()
+    assert list(intake_bluesky.msgpack.gen_at(empty, [], memory_map=True)) == []
+    assert intake_bluesky.msgpack.get_stop(empty, memory_map=True) is None
+
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    expected = BlueskyMsgpackCatalog(paths, handler_registry=handler_registry)[uid]()
+    actual = BlueskyMsgpackCatalog(paths, handler_registry=handler_registry,
+                                   memory_map=True)[uid]()
+    assert actual['primary'].read().equals(expected['primary'].read())
+
+
+@pytest.mark.parametrize('pool', ['thread', 'process'])
+def test_parallel_load(example_data, tmp_path, pool):
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    paths = [str(path) for path in serializer.artifacts['all']]
+    # Also include an empty file, which should be skipped.
+    empty = tmp_path / 'empty'
+    empty.touch()
+    paths.append(str(empty))
+    expected = BlueskyMsgpackCatalog(paths)
+    actual = BlueskyMsgpackCatalog(paths, max_workers=4, pool=pool)
+    assert list(actual) == list(expected) == [uid]
+
+
+@pytest.mark.parametrize('method', ['gzip', 'xz'])
+def test_compressed(example_data, tmp_path, method):
+    "Compressed files are read transparently, and are not memory-mapped."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    path, = serializer.artifacts['all']
+    compressed = f'{path}.{method}'
+    compress(str(path), compressed, method=method)
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    expected = BlueskyMsgpackCatalog([str(path)],
+                                     handler_registry=handler_registry)[uid]()
+    for kwargs in ({}, {'stream': True}, {'memory_map': True}):
+        actual = BlueskyMsgpackCatalog([compressed], **kwargs,
+                                       handler_registry=handler_registry)[uid]()
+        assert actual.metadata['stop'] == expected.metadata['stop']
+        assert actual['primary'].read().equals(expected['primary'].read())
+
+
+@pytest.mark.parametrize('method', ['gzip', 'zstd'])
+def test_streamed_compressed(example_data, tmp_path, monkeypatch, method):
+    "Files compressed as one big frame are read forward only."
+    if method == 'zstd':
+        zstandard = pytest.importorskip('zstandard')
+    # Stream any frame, however small.
+    monkeypatch.setattr(intake_bluesky.compression, 'MAX_FRAME_SIZE', 1)
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    path, = serializer.artifacts['all']
+    data = Path(path).read_bytes()
+    compressed = tmp_path / f'run.{method}'
+    if method == 'zstd':
+        compressed.write_bytes(zstandard.ZstdCompressor().compress(data))
+    else:
+        compressed.write_bytes(gzip.compress(data))
+    with intake_bluesky.compression.open_file(str(compressed)) as file:
+        assert not intake_bluesky.compression.random_access(file)
+
+    assert intake_bluesky.msgpack.get_stop(str(compressed)) == docs[-1][1]
+    positions = [start for start, _, _ in
+                 intake_bluesky.msgpack.gen_with_offsets(str(path))]
+    expected = list(intake_bluesky.msgpack.gen(str(path)))
+    for order in (positions, positions[::-1]):
+        actual = list(intake_bluesky.msgpack.gen_at(str(compressed), order))
+        assert [doc['uid'] if 'uid' in doc else doc for _, doc in actual] == [
+            doc['uid'] if 'uid' in doc else doc
+            for _, doc in (expected if order is positions else expected[::-1])]
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    run = BlueskyMsgpackCatalog([str(compressed)], stream=True,
+                                handler_registry=handler_registry)[uid]()
+    assert run.metadata['stop'] == docs[-1][1]
+    run['primary'].read()
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'stream': True}, {'memory_map': True}])
+def test_live(example_data, tmp_path, kwargs):
+    "A live Run reads what has been added to its file when it is reloaded."
+    uid, docs = example_data
+    serializer = Serializer(tmp_path)
+    for name, doc in docs:
+        serializer(name, doc)
+    serializer.close()
+    path, = serializer.artifacts['all']
+    content = Path(path).read_bytes()
+    handler_registry = {'NPY_SEQ': 'ophyd.sim.NumpySeqHandler'}
+    expected = BlueskyMsgpackCatalog([str(path)],
+                                     handler_registry=handler_registry)[uid]()
+
+    def uids(run):
+        # Datum may be grouped into pages differently.
+        return [(name, doc.get('uid'))
+                for name, doc in run.canonical_unfilled()
+                if name != 'datum_page']
+
+    # Write the file in two parts, most likely cutting an object in half.
+    growing = tmp_path / 'growing.msgpack'
+    start_length = len(msgpack.packb(docs[0], default=msgpack_numpy.encode))
+    cut = start_length + (len(content) - start_length) // 2
+    growing.write_bytes(content[:cut])
+    cat = BlueskyMsgpackCatalog([str(growing)], live=True, **kwargs,
+                                handler_registry=handler_registry)
+    run = cat[uid]()
+    before = uids(run)
+    assert before == uids(expected)[:len(before)]
+    assert run.metadata['stop'] is None
+    with open(growing, 'ab') as file:
+        file.write(content[cut:])
+    run.force_reload()
+    assert uids(run) == uids(expected)
+    assert run.metadata['stop'] == expected.metadata['stop']
@@ -0,0 +1,95 @@
+import io
+import msgpack
+import numpy
+import pytest
+from intake.container import serializer
+from intake_bluesky import wire
+
+
+def make_documents(n):
+    yield 'start', {'uid': 'abc', 'time': 0.0}
+    for i in range(n):
+        yield 'event', {'seq_num': i + 1,
+                        'data': {'image': numpy.full((10, 10), i, 'uint16'),
+                                 'x': float(i)},
+                        'filled': {'image': True}}
+    yield 'stop', {'uid': 'def', 'run_start': 'abc'}
+
+
+@pytest.mark.parametrize('codec', list(wire.codec_registry))
+def test_round_trip(codec):
+    expected = list(make_documents(50))
+    # Several documents per frame, several frames
+    chunks = list(wire.encode_documents(expected, codec, frame_size=1000))
+    assert len(chunks) > 5
+    # Chunk boundaries need not line up.
+    data = b''.join(chunks)
+    split = [data[i:i + 777] for i in range(0, len(data), 777)]
+    actual = list(wire.decode_documents(split))
+    assert [name for name, _ in actual] == [name for name, _ in expected]
+    for (_, doc), (_, expected_doc) in zip(actual[1:-1], expected[1:-1]):
+        image = doc['data']['image']
+        assert image.dtype == numpy.uint16
+        numpy.testing.assert_array_equal(image, expected_doc['data']['image'])
+        assert doc['data']['x'] == expected_doc['data']['x']
+    assert actual[-1] == expected[-1]
+
+    encoder = serializer.format_registry[wire.FORMAT_PREFIX + codec]
+    assert len(encoder.decode(encoder.encode(expected, 'bluesky-run'),
+                              'bluesky-run')) == len(expected)
+    assert len(list(wire.Partition(data))) == len(expected)
+
+
+def test_accepted_formats():
+    # The intake server uses the last format it knows.
+    formats = wire.accepted_formats()
+    assert formats[-1] == wire.FORMAT_PREFIX + wire.codecs[-1].name
+    assert 'msgpack' in formats
+
+
+def test_other_sources_unaffected():
+    "intake's own clients, for other kinds of sources, never get the framed formats."
+    def pick(accepted, registry):
+        # As the intake server does: the last one it knows
+        return [name for name in accepted if name in registry][-1]
+
+    assert not pick(list(serializer.format_registry),
+                    serializer.format_registry).startswith(wire.FORMAT_PREFIX)
+    assert pick(list(serializer.compression_registry),
+                serializer.compression_registry) == 'none'
+    assert pick(wire.accepted_compression(),
+                serializer.compression_registry) == wire.PassthroughCompressor.name
+    # Compressed as usual by a server that does not know the framed formats
+    assert wire.accepted_compression()[-2] != 'none'
+
+    # Other containers are encoded as msgpack.
+    encoder = serializer.format_registry[wire.FORMAT_PREFIX + 'zlib']
+    array = numpy.arange(6).reshape(3, 2)
+    numpy.testing.assert_array_equal(
+        encoder.decode(encoder.encode(array, 'ndarray'), 'ndarray'), array)
+
+
+@pytest.mark.parametrize('data_last', [True, False])
+def test_read_response(data_last):
+    "The data of a reply is read a chunk at a time, as it is needed."
+    data = b''.join(wire.encode_documents(make_documents(50), frame_size=1000))
+    message = {'format': wire.FORMAT_PREFIX + 'zlib', 'compression': 'none',
+               'container': 'python', 'data': data}
+    if not data_last:
+        message = {'data': data, **message}
+    reply = io.BytesIO(msgpack.packb(message, use_bin_type=True))
+    actual, chunks = wire.read_response(reply, chunk_size=100)
+    del message['data']
+    assert actual == message
+    if data_last:
+        # Not read yet
+        assert reply.tell() < len(data)
+    chunks = list(chunks)
+    assert b''.join(chunks) == data
+    if data_last:
+        assert max(map(len, chunks)) <= 100
+
+    closed = []
+    partition = wire.Partition(iter(chunks), close=lambda: closed.append(True))
+    assert len(list(partition)) == 52
+    assert closed == [True]
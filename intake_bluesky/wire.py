@@ -0,0 +1,321 @@
+"""
+Wire format for sending (name, doc) pairs from an intake server to a client.
+
+Documents are packed with msgpack into *frames* of about ``FRAME_SIZE`` bytes,
+and each frame is compressed on its own. The client reads the server's reply
+as it arrives, with :func:`read_response`, and decompresses and unpacks one
+frame at a time, so it never holds more than one frame beyond the documents
+it has kept. Numpy arrays are packed as their raw buffer (by msgpack_numpy)
+and unpacked as read-only views onto those bytes, without another copy.
+
+The intake server encodes a whole partition before it sends any of it, so it
+holds one partition, and then that partition compressed, per request. That is
+bounded by the size of a partition, which :class:`~intake_bluesky.core.BlueskyRun`
+chooses by bytes; see its ``PARTITION_BYTES``.
+
+zlib is always available. lz4 and zstd are used if the ``lz4`` or
+``zstandard`` package is installed, on both the server and the client.
+
+Each codec is registered with intake as a format named
+``bluesky-frames-<codec>``, so that an intake server which has imported this
+module can send it. They are registered so that intake's own clients, and so
+its other kinds of sources, do not ask for them. See
+:func:`accepted_formats`.
+"""
+import msgpack
+import msgpack_numpy
+import zlib
+
+from intake.container import serializer
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Frames are cut after the first document that takes them over this many
+# bytes, before compression.
+FRAME_SIZE = 2**20
+
+# Prefix of the names of the formats registered with intake.
+FORMAT_PREFIX = 'bluesky-frames-'
+
+UNPACK_OPTIONS = dict(object_hook=msgpack_numpy.decode,
+                      raw=False,
+                      max_buffer_size=1_000_000_000)
+
+
+class ZlibCodec:
+    name = 'zlib'
+
+    def compress(self, data):
+        return zlib.compress(data, 1)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class Lz4Codec:
+    name = 'lz4'
+
+    def compress(self, data):
+        return lz4.frame.compress(data)
+
+    def decompress(self, data):
+        return lz4.frame.decompress(data)
+
+
+class ZstdCodec:
+    name = 'zstd'
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=1).compress(data)
+
+    def decompress(self, data):
+        # Frames written by compress() record their size.
+        return zstandard.ZstdDecompressor().decompress(data)
+
+
+# In increasing order of preference
+codecs = [ZlibCodec()]
+if lz4 is not None:
+    codecs.append(Lz4Codec())
+if zstandard is not None:
+    codecs.append(ZstdCodec())
+codec_registry = {codec.name: codec for codec in codecs}
+
+
+def encode_documents(documents, codec='zlib', frame_size=FRAME_SIZE):
+    """
+    Encode (name, doc) pairs as a sequence of compressed frames.
+
+    Parameters
+    ----------
+    documents : iterable
+        of (name, doc) pairs
+    codec : str, optional
+        Name of a codec in ``codec_registry``
+    frame_size : int, optional
+        Cut frames after they reach this many bytes, before compression.
+
+    Yields
+    ------
+    chunk : bytes
+        Concatenated, these can be read by :func:`decode_documents`.
+    """
+    compressor = codec_registry[codec]
+    packer = msgpack.Packer(default=msgpack_numpy.encode, use_bin_type=True,
+                            autoreset=False)
+    yield msgpack.packb({'codec': codec})
+    for name, doc in documents:
+        packer.pack((name, doc))
+        if packer.getbuffer().nbytes >= frame_size:
+            yield msgpack.packb(compressor.compress(packer.bytes()),
+                                use_bin_type=True)
+            packer.reset()
+    if packer.getbuffer().nbytes:
+        yield msgpack.packb(compressor.compress(packer.bytes()),
+                            use_bin_type=True)
+
+
+def decode_documents(chunks):
+    """
+    Decode (name, doc) pairs from the output of :func:`encode_documents`.
+
+    Parameters
+    ----------
+    chunks : iterable
+        of bytes, which need not line up with the chunks that were encoded
+
+    Yields
+    ------
+    name, doc : str, dict
+    """
+    frames = msgpack.Unpacker(raw=False, max_buffer_size=2**31 - 1)
+    compressor = None
+    for chunk in chunks:
+        frames.feed(chunk)
+        for frame in frames:
+            if compressor is None:
+                compressor = codec_registry[frame['codec']]
+                continue
+            unpacker = msgpack.Unpacker(**UNPACK_OPTIONS)
+            unpacker.feed(compressor.decompress(frame))
+            for name, doc in unpacker:
+                yield name, doc
+
+
+class FramedSerializer:
+    """
+    Make :func:`encode_documents` available to intake as a format.
+
+    Only the 'bluesky-run' container is framed. Anything else is encoded as
+    intake's msgpack format would, in case a server picks this format for
+    another kind of source.
+
+    Parameters
+    ----------
+    codec : str
+        Name of a codec in ``codec_registry``
+    """
+    container = 'bluesky-run'
+
+    def __init__(self, codec):
+        self.codec = codec
+        self.name = FORMAT_PREFIX + codec
+
+    def encode(self, obj, container):
+        if container != self.container:
+            return serializer.MsgPackSerializer().encode(obj, container)
+        return b''.join(encode_documents(obj, self.codec))
+
+    def decode(self, bytestr, container):
+        if container != self.container:
+            return serializer.MsgPackSerializer().decode(bytestr, container)
+        return list(decode_documents([bytestr]))
+
+
+class PassthroughCompressor:
+    """
+    Leave data as it is. The formats of this module compress their frames.
+
+    A server that knows this knows the formats of this module too, so a client
+    that lists it last gets uncompressed framed data from such a server and
+    gets the usual compression from any other.
+    """
+    name = FORMAT_PREFIX.rstrip('-')
+
+    def compress(self, data):
+        return data
+
+    def decompress(self, data):
+        return data
+
+
+class Partition:
+    """
+    A partition in the wire format, decoded a frame at a time on iteration.
+
+    Parameters
+    ----------
+    data : bytes or iterator
+        Output of :func:`encode_documents`, joined, or an iterator of chunks
+        of it, such as the data from :func:`read_response`, which are read
+        only as they are needed. A Partition of an iterator may be iterated
+        once.
+    close : callable, optional
+        Called once iteration is done, or given up, to release what the
+        chunks are read from.
+    """
+    def __init__(self, data, close=None):
+        self.data = data
+        self.close = close
+
+    def __iter__(self):
+        chunks = [self.data] if isinstance(self.data, bytes) else self.data
+        try:
+            yield from decode_documents(chunks)
+        finally:
+            if self.close is not None:
+                self.close()
+
+
+def read_response(file, chunk_size=2**16):
+    """
+    Read an intake server's reply to a 'read' request as it arrives.
+
+    The reply is a msgpack map, in which 'data' holds the encoded partition.
+    The server puts 'data' last, so everything else can be read before it,
+    and it can be read a chunk at a time.
+
+    Parameters
+    ----------
+    file : file-like
+        The reply, such as the raw stream of an HTTP response
+    chunk_size : int, optional
+        Most bytes of 'data' to read at once
+
+    Returns
+    -------
+    message, data : dict, iterator
+        The reply without 'data', and the bytes of 'data', in chunks read
+        from file as the iterator is advanced
+    """
+    unpacker = msgpack.Unpacker(file, raw=False, read_size=chunk_size,
+                                max_buffer_size=2**31 - 1)
+    message = {}
+    length = unpacker.read_map_header()
+    for i in range(length):
+        key = unpacker.unpack()
+        if key == 'data' and i == length - 1:
+            return message, _read_bin(unpacker, chunk_size)
+        message[key] = unpacker.unpack()
+    return message, iter([message.pop('data')])
+
+
+# Sizes of the length that follows each type of msgpack bin header
+_BIN_LENGTH_SIZES = {b'\xc4': 1, b'\xc5': 2, b'\xc6': 4}
+
+
+def _read_bin(unpacker, chunk_size):
+    "Yield the bytes of the msgpack bin next in unpacker, a chunk at a time."
+    header = unpacker.read_bytes(1)
+    try:
+        length_size = _BIN_LENGTH_SIZES[header]
+    except KeyError:
+        raise ValueError(f"Expected msgpack bin data, not {header!r}.") from None
+    remaining = int.from_bytes(unpacker.read_bytes(length_size), 'big')
+    while remaining:
+        chunk = unpacker.read_bytes(min(remaining, chunk_size))
+        if not chunk:
+            raise ValueError("The reply ended before all of its data.")
+        remaining -= len(chunk)
+        yield chunk
+
+
+def accepted_formats():
+    """
+    List formats for a client to accept, in the order an intake server wants.
+
+    The server uses the *last* format in the list that it has registered, so
+    this puts the formats of this module last, best codec last, after
+    intake's own formats as a fallback.
+    """
+    fallback = [name for name in serializer.format_registry
+                if not name.startswith(FORMAT_PREFIX)]
+    return fallback + [FORMAT_PREFIX + codec.name for codec in codecs]
+
+
+def accepted_compression():
+    """
+    List compressions for a client to accept, in the order an intake server
+    wants.
+
+    A server that can send the formats of this module uses
+    ``PassthroughCompressor``, listed last. Any other uses the best of
+    intake's compressions, rather than none.
+    """
+    passthrough = PassthroughCompressor.name
+    fallback = [name for name in serializer.compression_registry
+                if name not in ('none', passthrough)]
+    return ['none'] + fallback + [passthrough]
+
+
+def _register(registry, items):
+    # intake's own clients list every registered name, in registry order, and
+    # the server uses the last one that it knows. Put these first so that
+    # intake's other sources do not get them.
+    for item in items:
+        registry[item.name] = item
+    for item in reversed(items):
+        registry.move_to_end(item.name, last=False)
+
+
+_register(serializer.format_registry,
+          [FramedSerializer(codec.name) for codec in codecs])
+_register(serializer.compression_registry, [PassthroughCompressor()])